@@ -1,10 +1,18 @@
-from .sub_agents.code_writer.agent import code_writer
+from .sub_agents.code_writer.agent import code_writer, multi_scene_code_writer
 from .sub_agents.script_writer.agent import script_writer
 from .sub_agents.code_fixer.agent import code_fixer
+from .sub_agents.chat_responder.agent import chat_responder
 from google.adk.agents.sequential_agent import SequentialAgent
 
 root_agent = SequentialAgent(
     name="manimation",
     sub_agents=[script_writer, code_writer],
     description="Executes a sequence of script_writer & code_writer",
-)
\ No newline at end of file
+)
+
+# An agent can only have one parent, so the multi-scene pipeline gets its own script_writer copy
+multi_scene_root_agent = SequentialAgent(
+    name="manimation_multi_scene",
+    sub_agents=[script_writer.clone(), multi_scene_code_writer],
+    description="Executes a sequence of script_writer & multi_scene_code_writer (one Scene class per storyboard scene)",
+)
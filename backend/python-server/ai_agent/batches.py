@@ -0,0 +1,123 @@
+"""
+Batch generations: many prompts or saved code files under one batch ID.
+
+Items are submitted straight to the video job queue (no HTTP round trip per
+item), so they share the pipeline's LLM and render limits with every other job.
+The batch record lives in the shared status store next to the item statuses;
+its progress is aggregated from them on every read. When all items are done,
+the completed videos can be packed into one zip or joined into one mp4
+(media/batches/<batch_id>.zip|.mp4), built exactly once even with several API
+worker processes.
+"""
+import asyncio
+import time
+import uuid
+import zipfile
+from pathlib import Path
+
+from . import metrics
+from .job_queue import ACTIVE_STATES
+from .stitching import concat_videos
+
+BASE_PATH = Path(__file__).parent.parent
+BATCH_OUTPUT_DIR = BASE_PATH / "media" / "batches"
+BATCH_OUTPUTS = {"none", "zip", "concat"}
+# Largest batch accepted by one request
+MAX_BATCH_ITEMS = 500
+
+TERMINAL_STATUSES = {"completed", "error", "cancelled"}
+# An item is finished once it is terminal or expired (it can no longer reach a terminal status)
+FINISHED_STATUSES = TERMINAL_STATUSES | {"expired"}
+
+
+def batch_key(batch_id: str) -> str:
+    """Status store key of a batch record (item statuses are keyed by generation ID)."""
+    return f"batch:{batch_id}"
+
+
+def new_batch(generation_ids: list[str], attached: list[bool], output: str) -> dict:
+    return {
+        "batch_id": uuid.uuid4().hex,
+        "generation_ids": generation_ids,
+        "attached": attached,
+        "output": output,
+        "created_at": time.time(),
+    }
+
+
+def item_statuses(batch: dict, status_store, queue=None) -> list[dict | None]:
+    """
+    Current status of each item, in batch order.
+
+    An item that has no status (it expired or was deleted) or hasn't finished,
+    while its job is no longer queued or running, will never reach a terminal
+    status; it is reported as "expired" so the batch can still finish.
+
+    Args:
+        batch: The batch record.
+        status_store: Store holding the item statuses.
+        queue: The video JobQueue, if running (without it nothing expires).
+    """
+    statuses = []
+    for generation_id in batch["generation_ids"]:
+        status = status_store.get(generation_id)
+        if queue is not None and (status or {}).get("status") not in TERMINAL_STATUSES and queue.state(generation_id) not in ACTIVE_STATES:
+            status = {**(status or {}), "status": "expired", "message": "The generation's status was lost before it finished"}
+        statuses.append(status)
+    return statuses
+
+
+def aggregate(statuses: list[dict | None]) -> dict:
+    """
+    Combine item statuses into batch progress.
+
+    Args:
+        statuses: Status of each item in batch order (None if not found).
+
+    Returns:
+        dict: counts per status, overall progress (mean of the items), done flag.
+    """
+    counts = {"queued": 0, "processing": 0, "completed": 0, "error": 0, "cancelled": 0, "expired": 0}
+    total_progress = 0.0
+    for status in statuses:
+        state = (status or {}).get("status", "queued")
+        if state == "pending":
+            state = "queued"
+        counts[state] = counts.get(state, 0) + 1
+        total_progress += 100 if state in FINISHED_STATUSES else float((status or {}).get("progress") or 0)
+    total = len(statuses)
+    return {
+        "total": total,
+        "counts": counts,
+        "progress": round(total_progress / total, 1) if total else 100.0,
+        "done": sum(counts[state] for state in FINISHED_STATUSES) == total,
+    }
+
+
+def build_zip(videos: list[tuple[str, Path]], output: Path) -> Path:
+    """Pack (name, path) videos into one zip; mp4 is already compressed, so entries are stored."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, path in videos:
+            archive.write(path, arcname=name)
+    tmp.replace(output)
+    return output
+
+
+async def build_output(batch: dict, videos: list[tuple[str, Path]]) -> Path:
+    """
+    Build the batch's requested output from its completed videos (in batch order).
+
+    Returns:
+        Path: The zip or mp4 under media/batches/.
+    """
+    if not videos:
+        raise ValueError("No completed videos in the batch")
+    started = time.perf_counter()
+    if batch["output"] == "zip":
+        output = await asyncio.to_thread(build_zip, videos, BATCH_OUTPUT_DIR / f"{batch['batch_id']}.zip")
+    else:
+        output = await concat_videos([path for _, path in videos], BATCH_OUTPUT_DIR / f"{batch['batch_id']}.mp4")
+    metrics.observe("batch.output_build", time.perf_counter() - started)
+    return output
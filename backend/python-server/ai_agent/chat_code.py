@@ -0,0 +1,115 @@
+"""
+Code produced by /chat, kept for /generate-video.
+
+/chat already runs script_writer and code_writer. Its code is stored in the
+shared status store under the SHA-256 of the code (its code_ref) together with
+the chat session, and the session's latest code_ref is kept next to it.
+/generate-video can then take a code_ref, or just the session_id, and render
+that code directly instead of running the whole agent pipeline again in a new
+session. Entries expire with the store's TTL like job statuses.
+
+With speculative rendering (SPECULATIVE_RENDER=1, or "speculative_render" on
+the chat request) the code is also queued for a low-priority draft render as
+soon as it passes preflight, so the render runs while the user reads the
+reply. The session record remembers that job; if the code is edited or a new
+reply replaces it, main.py cancels the draft. A /generate-video for the same
+code attaches to the draft (raising its priority) instead of rendering again.
+"""
+import hashlib
+import os
+import time
+
+# Start a draft render for every chat reply with code (a request can still opt in or out)
+SPECULATIVE_RENDER = os.getenv("SPECULATIVE_RENDER", "0") != "0"
+# Queue priority of draft renders; requests at the default 0 run before them
+SPECULATIVE_RENDER_PRIORITY = int(os.getenv("SPECULATIVE_RENDER_PRIORITY", "-10"))
+
+
+def code_ref(code: str) -> str:
+    """Content hash identifying a piece of generated code."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def code_key(ref: str) -> str:
+    """Status store key of a stored piece of code."""
+    return f"chat-code:{ref}"
+
+
+def session_key(session_id: str) -> str:
+    """Status store key of a chat session's latest code_ref."""
+    return f"chat-session-code:{session_id}"
+
+
+def remember(store, code: str, session_id: str, user_id: str | None = None) -> str:
+    """
+    Store code generated by a chat turn.
+
+    Args:
+        store: The shared StatusStore.
+        code: The code_content returned to the client.
+        session_id: Chat session that produced it.
+        user_id: Owner of the session.
+
+    Returns:
+        str: The code_ref.
+    """
+    ref = code_ref(code)
+    record = {"code_ref": ref, "code": code, "session_id": session_id, "user_id": user_id, "created_at": time.time()}
+    store.set(code_key(ref), record)
+    store.update(session_key(session_id), code_ref=ref, created_at=record["created_at"])
+    return ref
+
+
+def lookup(store, ref: str | None = None, session_id: str | None = None) -> dict | None:
+    """
+    Find stored chat code by code_ref, or the latest code of a session.
+
+    Args:
+        store: The shared StatusStore.
+        ref: A code_ref returned by /chat.
+        session_id: Chat session; with ref, the code must belong to it.
+
+    Returns:
+        dict | None: {"code_ref", "code", "session_id", "user_id", "created_at"},
+        or None if nothing matches (or it expired).
+    """
+    latest = store.get(session_key(session_id)) if session_id else None
+    if ref is None:
+        ref = latest["code_ref"] if latest else None
+    if ref is None:
+        return None
+    record = store.get(code_key(ref))
+    if record is None:
+        return None
+    # The same code can come out of two sessions; the record names the last one
+    if session_id and record["session_id"] != session_id and not (latest and latest["code_ref"] == ref):
+        return None
+    return record
+
+
+def mark_speculative(store, session_id: str, generation_id: str, ref: str) -> None:
+    """Record the draft render started for a session's code."""
+    store.update(session_key(session_id), speculative_generation_id=generation_id, speculative_code_ref=ref)
+
+
+def speculative_render(store, session_id: str) -> dict | None:
+    """
+    The session's outstanding draft render, if any.
+
+    Returns:
+        dict | None: {"generation_id", "code_ref", "code"} of the draft (code is
+        None if its record expired).
+    """
+    latest = store.get(session_key(session_id)) if session_id else None
+    if not latest or not latest.get("speculative_generation_id"):
+        return None
+    record = store.get(code_key(latest["speculative_code_ref"]))
+    return {
+        "generation_id": latest["speculative_generation_id"],
+        "code_ref": latest["speculative_code_ref"],
+        "code": record["code"] if record else None,
+    }
+
+
+def clear_speculative(store, session_id: str) -> None:
+    store.update(session_key(session_id), speculative_generation_id=None, speculative_code_ref=None)
@@ -0,0 +1,218 @@
+"""
+Splitting agent output into the chat reply and the Manim code.
+
+extract_chat_and_code() works on the complete responses, as /chat has always
+done. IncrementalChatParser applies the same rules to text as it streams in, so
+/chat/stream can forward the [CHAT] reply as soon as script_writer writes it and
+the code as code_writer writes it.
+"""
+
+CHAT_MARKER = "[CHAT]"
+CHAT_TERMINATORS = ("\n#", "---")
+CODE_FENCE = "```python"
+CODE_END = "```"
+RAW_CODE_PREFIXES = ("from manim import", "class Introduce")
+DEFAULT_CHAT_RESPONSE = "I've generated the animation code for you! Starting the render now..."
+
+
+def extract_chat_and_code(responses: list[str]) -> tuple[str, str]:
+    """
+    Extract the chat reply and the code from the agents' final responses.
+
+    Args:
+        responses: Final response text of each agent, in order.
+
+    Returns:
+        tuple: (chat_response, code_content)
+    """
+    code_content = ""
+    chat_response = ""
+
+    # 1. Extract Chat Response (find [CHAT] anywhere in the response sequence)
+    for resp in responses:
+        if CHAT_MARKER in resp:
+            chat_start = resp.find(CHAT_MARKER) + len(CHAT_MARKER)
+            # Extract until next header or end
+            chat_end = resp.find("\n#", chat_start)
+            if chat_end == -1:
+                chat_end = resp.find("---", chat_start)
+            if chat_end == -1:
+                chat_end = len(resp)
+
+            extracted_chat = resp[chat_start:chat_end].strip()
+            # Clean up bolding/tags
+            chat_response = extracted_chat.replace("**", "").replace(":", "", 1).strip()
+            break  # Take the first [CHAT] found
+
+    # 2. Extract Code Content (from the last response)
+    if responses:
+        last_resp = responses[-1]
+        if CODE_FENCE in last_resp:
+            c_start = last_resp.find(CODE_FENCE) + len(CODE_FENCE)
+            c_end = last_resp.find(CODE_END, c_start)
+            if c_end != -1:
+                code_content = last_resp[c_start:c_end].strip()
+        elif any(prefix in last_resp for prefix in RAW_CODE_PREFIXES):
+            # Raw code fallback
+            code_content = last_resp.strip()
+
+        # If we still don't have a chat response, use the last resp (but remove code)
+        if not chat_response:
+            if CODE_FENCE in last_resp:
+                chat_response = last_resp.split(CODE_FENCE)[0].strip()
+            elif code_content:
+                chat_response = ""  # It's just code
+
+    # Final fallback for chat
+    if not chat_response:
+        chat_response = DEFAULT_CHAT_RESPONSE
+
+    return chat_response, code_content
+
+
+def _held_suffix(text: str, markers) -> int:
+    """Length of the longest tail of text that could be the start of one of markers."""
+    held = 0
+    for marker in markers:
+        for size in range(min(len(marker) - 1, len(text)), held, -1):
+            if text.endswith(marker[:size]):
+                held = size
+                break
+    return held
+
+
+class IncrementalChatParser:
+    """
+    Incremental version of extract_chat_and_code for streamed agent output.
+
+    Feed text deltas as they arrive and call end_response() when an agent's
+    response is complete. Both return a list of ("chat" | "code", text) pieces
+    that are safe to forward: text that might turn out to be the start of a
+    marker (e.g. a trailing "-" before "---") is held back until the next delta
+    settles it. The pieces are a preview; extract_chat_and_code over the final
+    responses stays the authoritative result.
+    """
+
+    def __init__(self):
+        self.chat_done = False
+        self._reset_response()
+
+    def _reset_response(self):
+        self.buffer = ""   # text of the current response not yet consumed
+        self.mode = None   # None (scanning), "chat", "code" or "raw_code"
+        self.at_start = True  # nothing but whitespace seen yet (raw code must start the response)
+        self.section_started = False  # leading whitespace (and for chat "**"/":") already dropped
+        self.colon_dropped = False
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        self.buffer += text
+        return self._drain(final=False)
+
+    def end_response(self) -> list[tuple[str, str]]:
+        pieces = self._drain(final=True)
+        self._reset_response()
+        return pieces
+
+    def _drain(self, final: bool) -> list[tuple[str, str]]:
+        pieces: list[tuple[str, str]] = []
+        while True:
+            if self.mode is None:
+                if not self._start_section(final):
+                    return pieces
+            elif self.mode == "chat":
+                if not self._emit_until(CHAT_TERMINATORS, "chat", pieces, final):
+                    return pieces
+                self.chat_done = True
+            elif self.mode == "code":
+                if not self._emit_until((CODE_END,), "code", pieces, final):
+                    return pieces
+            elif self.mode == "raw_code":
+                if self.buffer:
+                    pieces.append(("code", self.buffer))
+                    self.buffer = ""
+                return pieces
+
+    def _start_section(self, final: bool) -> bool:
+        """Look for the next [CHAT] or code section in the buffer; True once one starts."""
+        candidates = []
+        if not self.chat_done and CHAT_MARKER in self.buffer:
+            candidates.append((self.buffer.find(CHAT_MARKER), CHAT_MARKER, "chat"))
+        if CODE_FENCE in self.buffer:
+            candidates.append((self.buffer.find(CODE_FENCE), CODE_FENCE, "code"))
+        if candidates:
+            index, marker, mode = min(candidates)
+            self.buffer = self.buffer[index + len(marker):]
+            self._enter(mode)
+            return True
+
+        stripped = self.buffer.lstrip()
+        if self.at_start and any(stripped.startswith(prefix) for prefix in RAW_CODE_PREFIXES):
+            # A response that is nothing but code (no fence)
+            self.buffer = stripped
+            self._enter("raw_code")
+            return True
+        if self.at_start and not final and any(prefix.startswith(stripped) for prefix in RAW_CODE_PREFIXES):
+            return False  # can't tell yet whether this is raw code (or only whitespace so far)
+
+        # Nothing to emit; keep only what could still be the start of a marker
+        held = _held_suffix(self.buffer, (CHAT_MARKER, CODE_FENCE))
+        self.buffer = self.buffer[len(self.buffer) - held:] if held else ""
+        self.at_start = False
+        return False
+
+    def _enter(self, mode: str) -> None:
+        self.mode = mode
+        self.at_start = False
+        self.section_started = False
+
+    def _emit_until(self, terminators, kind: str, pieces: list, final: bool) -> bool:
+        """
+        Emit buffered text up to a terminator; True if the section ended.
+
+        Terminators are in order of preference, as in extract_chat_and_code: a
+        later one only ends the section if no earlier one turns up before the
+        response is complete, so the text from it on is held back until then.
+        """
+        self._strip_prefix(kind, final)
+        if kind == "chat":
+            # Clean up bolding before holding back a possible half of "**"
+            self.buffer = self.buffer.replace("**", "")
+        for index, terminator in enumerate(terminators):
+            end = self.buffer.find(terminator)
+            if end == -1:
+                continue
+            self._emit(kind, self.buffer[:end], pieces)
+            if index and not final:
+                self.buffer = self.buffer[end:]
+                return False
+            self.buffer = self.buffer[end + len(terminator):]
+            self.mode = None
+            return True
+        held = 0 if final else _held_suffix(self.buffer, terminators + (("**",) if kind == "chat" else ()))
+        self._emit(kind, self.buffer[:len(self.buffer) - held], pieces)
+        self.buffer = self.buffer[len(self.buffer) - held:]
+        if final:
+            self.mode = None
+            if kind == "chat":
+                self.chat_done = True
+        return False
+
+    def _strip_prefix(self, kind: str, final: bool) -> None:
+        """Drop leading whitespace and, for chat, the bold markers and colon after [CHAT]."""
+        while not self.section_started:
+            trimmed = self.buffer.lstrip()
+            if kind == "chat" and trimmed.startswith("**"):
+                self.buffer = trimmed[2:]
+            elif kind == "chat" and trimmed.startswith(":") and not self.colon_dropped:
+                self.buffer = trimmed[1:]
+                self.colon_dropped = True
+            elif not final and (trimmed == "" or (kind == "chat" and trimmed == "*")):
+                self.buffer = trimmed
+                return
+            else:
+                self.buffer = trimmed
+                self.section_started = True
+
+    def _emit(self, kind: str, text: str, pieces: list) -> None:
+        if text:
+            pieces.append((kind, text))
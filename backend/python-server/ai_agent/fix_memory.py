@@ -0,0 +1,370 @@
+"""
+Persistent memory of fixes, keyed by a normalized error signature (SQLite).
+
+The same Manim failures recur across users and prompts: an unexpected keyword
+argument on Angle, NotImplementedError from Create on a Group, an undefined
+colour name. When code_fixer's change gets a generation past an error, the
+edit it made on the failing line is stored as a small deterministic patch
+(rename a name, drop a keyword argument, replace a piece of the line) under the
+error's signature. The next time that signature shows up, the patch is applied
+locally and the attempt skips the LLM call.
+
+Signatures are the exception type plus its message with addresses, paths and
+numbers masked; exceptions without a message (NotImplementedError) add the
+names called on the failing line. Patches that fail more often than they work
+are forgotten.
+"""
+import ast
+import difflib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+from .preflight import SourceText
+from .tracebacks import parse_traceback
+
+BASE_PATH = Path(__file__).parent.parent
+FIX_MEMORY_DB = Path(os.getenv("FIX_MEMORY_DB", BASE_PATH / "fix_memory.db"))
+# Set to 0 to always ask code_fixer
+FIX_MEMORY_ENABLED = os.getenv("FIX_MEMORY", "1") != "0"
+# Time credited per avoided fixer call until fixer.latency has samples
+FIX_MEMORY_ASSUMED_FIXER_SECONDS = float(os.getenv("FIX_MEMORY_ASSUMED_FIXER_SECONDS", "10"))
+# Longest text a "replace" patch may carry (longer edits are too specific to reuse)
+MAX_PATCH_TEXT = 80
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixes (
+    signature TEXT PRIMARY KEY,
+    patch TEXT NOT NULL,
+    example TEXT NOT NULL,
+    successes INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_TOKEN_RE = re.compile(r"\w+|\S")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+_UNDEFINED_NAME_RE = re.compile(r"name '(\w+)' is not defined")
+
+
+def _normalize_message(message: str) -> str:
+    message = re.sub(r"0x[0-9a-fA-F]+", "0x?", message)
+    message = re.sub(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}", "<path>", message)
+    message = re.sub(r"(?<![\w.])\d+(?:\.\d+)?", "N", message)
+    return re.sub(r"\s+", " ", message).strip()
+
+
+def _called_names(source_line: str) -> list[str]:
+    return sorted(set(re.findall(r"([A-Za-z_]\w*)\s*\(", source_line)))
+
+
+def error_signature(parsed: dict, code: str = "") -> str | None:
+    """
+    Normalized signature of a parsed error (see tracebacks.parse_traceback).
+
+    Args:
+        parsed: The parsed error.
+        code: The code that failed; names called on the failing line stand in
+            for a missing exception message.
+
+    Returns:
+        str | None: e.g. "TypeError: Mobject.__init__() got an unexpected keyword
+        argument 'vertex'" or "NotImplementedError @ Create,play"; None if no
+        exception was recognised.
+    """
+    if not parsed["exc_type"]:
+        return None
+    message = _normalize_message(parsed["message"])
+    if message:
+        return f"{parsed['exc_type']}: {message}"
+    lines = code.splitlines()
+    line = parsed["line"]
+    if line and 0 < line <= len(lines):
+        names = _called_names(lines[line - 1])
+        if names:
+            return f"{parsed['exc_type']} @ {','.join(names)}"
+    return parsed["exc_type"]
+
+
+def _word_bounds(old: str, new: str) -> tuple[int, int]:
+    """Length of the common prefix and suffix of old and new, shrunk to word boundaries."""
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(old), len(new)) - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    while prefix > 0 and (old[prefix - 1].isalnum() or old[prefix - 1] == "_"):
+        prefix -= 1
+    while suffix > 0 and (old[len(old) - suffix].isalnum() or old[len(old) - suffix] == "_"):
+        suffix -= 1
+    return prefix, suffix
+
+
+def derive_patch(failed_code: str, fixed_code: str, parsed: dict) -> dict | None:
+    """
+    Reduce the fixer's edit of the failing line to a reusable patch.
+
+    Args:
+        failed_code: The code that raised the error.
+        fixed_code: The code the fixer returned.
+        parsed: The parsed error (its line is the failing line).
+
+    Returns:
+        dict | None: {"kind": "rename", "old", "new", "scope": "file" | "line"},
+        {"kind": "drop_kwarg", "name"} or {"kind": "replace", "old", "new"};
+        None if the failing line wasn't changed in place (the fix was elsewhere,
+        or the line was split or removed).
+    """
+    line = parsed["line"]
+    old_lines, new_lines = failed_code.splitlines(), fixed_code.splitlines()
+    if not line or line > len(old_lines):
+        return None
+    new_line = None
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if i1 <= line - 1 < i2:
+            if tag == "replace" and i2 - i1 == j2 - j1:
+                new_line = new_lines[j1 + line - 1 - i1]
+            break
+    if new_line is None:
+        return None
+    old_line = old_lines[line - 1]
+
+    old_tokens, new_tokens = _TOKEN_RE.findall(old_line), _TOKEN_RE.findall(new_line)
+    ops = [op for op in difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False).get_opcodes() if op[0] != "equal"]
+    if len(ops) == 1 and ops[0][0] == "replace" and ops[0][2] - ops[0][1] == 1 and ops[0][4] - ops[0][3] == 1:
+        old, new = old_tokens[ops[0][1]], new_tokens[ops[0][3]]
+        if _IDENTIFIER_RE.fullmatch(old) and _IDENTIFIER_RE.fullmatch(new):
+            # An undefined name is undefined everywhere in the file, not just on this line
+            undefined = _UNDEFINED_NAME_RE.search(parsed["message"] or "")
+            scope = "file" if parsed["exc_type"] == "NameError" and undefined and undefined.group(1) == old else "line"
+            return {"kind": "rename", "old": old, "new": new, "scope": scope}
+    if ops and all(op[0] == "delete" for op in ops):
+        removed = old_tokens[ops[0][1]:ops[0][2]]
+        if removed[0] == ",":
+            removed = removed[1:]
+        if len(removed) >= 2 and _IDENTIFIER_RE.fullmatch(removed[0]) and removed[1] == "=":
+            return {"kind": "drop_kwarg", "name": removed[0]}
+
+    prefix, suffix = _word_bounds(old_line, new_line)
+    old, new = old_line[prefix:len(old_line) - suffix], new_line[prefix:len(new_line) - suffix]
+    if not old.strip() or len(old) > MAX_PATCH_TEXT or len(new) > MAX_PATCH_TEXT:
+        return None
+    return {"kind": "replace", "old": old, "new": new}
+
+
+def _drop_kwarg(code: str, name: str, line: int) -> str | None:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    source = SourceText(code)
+    spans = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.lineno <= line <= node.end_lineno:
+            continue
+        for keyword in node.keywords:
+            if keyword.arg != name:
+                continue
+            # Take the comma before the argument with it (or the one after, if it comes first)
+            items = sorted([*node.args, *node.keywords], key=lambda n: (n.lineno, n.col_offset))
+            i = items.index(keyword)
+            if i > 0:
+                spans.append((source.end(items[i - 1]), source.end(keyword)))
+            elif len(items) > 1:
+                spans.append((source.start(keyword), source.start(items[1])))
+            else:
+                spans.append((source.start(keyword), source.end(keyword)))
+    if not spans:
+        return None
+    data = source.data
+    for start, end in sorted(spans, reverse=True):
+        data = data[:start] + data[end:]
+    return data.decode("utf-8")
+
+
+def apply_patch(code: str, patch: dict, line: int | None) -> str | None:
+    """
+    Apply a patch from derive_patch() to code that failed at line.
+
+    Returns:
+        str | None: The patched code, or None if the patch doesn't apply here.
+    """
+    lines = code.splitlines(keepends=True)
+    if patch["kind"] == "rename" and patch["scope"] == "file":
+        pattern = rf"\b{re.escape(patch['old'])}\b"
+        return re.sub(pattern, patch["new"], code) if re.search(pattern, code) else None
+    if not line or line > len(lines):
+        return None
+    if patch["kind"] == "drop_kwarg":
+        return _drop_kwarg(code, patch["name"], line)
+    target = lines[line - 1]
+    if patch["kind"] == "rename":
+        pattern = rf"\b{re.escape(patch['old'])}\b"
+        if not re.search(pattern, target):
+            return None
+        lines[line - 1] = re.sub(pattern, patch["new"], target)
+    elif patch["kind"] == "replace":
+        if patch["old"] not in target:
+            return None
+        lines[line - 1] = target.replace(patch["old"], patch["new"], 1)
+    else:
+        return None
+    return "".join(lines)
+
+
+class FixMemory:
+    """
+    Signature -> patch table shared by every process that opens the same file.
+
+    Args:
+        path: Database file.
+    """
+
+    def __init__(self, path: Path = FIX_MEMORY_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def lookup(self, signature: str) -> dict | None:
+        row = self._db.execute("SELECT patch FROM fixes WHERE signature = ?", (signature,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def remember(self, signature: str, patch: dict, example: str = "") -> None:
+        """Store the patch that fixed signature (replacing an older one)."""
+        self._db.execute(
+            """INSERT INTO fixes (signature, patch, example, successes, failures, updated_at) VALUES (?, ?, ?, 1, 0, ?)
+               ON CONFLICT (signature) DO UPDATE SET
+                   successes = CASE WHEN patch = excluded.patch THEN successes + 1 ELSE 1 END,
+                   failures = CASE WHEN patch = excluded.patch THEN failures ELSE 0 END,
+                   patch = excluded.patch, example = excluded.example, updated_at = excluded.updated_at""",
+            (signature, json.dumps(patch, sort_keys=True), example, time.time()),
+        )
+
+    def outcome(self, signature: str, ok: bool) -> None:
+        """Count whether an applied patch got past its error; forget patches that fail more than they work."""
+        column = "successes" if ok else "failures"
+        self._db.execute(f"UPDATE fixes SET {column} = {column} + 1, updated_at = ? WHERE signature = ?", (time.time(), signature))
+        self._db.execute("DELETE FROM fixes WHERE signature = ? AND failures > successes", (signature,))
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM fixes").fetchone()[0]
+
+    def entries(self) -> list[dict]:
+        rows = self._db.execute("SELECT signature, patch, example, successes, failures FROM fixes ORDER BY successes DESC").fetchall()
+        return [
+            {"signature": s, "patch": json.loads(p), "example": e, "successes": ok, "failures": bad}
+            for s, p, e, ok, bad in rows
+        ]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_memory: FixMemory | None = None
+_memory_lock = threading.Lock()
+
+
+def get_memory() -> FixMemory:
+    """The fix memory at FIX_MEMORY_DB, opened on first use."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = FixMemory()
+        return _memory
+
+
+def recall(code: str, error_text: str, history: list[dict], line: int | None = None) -> str | None:
+    """
+    Patch code with the remembered fix for its error, before any LLM call.
+
+    Args:
+        code: The code that failed.
+        error_text: Its stderr/stdout.
+        history: This generation's attempts so far; a remembered patch that was
+            already tried for the same signature isn't tried again.
+        line: Failing line when already known.
+
+    Returns:
+        str | None: The patched code, or None (no memory, or it doesn't apply).
+    """
+    if not FIX_MEMORY_ENABLED:
+        return None
+    parsed = parse_traceback(error_text)
+    parsed["line"] = parsed["line"] or line
+    signature = error_signature(parsed, code)
+    if signature is None:
+        return None
+    metrics.incr("fix_memory.lookups")
+    if any(h.get("source") == "memory" and h.get("signature") == signature for h in history):
+        metrics.incr("fix_memory.misses")
+        return None
+    patch = get_memory().lookup(signature)
+    patched = apply_patch(code, patch, parsed["line"]) if patch else None
+    if not patched or patched == code:
+        metrics.incr("fix_memory.misses")
+        return None
+    metrics.incr("fix_memory.hits")
+    print(f"Fix memory hit for {signature!r}: applied {patch}")
+    return patched
+
+
+def learn(history: list[dict], final_error: str | None = None, final_code: str = "") -> None:
+    """
+    Update the memory from a finished generation's attempts (repair.record_attempt entries).
+
+    An attempt's change counts as a fix if the next attempt didn't fail with the
+    same signature. Fixer changes that worked are remembered; remembered patches
+    that were applied have their outcome counted.
+
+    Args:
+        history: The attempts, oldest first.
+        final_error: Error of the last attempt, or None if it succeeded.
+        final_code: Code of the last attempt (for signatures of errors without a message).
+    """
+    if not FIX_MEMORY_ENABLED or not history:
+        return
+    final_signature = error_signature(parse_traceback(final_error), final_code) if final_error else None
+    memory = get_memory()
+    for i, attempt in enumerate(history):
+        signature = attempt.get("signature")
+        if signature is None:
+            continue
+        next_signature = history[i + 1].get("signature") if i + 1 < len(history) else final_signature
+        fixed = next_signature != signature
+        try:
+            if attempt.get("source") == "memory":
+                memory.outcome(signature, fixed)
+                if fixed:
+                    fixer_latency = metrics.snapshot()["timings"].get("fixer.latency")
+                    metrics.incr("fix_memory.seconds_saved", fixer_latency["mean"] if fixer_latency else FIX_MEMORY_ASSUMED_FIXER_SECONDS)
+                else:
+                    metrics.incr("fix_memory.patch_failed")
+            elif fixed and attempt.get("patch"):
+                memory.remember(signature, attempt["patch"], attempt["error"])
+                metrics.incr("fix_memory.learned")
+        except sqlite3.Error as e:
+            print(f"Fix memory update failed for {signature!r}: {e}")
+
+
+def stats() -> dict:
+    hits = metrics.counter("fix_memory.hits")
+    lookups = metrics.counter("fix_memory.lookups")
+    return {
+        "enabled": FIX_MEMORY_ENABLED,
+        "entries": get_memory().count() if FIX_MEMORY_ENABLED else 0,
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "patch_failed": metrics.counter("fix_memory.patch_failed"),
+        "seconds_saved": metrics.counter("fix_memory.seconds_saved"),
+    }
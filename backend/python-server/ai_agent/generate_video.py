@@ -1,61 +1,56 @@
 from . import suppress_warning
-from google.adk.sessions import DatabaseSessionService
-from google.adk.runners import Runner
-from .agent import root_agent, code_fixer
+from .agent import root_agent, multi_scene_root_agent
 from google.genai.types import Content, Part
 from dotenv import load_dotenv
-import subprocess
 import shutil
-import sys
 import os
 import re
-import base64
 from pathlib import Path
-from .tools.filesystem import write_file
+from . import render_cache
+from .render_pool import job_workspace, new_job_id, write_scene, find_rendered_video, animation_cache_stats
+from . import fix_memory
+from . import metrics
+from . import progress
+from .renderers import get_renderer
+from .pipeline import llm_slot
+from .preflight import preflight
+from .repair import fix_attempt, scene_names_for
+from .sessions import get_runner, get_session_service
 
 load_dotenv() 
 
-async def generate_video(user_message, generation_id: str | None = None, code_content: str | None = None, retry_count: int = 0, error_history: list | None = None):
+# Run construct() without rendering before every full render (set to 0 to disable)
+DRY_RUN_BEFORE_RENDER = os.getenv("DRY_RUN_BEFORE_RENDER", "1") != "0"
+
+async def write_code(user_message: str, generation_id: str | None = None, render_mode: str = "single") -> tuple[str, str | None]:
     """
-    Generate video from user message or use existing code content.
-    
+    Run the script and code writer agents for a prompt (the pipeline's LLM stage).
+
     Args:
         user_message: User's message/prompt
-        generation_id: Optional generation ID for tracking
-        code_content: Optional existing code content to use instead of generating new code
-        retry_count: Current retry attempt number
+        generation_id: Optional generation ID for progress events
+        render_mode: "multi_scene" uses the one-class-per-scene code writer
+
+    Returns:
+        tuple: (the code writer's final response, script_writer's storyboard)
     """
     app_name = "my_agent_app"
     user_id = "user123"
-    max_retries = 4
-    
-    if error_history is None:
-        error_history = []
-
-    # If code_content is provided, use it directly instead of generating new code
-    if code_content:
-        print("Using provided code content instead of generating new code")
-        final_response = code_content
-    else:
-        # Initialize the session service with a database URL
-        db_url = "sqlite:///./my_agent_data.db"
-        session_service = DatabaseSessionService(db_url=db_url)
-        session = await session_service.create_session(
-                app_name=app_name,
-                user_id=user_id
-            )
-        runner = Runner(
-                agent=root_agent,
-                app_name=app_name,
-                session_service=session_service
-            )
-
-        user_message = Content(role='user', parts=[Part(text=user_message)])
+    progress.publish(generation_id, message="Writing the storyboard and code...", progress=10)
+    # Shared session service and runner (see sessions.py)
+    session = await get_session_service().create_session(
+            app_name=app_name,
+            user_id=user_id
+        )
+    runner = get_runner(multi_scene_root_agent if render_mode == "multi_scene" else root_agent, app_name)
 
+    final_response = ""
+    new_message = Content(role='user', parts=[Part(text=user_message)])
+    async with llm_slot():
         async for event in runner.run_async(
-                                user_id=user_id, 
-                                session_id=session.id, 
-                                new_message=user_message
+                                user_id=user_id,
+                                session_id=session.id,
+                                new_message=new_message
                             ):
             if event.is_final_response():
                 if (
@@ -65,234 +60,182 @@ async def generate_video(user_message, generation_id: str | None = None, code_co
                     and event.content.parts[0].text
                 ):
                     final_response = event.content.parts[0].text.strip()
-        await runner.close()
+    session = await get_session_service().get_session(app_name=app_name, user_id=user_id, session_id=session.id)
+    storyboard = session.state.get("storyboard") if session else None
+    return final_response, storyboard
 
-    # removing ```python and ``` if present
-    if final_response.startswith("```python"):
-        final_response = final_response[len("```python"):].strip()
-    if final_response.endswith("```"):
-        final_response = final_response[:-len("```")].strip()
 
-    # Remove HTML/JSX/UI tokens that might have leaked into the code
-    # Remove patterns like <400">, <span class=...>, text-purple-400, etc.
-    try:
-        # Remove common HTML/JSX tags that might leak from AI responses
-        final_response = re.sub(r'<(span|div|b|i|style|class)[^>]*>.*?</\1>', '', final_response, flags=re.DOTALL)
-        final_response = re.sub(r'<(span|div|b|i|style|class)[^>]*>', '', final_response)
-        final_response = re.sub(r'</(span|div|b|i|style|class)>', '', final_response)
-        final_response = re.sub(r'class\s*=\s*["\'][^"\']*["\']', '', final_response)
-        final_response = re.sub(r'["\']text-[a-z]+-\d+["\']|["\']font-[a-z]+["\']', '', final_response)
-        final_response = re.sub(r'<400">|400">', '', final_response)
-        final_response = re.sub(r'\n\s*\n\s*\n', '\n\n', final_response)
-    except Exception:
-        pass
+async def generate_video(user_message, generation_id: str | None = None, code_content: str | None = None, retry_count: int = 0, error_history: list | None = None, render_mode: str = "single", job_id: str | None = None, checked_dry_runs: list | None = None):
+    """
+    Generate video from user message or use existing code content.
+    
+    Args:
+        user_message: User's message/prompt
+        generation_id: Optional generation ID for tracking
+        code_content: Optional existing code content to use instead of generating new code
+        retry_count: Current retry attempt number
+        render_mode: "single" renders the first Scene class; "multi_scene" asks the code
+            writer for one class per storyboard scene, renders every Scene class in
+            parallel and stitches the clips together; "sharded" renders disjoint
+            animation ranges of one long scene in parallel and stitches those
+        job_id: Workspace to render in; fixer retries reuse the first attempt's workspace
+            so manim's partial movie cache carries over between attempts
+        checked_dry_runs: Dry runs code_content already passed as a fixer candidate;
+            the render reuses them instead of dry-running the same code again
+    """
+    max_retries = 4
+    
+    if error_history is None:
+        error_history = []
 
-    # Replace LaTeX-based objects with plain Text to avoid LaTeX toolchain requirement
-    try:
-        # Convert direct calls
-        sanitized_response = re.sub(r"\b(Math)?Tex\(", "Text(", final_response)
-        
-        # Convert common LaTeX symbols to Unicode so they look decent in Text()
-        latex_to_unicode = {
-            r"\\sigma": "σ", r"\\alpha": "α", r"\\beta": "β", r"\\gamma": "γ",
-            r"\\theta": "θ", r"\\pi": "π", r"\\Sigma": "Σ", r"\\Delta": "Δ",
-            r"\\infty": "∞", r"\\rightarrow": "→", r"\\otimes": "⊗", r"\\cdot": "·",
-            r"\\dots": "...", r"\\cdots": "..."
-        }
-        for lat, uni in latex_to_unicode.items():
-            sanitized_response = sanitized_response.replace(lat, uni)
-            
-        # Ensure Axes use Text as label_constructor to avoid hidden LaTeX calls
-        # If 'Axes(' exists but 'label_constructor' doesn't, inject it into the first line
-        if "Axes(" in sanitized_response and "label_constructor" not in sanitized_response:
-            sanitized_response = re.sub(r"Axes\(", "Axes(label_constructor=Text, ", sanitized_response)
-            
-    except Exception:
-        sanitized_response = final_response
+    # If code_content is provided, use it directly instead of generating new code
+    if code_content:
+        print("Using provided code content instead of generating new code")
+        final_response = code_content
+    else:
+        final_response, _ = await write_code(user_message, generation_id, render_mode)
 
-    # Remove unsupported Manim Angle(...) keyword args like vertex=... that cause TypeError
-    # Example error: TypeError: Mobject.__init__() got an unexpected keyword argument 'vertex'
-    try:
-        # Remove occurrences of "vertex=<anything>" within function arg lists
-        # Pass 1: drop the vertex assignment
-        sanitized_response = re.sub(r"\bvertex\s*=\s*[^,\)]+", "", sanitized_response)
-        # If Angle(...) contains a positional numeric radius (3rd arg) AND also radius=..., drop the positional one
-        # Restrict to Angle(...) to avoid touching other calls
-        sanitized_response = re.sub(
-            r"(Angle\s*\([^,]*,[^,]*)(,\s*[^,\)]+)(?=\s*,[^)]*\bradius\s*=)",
-            r"\1",
-            sanitized_response,
-        )
-        # Cleanup any doubled commas created by the removal
-        sanitized_response = re.sub(r",\s*,", ", ", sanitized_response)
-        # Cleanup '(', comma spacing issues
-        sanitized_response = re.sub(r"\(\s*,", "(", sanitized_response)
-        sanitized_response = re.sub(r",\s*\)", ")", sanitized_response)
-    except Exception:
-        pass
+    # One parse of the code finds and rewrites the known Manim failure classes
+    # (Tex/MathTex, CYAN/MAGENTA, Create on Group, Angle(vertex=...), Axes labels)
+    # and strips leaked markup, instead of a chain of whole-file regexes
+    preflight_report = preflight(final_response)
+    sanitized_response = preflight_report["code"]
+    if preflight_report["rules"]:
+        print(f"Preflight rewrote code for {generation_id} in {preflight_report['elapsed_ms']:.1f} ms: {preflight_report['rules']}")
 
-    # Build dynamic path
-    scenes_path = Path(__file__).parent.parent / "manim_generated_files" / "scenes.py"
-    
-    # Ensure the directory exists
-    scenes_path.parent.mkdir(parents=True, exist_ok=True)
+    # Each generation renders from its own scene file and media directory so
+    # concurrent jobs can't clobber each other's scenes.py or output videos. The
+    # directory stays the same across retries, so manim only re-renders the
+    # animations a fix actually changed.
+    job_id = job_id or generation_id or new_job_id()
+    scenes_path, job_media_dir = job_workspace(job_id)
+    progress.publish(generation_id, message="Code ready, checking it...", progress=30)
 
-    # Validate Python syntax before writing
+    # Validate Python syntax before writing (preflight already parsed the code)
     try:
-        compile(sanitized_response, '<string>', 'exec')
+        if preflight_report["error"] is not None:
+            raise preflight_report["error"]
     except SyntaxError as e:
         # If we exceeded retries, fail
         if retry_count >= max_retries:
             error_msg = f"Generated code has syntax errors after {retry_count} retries:\nLine {e.lineno}: {e.msg}\n{e.text}"
             print(f"Syntax error in generated code: {error_msg}")
+            fix_memory.learn(error_history, f"SyntaxError: {e.msg}", sanitized_response)
             raise RuntimeError(f"Invalid Python code generated: {error_msg}")
         else:
             print(f"Syntax error detected (attempt {retry_count + 1}), initiating code repair...")
             error_context = f"SyntaxError at line {e.lineno}: {e.msg}\nContext: {e.text}"
             
-            # Call fixer agent
-            history_str = "\n".join([f"ATTEMPT {h['attempt']} ERROR:\n{h['error']}\nCODE:\n{h['code']}\n{'-'*20}" for h in error_history])
-            fixer_input = f"HISTORY OF FAILED ATTEMPTS:\n{history_str}\n\nCURRENT FAILED CODE:\n{sanitized_response}\n\nCURRENT ERROR:\n{error_context}"
-            
-            # Initialize session for fixer
-            db_url = "sqlite:///./my_agent_data.db"
-            session_service = DatabaseSessionService(db_url=db_url)
-            
-            fixer_session_id = f"fixer_syntax_{generation_id}" if generation_id else "code_fixer_session"
-            try:
-                session = await session_service.create_session(app_name="code_fixer_app", user_id="system", session_id=fixer_session_id)
-            except Exception:
-                # Session might already exist from a previous retry attempt
-                pass
-            runner = Runner(agent=code_fixer, app_name="code_fixer_app", session_service=session_service)
-            
-            fixed_code = ""
-            fixer_msg = Content(role='user', parts=[Part(text=fixer_input)])
-            
-            async for event in runner.run_async(user_id="system", session_id=fixer_session_id, new_message=fixer_msg):
-                if event.is_final_response():
-                    if event.content and event.content.parts and event.content.parts[0].text:
-                        fixed_code = event.content.parts[0].text.strip()
-            
-            await runner.close()
+            # Remembered fix for this error, else the fixer agent (earlier attempts are summarized as error + diff).
+            # The prompt carries the history itself, so each attempt starts a fresh fixer session
+            fixer_session_id = f"fixer_syntax_{generation_id}_{retry_count}" if generation_id else f"code_fixer_session_{retry_count}"
+            fixed_code, attempt = await fix_attempt(sanitized_response, error_context, error_history, fixer_session_id, render_mode, job_id, line=e.lineno)
             
             if fixed_code:
-                print(f"Received fixed code from agent for syntax error, retrying (count {retry_count + 1})...")
-                error_history.append({"attempt": retry_count + 1, "code": sanitized_response, "error": error_context})
-                return await generate_video(user_message, generation_id=generation_id, code_content=fixed_code, retry_count=retry_count + 1, error_history=error_history)
+                print(f"Received fixed code from {attempt['source']} for syntax error, retrying (count {retry_count + 1})...")
+                error_history.append(attempt)
+                return await generate_video(user_message, generation_id=generation_id, code_content=fixed_code, retry_count=retry_count + 1, error_history=error_history, render_mode=render_mode, job_id=job_id)
             else:
                 error_msg = f"Generated code has syntax errors and fixer failed:\nLine {e.lineno}: {e.msg}\n{e.text}"
                 raise RuntimeError(f"Invalid Python code generated: {error_msg}")
 
-    written = write_file(path=str(scenes_path), content=sanitized_response)
-    if not written:
-        raise RuntimeError(f"Failed to write Manim scene to {scenes_path}")
-    
-    # Ensure any referenced images exist to avoid Manim FileNotFoundError
-    try:
-        img_names = set(re.findall(r"ImageMobject\((?:\\\"|\')([^\"']+)(?:\\\"|\')\)", sanitized_response))
-        if img_names:
-            # 1x1 transparent PNG
-            tiny_png_b64 = (
-                b"iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAEElEQVR42mP8/5+hHgAHGgK8N1d9WwAAAABJRU5ErkJggg=="
-            )
-            png_bytes = base64.b64decode(tiny_png_b64)
-            for name in img_names:
-                candidates = []
-                p_name = Path(name)
-                # Candidate 1: CWD/name
-                candidates.append(Path.cwd() / p_name)
-                # Candidate 2: alongside scenes.py
-                candidates.append(scenes_path.parent / p_name)
-                for candidate in candidates:
-                    try:
-                        candidate.parent.mkdir(parents=True, exist_ok=True)
-                        if not candidate.exists():
-                            with open(candidate, "wb") as f:
-                                f.write(png_bytes)
-                            print(f"Created placeholder image: {candidate}")
-                        else:
-                            print(f"Image already exists: {candidate}")
-                    except Exception as ie:
-                        print(f"Failed creating placeholder at {candidate}: {ie}")
-    except Exception as e:
-        print(f"Warning: Could not ensure placeholder images: {e}")
-    
-    # Ensure ffmpeg is available (Manim depends on it)
-    ffmpeg_path = shutil.which("ffmpeg")
-    if not ffmpeg_path:
-        raise RuntimeError(
-            "ffmpeg not found on PATH. Please install ffmpeg and ensure it's available on PATH.\n"
-            "Windows (choco): choco install ffmpeg\n"
-            "Windows (scoop): scoop install ffmpeg\n"
-            "Or download from https://ffmpeg.org/download.html and add bin to PATH."
-        )
+    # Scene class to render (first Scene subclass, fallback 'Introduce'); in
+    # multi-scene mode every Scene subclass becomes its own parallel render job
+    scene_names = scene_names_for(sanitized_response, render_mode)
+    scene_name = "+".join(scene_names)
 
-    # Determine scene class name dynamically (fallback to 'Introduce')
-    scene_name = "Introduce"
-    try:
-        m = re.search(r"class\s+([A-Za-z_]\w*)\s*\(\s*Scene\s*\)", sanitized_response)
-        if m:
-            scene_name = m.group(1)
-    except Exception:
-        pass
+    # Same normalized code, quality and scene as an earlier render: reuse its video
+    quality = "l"
+    cache_key = render_cache.cache_key(sanitized_response, quality, scene_name)
+    cached_video = render_cache.lookup(cache_key)
+    if cached_video:
+        media_videos_root = Path(__file__).parent.parent / "media" / "videos"
+        media_videos_root.mkdir(parents=True, exist_ok=True)
+        target = media_videos_root / f"{generation_id or scene_name}.mp4"
+        shutil.copyfile(cached_video, target)
+        print(f"Render cache hit for {generation_id}: {cached_video}")
+        fix_memory.learn(error_history)
+        return {
+            "message": final_response,
+            "video_filename": target.name,
+            "video_url": f"/media/videos/{target.name}",
+            "scene_name": scene_name,
+            "cache_hit": True,
+            "preflight_rules": preflight_report["rules"],
+        }
+
+    write_scene(scenes_path, sanitized_response)
 
-    cmd = [
-        sys.executable, "-m", "manim", "-ql",
-        str(scenes_path),
-        scene_name
-    ]
+    # Dry run + render on the configured backend (in-process, local pool or remote workers)
+    stitched_path = job_media_dir / "videos" / "stitched" / f"{job_id}.mp4"
+    tracker = progress.RenderProgress(generation_id, None)
 
-    # run and capture output (inject FFMPEG_BINARY to be explicit)
-    env = os.environ.copy()
-    env["FFMPEG_BINARY"] = ffmpeg_path
-    result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    def on_dry_run(dry_runs: list[dict]) -> None:
+        # The dry run's play()/wait() counts give the render a denominator for live progress
+        tracker.total = sum(d["num_plays"] or 0 for d in dry_runs) or None
+        if any(not d["ok"] for d in dry_runs):
+            print(f"Dry run failed for {generation_id}; skipping the full render")
+        elif len(scene_names) > 1:
+            print(f"Rendering {len(scene_names)} scenes in parallel for {generation_id}: {scene_names}")
+            progress.publish(generation_id, message=f"Rendering {len(scene_names)} scenes...", progress=tracker.start)
+        elif render_mode == "sharded":
+            progress.publish(generation_id, message="Rendering shards...", progress=tracker.start)
+        else:
+            progress.publish(generation_id, message="Rendering video...", progress=tracker.start)
+
+    result, render_report = await get_renderer().render(
+        {
+            "job_id": job_id,
+            "generation_id": generation_id,
+            "code": sanitized_response,
+            "scene_file": str(scenes_path),
+            "scene_names": scene_names,
+            "media_dir": str(job_media_dir),
+            "output": str(stitched_path),
+            "render_mode": render_mode,
+            "quality": quality,
+            "dry_run": DRY_RUN_BEFORE_RENDER,
+            "checked_dry_runs": checked_dry_runs,
+        },
+        on_line=tracker.feed,
+        on_dry_run=on_dry_run,
+    )
+    render_timing = render_report.get("timing")
+    if render_timing:
+        print(f"Sharded render timing for {generation_id}: {render_timing}")
+    animation_cache = animation_cache_stats(result.stdout)
+    metrics.incr("render.animations_cached", animation_cache["cached"])
+    metrics.incr("render.animations_rendered", animation_cache["rendered"])
+    print(f"Partial movie cache for {generation_id} (attempt {retry_count + 1}): {animation_cache}")
     if result.returncode != 0:
         # If we exceeded retries, fail
         if retry_count >= max_retries:
             print(f"Manim failed after {retry_count} retries for {generation_id}")
         else:
             print(f"Manim failed (attempt {retry_count + 1}), initiating code repair for {generation_id}...")
+            progress.publish(generation_id, message=f"Render failed, fixing the code (attempt {retry_count + 1})...", progress=30, eta_seconds=None)
             
             # Extract error for the fixer
             error_context = result.stderr if result.stderr else result.stdout
             
-            # Call fixer agent
-            history_str = "\n".join([f"ATTEMPT {h['attempt']} ERROR:\n{h['error']}\nCODE:\n{h['code']}\n{'-'*20}" for h in error_history])
-            fixer_input = f"HISTORY OF FAILED ATTEMPTS:\n{history_str}\n\nCURRENT FAILED CODE:\n{sanitized_response}\n\nCURRENT ERROR:\n{error_context}"
-            
-            # Initialize session for fixer (simplified)
-            db_url = "sqlite:///./my_agent_data.db"
-            session_service = DatabaseSessionService(db_url=db_url)
-            
-            # Use a consistent session ID for the fixer to maintain context if possible
-            fixer_session_id = f"fixer_{generation_id}" if generation_id else "code_fixer_session"
-            try:
-                session = await session_service.create_session(app_name="code_fixer_app", user_id="system", session_id=fixer_session_id)
-            except Exception:
-                # Session might already exist from a previous retry attempt
-                pass
-            runner = Runner(agent=code_fixer, app_name="code_fixer_app", session_service=session_service)
-            
-            fixed_code = ""
-            fixer_msg = Content(role='user', parts=[Part(text=fixer_input)])
-            
-            async for event in runner.run_async(user_id="system", session_id=fixer_session_id, new_message=fixer_msg):
-                if event.is_final_response():
-                    if event.content and event.content.parts and event.content.parts[0].text:
-                        fixed_code = event.content.parts[0].text.strip()
-            
-            await runner.close()
+            # A known error signature gets its remembered patch locally; otherwise the fixer agent
+            # gets the parsed traceback + code window, earlier attempts as error + diff.
+            # The prompt carries the history itself, so each attempt starts a fresh fixer session
+            # (replaying earlier attempts' full prompts would undo the compact history)
+            fixer_session_id = f"fixer_{generation_id}_{retry_count}" if generation_id else f"code_fixer_session_{retry_count}"
+            # With FIXER_CANDIDATES > 1, several fixes race through preflight + dry run
+            fixed_code, attempt = await fix_attempt(sanitized_response, error_context, error_history, fixer_session_id, render_mode, job_id)
             
             if fixed_code:
-                print(f"Received fixed code from agent, retrying (count {retry_count + 1})...")
-                error_history.append({"attempt": retry_count + 1, "code": sanitized_response, "error": error_context})
-                return await generate_video(user_message, generation_id=generation_id, code_content=fixed_code, retry_count=retry_count + 1, error_history=error_history)
+                print(f"Received fixed code from {attempt['source']}, retrying (count {retry_count + 1})...")
+                error_history.append(attempt)
+                return await generate_video(user_message, generation_id=generation_id, code_content=fixed_code, retry_count=retry_count + 1, error_history=error_history, render_mode=render_mode, job_id=job_id, checked_dry_runs=attempt.get("checked_dry_runs"))
             else:
                 print("Fixer agent returned empty response.")
 
         # If we reach here, either retry failed or fixer failed
         print("stderr:\n", result.stderr)
+        fix_memory.learn(error_history, result.stderr or result.stdout, sanitized_response)
         
         # Extract the actual error message (skip warnings)
         error_lines = []
@@ -343,26 +286,28 @@ async def generate_video(user_message, generation_id: str | None = None, code_co
         media_videos_root.mkdir(parents=True, exist_ok=True)
         found_video: Path | None = None
 
-        # Prefer parsing the exact path from manim stdout
+        # Prefer parsing the exact path from manim stdout (the last one wins: stitched
+        # renders report every clip first and the joined video at the end)
         try:
-            m_out = re.search(r"File ready at\s+'([^']+\.mp4)'", result.stdout)
-            if m_out:
-                cand = Path(m_out.group(1))
+            ready_paths = re.findall(r"File ready at\s+'([^']+\.mp4)'", result.stdout)
+            if ready_paths:
+                cand = Path(ready_paths[-1])
                 if cand.exists():
                     found_video = cand
         except Exception:
             pass
 
-        # Fallback: Search common manim output structure for the scene .mp4
+        # Fallback: Search the job's own media directory for the scene .mp4
+        if not found_video and stitched_path.exists():
+            found_video = stitched_path
         if not found_video:
             try:
-                for p in (media_videos_root / "scenes").glob(f"**/{scene_name}.mp4"):
-                    found_video = p
-                    break
+                found_video = find_rendered_video(job_media_dir, scene_name)
             except Exception:
                 found_video = None
 
         if found_video and found_video.exists():
+            render_cache.store(cache_key, found_video)
             if generation_id:
                 target = media_videos_root / f"{generation_id}.mp4"
             else:
@@ -384,10 +329,15 @@ async def generate_video(user_message, generation_id: str | None = None, code_co
                 "video_filename": rel_name,
                 "video_url": f"/media/videos/{rel_name}",
                 "scene_name": scene_name,
+                "scenes": scene_names,
+                "animation_cache": animation_cache,
+                "preflight_rules": preflight_report["rules"],
             }
+            if render_timing:
+                video_info["render_timing"] = render_timing
             print(f"Video info set: {video_info}")
         else:
-            print(f"Warning: Video file not found. Searched for scene '{scene_name}' in {media_videos_root}")
+            print(f"Warning: Video file not found. Searched for scene '{scene_name}' in {job_media_dir}")
             # Try one more search in the current directory structure
             if generation_id:
                 potential_path = media_videos_root / f"{generation_id}.mp4"
@@ -401,6 +351,9 @@ async def generate_video(user_message, generation_id: str | None = None, code_co
     except Exception:
         pass
 
+    # The render got through: each fix on the way is remembered for the next time its error appears
+    fix_memory.learn(error_history)
+
     # Return structured result for the caller
     return {
         "message": final_response,
@@ -0,0 +1,187 @@
+"""
+Bounded conversation history for the agents' prompts.
+
+Every turn on an existing session replays the whole event history, including
+earlier storyboards and full code listings, through script_writer and
+code_writer. compact_history runs as a before_model_callback and rewrites the
+outgoing request (the stored session is untouched):
+
+    - the last HISTORY_KEEP_TURNS user turns are sent verbatim
+    - in older turns, fenced code becomes a one-line placeholder with a content hash
+      and other long texts (storyboards, earlier answers) are cut to a short excerpt
+    - if the prompt is still over HISTORY_MAX_PROMPT_TOKENS, the oldest turns are
+      dropped (the current turn is always kept)
+
+Prompt sizes before/after are recorded per session (GET /sessions/{id}/prompt-stats)
+and in aggregate in /metrics.
+"""
+import hashlib
+import os
+import re
+
+from google.genai import types
+
+from . import metrics
+
+HISTORY_KEEP_TURNS = max(1, int(os.getenv("HISTORY_KEEP_TURNS", "3")))
+HISTORY_MAX_PROMPT_TOKENS = int(os.getenv("HISTORY_MAX_PROMPT_TOKENS", "24000"))
+# Older texts longer than this are cut to an excerpt of this many characters
+HISTORY_SUMMARY_CHARS = int(os.getenv("HISTORY_SUMMARY_CHARS", "400"))
+# Per-session stats kept for /metrics (oldest sessions are forgotten first)
+MAX_TRACKED_SESSIONS = 1000
+
+# Rough size of a Gemini token for English text and code
+CHARS_PER_TOKEN = 4
+CONTEXT_PREFIX = "For context:"
+
+_CODE_BLOCK_RE = re.compile(r"```[a-zA-Z]*\n(.*?)```", re.DOTALL)
+
+_session_stats: dict[str, dict] = {}
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    chars = 0
+    for content in contents:
+        for part in content.parts or ():
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call or part.function_response:
+                chars += len(str(part.function_call or part.function_response))
+    return chars // CHARS_PER_TOKEN
+
+
+def _is_turn_start(content: types.Content) -> bool:
+    """A message typed by the user, as opposed to another agent's output replayed as context."""
+    if content.role != "user" or not content.parts:
+        return False
+    first = content.parts[0]
+    if first.function_response:
+        return False
+    return not (first.text or "").startswith(CONTEXT_PREFIX)
+
+
+def split_turns(contents: list[types.Content]) -> list[list[types.Content]]:
+    """Group contents into turns, each starting with a user message."""
+    turns: list[list[types.Content]] = []
+    for content in contents:
+        if _is_turn_start(content) or not turns:
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _code_placeholder(match: re.Match) -> str:
+    code = match.group(1)
+    digest = hashlib.sha256(code.encode("utf-8")).hexdigest()[:12]
+    return f"[earlier code omitted: {len(code.splitlines())} lines, sha256 {digest}]"
+
+
+def compact_text(text: str) -> str:
+    """Shrink a text from an older turn: code blocks become hashes, long prose an excerpt."""
+    compacted = _CODE_BLOCK_RE.sub(_code_placeholder, text)
+    if len(compacted) > HISTORY_SUMMARY_CHARS:
+        omitted = len(compacted) - HISTORY_SUMMARY_CHARS
+        compacted = f"{compacted[:HISTORY_SUMMARY_CHARS].rstrip()} [... {omitted} more characters omitted]"
+    return compacted
+
+
+def _compact_content(content: types.Content) -> tuple[types.Content, int]:
+    parts = []
+    changed = 0
+    for part in content.parts or ():
+        if part.text and not part.thought:
+            compacted = compact_text(part.text)
+            if compacted != part.text:
+                changed += 1
+                part = types.Part(text=compacted)
+        parts.append(part)
+    return types.Content(role=content.role, parts=parts), changed
+
+
+def compact_contents(contents: list[types.Content], keep_turns: int = HISTORY_KEEP_TURNS, max_tokens: int = HISTORY_MAX_PROMPT_TOKENS) -> tuple[list[types.Content], dict]:
+    """
+    Apply the history policy to a request's contents.
+
+    Args:
+        contents: The request contents, oldest first.
+        keep_turns: Most recent user turns to keep verbatim.
+        max_tokens: Approximate prompt token budget for the contents.
+
+    Returns:
+        tuple: The new contents and a report with turns, compacted_parts,
+        dropped_turns, tokens_before and tokens_after.
+    """
+    tokens_before = estimate_tokens(contents)
+    turns = split_turns(contents)
+    old, recent = turns[:-keep_turns], turns[-keep_turns:]
+
+    compacted_parts = 0
+    compacted_old = []
+    for turn in old:
+        new_turn = []
+        for content in turn:
+            new_content, changed = _compact_content(content)
+            new_turn.append(new_content)
+            compacted_parts += changed
+        compacted_old.append(new_turn)
+
+    # Over budget: drop whole turns from the front (keeps user/model alternation intact)
+    kept = compacted_old + recent
+    dropped_turns = 0
+    while len(kept) > 1 and estimate_tokens([c for turn in kept for c in turn]) > max_tokens:
+        kept.pop(0)
+        dropped_turns += 1
+
+    new_contents = [c for turn in kept for c in turn]
+    report = {
+        "turns": len(turns),
+        "compacted_parts": compacted_parts,
+        "dropped_turns": dropped_turns,
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(new_contents),
+    }
+    return new_contents, report
+
+
+def _record(session_id: str | None, agent_name: str, report: dict) -> None:
+    metrics.observe("history.prompt_tokens", report["tokens_after"])
+    metrics.incr("history.tokens_saved", report["tokens_before"] - report["tokens_after"])
+    metrics.incr("history.compacted_parts", report["compacted_parts"])
+    metrics.incr("history.dropped_turns", report["dropped_turns"])
+    if not session_id:
+        return
+    stats = _session_stats.pop(session_id, None) or {"requests": 0, "max_tokens_before": 0, "max_tokens_after": 0}
+    stats["requests"] += 1
+    stats["last_agent"] = agent_name
+    stats["turns"] = report["turns"]
+    stats["last_tokens_before"] = report["tokens_before"]
+    stats["last_tokens_after"] = report["tokens_after"]
+    stats["max_tokens_before"] = max(stats["max_tokens_before"], report["tokens_before"])
+    stats["max_tokens_after"] = max(stats["max_tokens_after"], report["tokens_after"])
+    _session_stats[session_id] = stats  # re-insert so dict order tracks recency
+    while len(_session_stats) > MAX_TRACKED_SESSIONS:
+        _session_stats.pop(next(iter(_session_stats)))
+
+
+def compact_history(callback_context, llm_request):
+    """before_model_callback: bound the history sent to the model (see module docstring)."""
+    new_contents, report = compact_contents(llm_request.contents)
+    llm_request.contents = new_contents
+    session = getattr(getattr(callback_context, "_invocation_context", None), "session", None)
+    _record(getattr(session, "id", None), callback_context.agent_name, report)
+    if report["compacted_parts"] or report["dropped_turns"]:
+        print(f"Compacted history for {callback_context.agent_name}: {report}")
+    return None
+
+
+def session_stats(session_id: str) -> dict | None:
+    stats = _session_stats.get(session_id)
+    return dict(stats) if stats else None
+
+
+def stats() -> dict:
+    return {
+        "keep_turns": HISTORY_KEEP_TURNS,
+        "max_prompt_tokens": HISTORY_MAX_PROMPT_TOKENS,
+        "tracked_sessions": len(_session_stats),
+    }
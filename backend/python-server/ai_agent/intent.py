@@ -0,0 +1,143 @@
+"""
+Local intent check in front of the agent pipeline (no network).
+
+For a greeting, root_agent used to run script_writer (which decided not to
+write a storyboard) and then code_writer (an LLM call only to output an empty
+string). classify() decides first, from rules and a small scored classifier,
+whether a chat message asks for an animation. Confident chit-chat is answered
+by chat_responder in one short model call; everything else (including unsure
+cases) goes through the full pipeline, whose script_writer still makes the
+final call.
+
+skip_code_writer_without_storyboard is code_writer's before_agent_callback: when
+script_writer's output has none of the storyboard markers code_writer looks for
+("Scene 1", "Visual Elements", "Scene Breakdown"), code_writer is skipped
+instead of being asked to return nothing.
+"""
+import math
+import os
+import re
+import time
+
+from google.genai.types import Content, Part
+
+from . import metrics
+
+# Messages whose animation probability is below this are answered as chat
+INTENT_CHAT_THRESHOLD = float(os.getenv("INTENT_CHAT_THRESHOLD", "0.35"))
+
+_WORD_RE = re.compile(r"[a-z']+")
+_CODE_RE = re.compile(r"```|from manim import|class\s+\w+\s*\(\s*\w*Scene\s*\)")
+# The whole message is a greeting, thanks, farewell or acknowledgement
+_SOCIAL_RE = re.compile(
+    r"^\s*(?:(?:hi|hello|hey|hiya|yo|howdy|greetings|good (?:morning|afternoon|evening|night)|"
+    r"thanks?(?: you)?(?: (?:so|very) much)?|thx|ty|cheers|bye|goodbye|see you|ok(?:ay)?|cool|nice|great|awesome|"
+    r"got it|sounds good|perfect)(?: there| again| a lot)?[\s!.,?:)]*)+$"
+)
+_ANIMATION_RE = re.compile(r"\b(?:animat\w*|visuali[sz]\w*|render\w*|manim|videos?|storyboard\w*|illustrat\w*|scenes?)\b")
+_STORYBOARD_RE = re.compile(r"\bScene\s*1\b|Visual Elements|Scene Breakdown", re.IGNORECASE)
+
+_BIAS = -0.5
+# Asking for something to be shown or explained
+_REQUEST_WEIGHTS = {
+    "show": 1.5, "draw": 2.0, "make": 1.0, "create": 1.5, "explain": 1.5, "plot": 2.0, "graph": 1.5,
+    "demonstrate": 2.0, "teach": 1.5, "walk": 0.8, "depict": 2.0, "simulate": 2.0, "build": 1.0,
+}
+# Topics the app animates (each adds weight, up to _MAX_TOPIC_WEIGHT)
+_TOPIC_WORDS = {
+    "theorem", "equation", "function", "functions", "vector", "vectors", "matrix", "matrices", "derivative", "integral",
+    "calculus", "algebra", "geometry", "probability", "circle", "square", "triangle", "polygon", "sine", "cosine",
+    "wave", "waves", "fourier", "series", "transform", "proof", "limit", "pythagorean", "fractal", "spiral",
+    "neural", "network", "algorithm", "sort", "sorting", "bubble", "binary", "tree", "recursion", "gradient",
+    "descent", "physics", "gravity", "pendulum", "orbit", "ball", "projectile", "atom", "molecule", "dna", "cell",
+    "photosynthesis", "electron", "circuit", "population", "exponential", "logarithm", "prime", "primes",
+    "number", "numbers", "line", "lines", "angle", "axes", "coordinate", "shape", "shapes", "arrow", "process",
+}
+_TOPIC_WEIGHT = 1.2
+_MAX_TOPIC_WEIGHT = 3.6
+# Follow-up edits of an animation already made in this session
+_EDIT_WORDS = {
+    "change", "color", "colour", "bigger", "smaller", "larger", "slower", "faster", "add", "remove", "move",
+    "rotate", "shift", "instead", "longer", "shorter", "red", "blue", "green", "yellow", "white", "orange", "purple",
+}
+_EDIT_WEIGHT = 1.0
+_EDIT_WITH_CODE_BONUS = 1.5
+# Talking to (or about) the assistant
+_CHAT_WEIGHTS = {
+    "you": -1.2, "your": -1.0, "yourself": -1.5, "who": -1.0, "name": -1.0, "joke": -2.0, "weather": -2.0,
+    "thanks": -2.0, "thank": -2.0, "hello": -2.0, "hi": -2.0, "hey": -2.0, "bye": -2.0, "lol": -1.5,
+    "i'm": -0.6, "feel": -0.8, "today": -0.5, "help": -0.3,
+}
+_SHORT_MESSAGE_WEIGHT = -1.0
+
+
+def _score(words: list[str], has_code: bool) -> tuple[float, list[str]]:
+    score = _BIAS
+    hits = []
+    for word in words:
+        if word in _REQUEST_WEIGHTS:
+            score += _REQUEST_WEIGHTS[word]
+            hits.append(word)
+        elif word in _CHAT_WEIGHTS:
+            score += _CHAT_WEIGHTS[word]
+            hits.append(word)
+    topics = [w for w in words if w in _TOPIC_WORDS]
+    score += min(len(topics) * _TOPIC_WEIGHT, _MAX_TOPIC_WEIGHT)
+    hits += topics
+    edits = [w for w in words if w in _EDIT_WORDS]
+    if edits:
+        score += _EDIT_WEIGHT + (_EDIT_WITH_CODE_BONUS if has_code else 0.0)
+        hits += edits
+    if len(words) <= 3 and not topics and not edits:
+        score += _SHORT_MESSAGE_WEIGHT
+    return score, hits
+
+
+def classify(message: str, has_code: bool = False) -> dict:
+    """
+    Decide whether a chat message asks for an animation.
+
+    Args:
+        message: The user's message.
+        has_code: The session already has generated code (follow-up edits count as animation).
+
+    Returns:
+        dict: {"intent": "animation" | "chat", "probability": float (of animation),
+        "reason": str}
+    """
+    started = time.perf_counter()
+    text = (message or "").strip()
+    lowered = text.lower()
+    if not text:
+        result = {"intent": "chat", "probability": 0.0, "reason": "empty"}
+    elif _CODE_RE.search(text):
+        result = {"intent": "animation", "probability": 1.0, "reason": "code"}
+    elif _SOCIAL_RE.match(lowered):
+        result = {"intent": "chat", "probability": 0.0, "reason": "greeting"}
+    elif _ANIMATION_RE.search(lowered):
+        result = {"intent": "animation", "probability": 1.0, "reason": "animation request"}
+    else:
+        score, hits = _score(_WORD_RE.findall(lowered), has_code)
+        probability = 1 / (1 + math.exp(-score))
+        result = {
+            "intent": "chat" if probability < INTENT_CHAT_THRESHOLD else "animation",
+            "probability": round(probability, 3),
+            "reason": f"score {score:.1f} ({', '.join(hits) or 'no features'})",
+        }
+    metrics.observe("intent.classify", time.perf_counter() - started)
+    metrics.incr(f"intent.{result['intent']}")
+    return result
+
+
+def has_storyboard(text: str | None) -> bool:
+    """Whether script_writer's output has the markers code_writer converts into code."""
+    return bool(text and _STORYBOARD_RE.search(text))
+
+
+def skip_code_writer_without_storyboard(callback_context) -> Content | None:
+    """before_agent_callback for the code writers: skip the LLM call when there is no storyboard."""
+    if has_storyboard(callback_context.state.get("storyboard")):
+        return None
+    metrics.incr("intent.code_writer_skipped")
+    # Empty text: no code, and ADK leaves the event out of later prompts
+    return Content(role="model", parts=[Part(text="")])
@@ -0,0 +1,370 @@
+"""
+Durable priority job queue for video generations (SQLite).
+
+Jobs survive restarts: a job whose worker stops heartbeating (crash, kill -9)
+goes back to the queue once its lease expires, and a clean shutdown requeues
+its running jobs immediately. Several processes can share one queue file; a
+job is claimed in a single IMMEDIATE transaction, so only one of them runs it.
+
+Submissions carry a de-duplication key (normalized prompt or code). While a job
+with the same key is queued or running, a new submission attaches to it instead
+of starting a second LLM + manim pipeline.
+
+A job nobody else is attached to can be cancelled: a queued one is never
+claimed, a running one has its handler task cancelled (by the process running
+it, within a heartbeat).
+"""
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+from . import metrics
+
+BASE_PATH = Path(__file__).parent.parent
+JOB_QUEUE_DB = Path(os.getenv("JOB_QUEUE_DB", BASE_PATH / "job_queue.db"))
+# Jobs claimed at once by this process; 0 lets main.py size it to the staged
+# pipeline (LLM and render stages plus their queues, see pipeline.py)
+VIDEO_QUEUE_WORKERS = max(0, int(os.getenv("VIDEO_QUEUE_WORKERS", "0")))
+# A running job whose worker hasn't heartbeated for this long is requeued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Finished jobs are kept this long for /video-status, then pruned
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+# Idle workers re-check the table this often for jobs submitted by other processes
+JOB_POLL_SECONDS = 1.0
+
+ACTIVE_STATES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    dedup_key TEXT,
+    state TEXT NOT NULL,
+    attached INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    error TEXT,
+    result TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, enqueued_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, state);
+"""
+
+
+def dedup_key(prompt: str | None = None, code: str | None = None, **options) -> str:
+    """
+    Key under which identical submissions are merged.
+
+    Code is compared by its AST (formatting and comments don't matter), prompts
+    case- and whitespace-insensitively; options (e.g. render_mode) are part of the key.
+    """
+    if code:
+        try:
+            normalized = "code:" + ast.dump(ast.parse(code))
+        except SyntaxError:
+            normalized = "code:" + "\n".join(line.rstrip() for line in code.strip().splitlines())
+    else:
+        normalized = "prompt:" + " ".join((prompt or "").lower().split())
+    normalized += json.dumps(options, sort_keys=True)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class JobQueue:
+    """
+    SQLite-backed queue with priorities (higher runs first), leases and single-flight submission.
+
+    Args:
+        path: Database file; every process using the same file shares the queue.
+        lease_seconds: Heartbeat timeout after which a running job is requeued.
+    """
+
+    def __init__(self, path: Path = JOB_QUEUE_DB, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "result" not in columns:
+            # Queue files created before handlers could return results
+            self._db.execute("ALTER TABLE jobs ADD COLUMN result TEXT")
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._concurrency = 0
+        self._running: set[str] = set()
+        self._handlers: dict[str, asyncio.Task] = {}
+
+    def submit(self, job_id: str, payload: dict, priority: int = 0, dedup_key: str | None = None) -> tuple[str, bool]:
+        """
+        Enqueue a job, or attach to an in-flight job with the same dedup_key.
+
+        Returns:
+            tuple: (job_id that will do the work, True if attached to an existing job)
+        """
+        now = time.time()
+        with self._transaction():
+            if dedup_key:
+                row = self._db.execute(
+                    f"SELECT id FROM jobs WHERE dedup_key = ? AND state IN {ACTIVE_STATES} ORDER BY enqueued_at LIMIT 1",
+                    (dedup_key,),
+                ).fetchone()
+                if row:
+                    # Waiting on the same job is no reason to keep its lower priority
+                    self._db.execute(
+                        "UPDATE jobs SET attached = attached + 1, priority = MAX(priority, ?) WHERE id = ?",
+                        (priority, row["id"]),
+                    )
+                    metrics.incr("job_queue.attached")
+                    return row["id"], True
+            self._db.execute(
+                "INSERT INTO jobs (id, payload, priority, dedup_key, state, enqueued_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, json.dumps(payload), priority, dedup_key, now),
+            )
+        metrics.incr("job_queue.submitted")
+        self._wakeup.set()
+        return job_id, False
+
+    def get(self, job_id: str, position: bool = False) -> dict | None:
+        """
+        Queue view of a job: state, wait and run time.
+
+        One primary-key read. With position=True, a queued job also gets its
+        queue_position and the queue_depth, which count the queued jobs.
+        """
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        info = {
+            "state": row["state"],
+            "priority": row["priority"],
+            "attached": row["attached"],
+            "attempts": row["attempts"],
+            "wait_seconds": round((row["started_at"] or now) - row["enqueued_at"], 3),
+            "run_seconds": round((row["finished_at"] or now) - row["started_at"], 3) if row["started_at"] else None,
+        }
+        if position and row["state"] == "queued":
+            ahead = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND (priority > ? OR (priority = ? AND enqueued_at < ?))",
+                (row["priority"], row["priority"], row["enqueued_at"]),
+            ).fetchone()[0]
+            info["queue_position"] = ahead + 1
+            info["queue_depth"] = self.depth()
+        if row["error"]:
+            info["error"] = row["error"]
+        return info
+
+    def priority(self, job_id: str) -> int:
+        """Current priority of a job (raised when a higher-priority submission attaches); 0 if unknown."""
+        row = self._db.execute("SELECT priority FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["priority"] if row else 0
+
+    def state(self, job_id: str) -> str | None:
+        """State of a job ("queued", "running", "done", "failed", "cancelled"), or None if unknown or pruned."""
+        row = self._db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["state"] if row else None
+
+    def cancel(self, job_id: str) -> str | None:
+        """
+        Cancel a queued or running job that no other submission is attached to.
+
+        Returns:
+            str | None: The state it was cancelled in ("queued" or "running"), or
+            None if it is unknown, finished or shared with another submitter.
+        """
+        with self._transaction():
+            row = self._db.execute("SELECT state, attached FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] not in ACTIVE_STATES or row["attached"]:
+                return None
+            self._db.execute("UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ?", (time.time(), job_id))
+        handler = self._handlers.get(job_id)
+        if handler is not None:
+            handler.cancel()
+        metrics.incr("job_queue.cancelled")
+        return row["state"]
+
+    def depth(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state = 'queued'").fetchone()[0]
+
+    def stats(self) -> dict:
+        counts = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return {"workers": self._concurrency, "running_here": len(self._running), **{state: counts.get(state, 0) for state in ("queued", "running", "done", "failed", "cancelled")}}
+
+    def claim(self) -> dict | None:
+        """Take the highest-priority queued job, or None if the queue is empty."""
+        now = time.time()
+        with self._transaction():
+            row = self._db.execute(
+                "SELECT id, payload, enqueued_at FROM jobs WHERE state = 'queued' ORDER BY priority DESC, enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (self.worker_id, now, now, row["id"]),
+            )
+        metrics.observe("job_queue.wait", now - row["enqueued_at"])
+        return {"id": row["id"], "payload": json.loads(row["payload"])}
+
+    def finish(self, job_id: str, error: str | None = None, result=None) -> None:
+        self._db.execute(
+            "UPDATE jobs SET state = ?, error = ?, result = ?, finished_at = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            ("failed" if error else "done", error, json.dumps(result), time.time(), job_id, self.worker_id),
+        )
+
+    def result(self, job_id: str):
+        """What the handler returned for a finished job (None if unfinished or nothing)."""
+        row = self._db.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["result"]) if row and row["result"] else None
+
+    def requeue_expired(self) -> int:
+        """Put running jobs with an expired lease (their worker died) back in the queue."""
+        cutoff = time.time() - self.lease_seconds
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = 'queued', worker = NULL, started_at = NULL WHERE state = 'running' AND heartbeat_at < ?",
+            (cutoff,),
+        )
+        if cursor.rowcount:
+            print(f"Requeued {cursor.rowcount} jobs whose worker stopped responding")
+            metrics.incr("job_queue.requeued", cursor.rowcount)
+            self._wakeup.set()
+        return cursor.rowcount
+
+    def prune(self) -> None:
+        """Delete finished, failed and cancelled jobs older than JOB_RETENTION_SECONDS."""
+        self._db.execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+            (time.time() - JOB_RETENTION_SECONDS,),
+        )
+
+    async def start(self, handler, concurrency: int = 1) -> None:
+        """
+        Run handler(job_id, payload) for queued jobs, `concurrency` at a time.
+
+        A handler that raises marks the job failed; returning marks it done and
+        stores the (JSON-serializable) return value for result().
+        """
+        self.requeue_expired()
+        self.prune()
+        self._concurrency = concurrency
+        self._tasks = [asyncio.create_task(self._worker(handler)) for _ in range(concurrency)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._concurrency = 0
+        # Hand unfinished jobs straight back instead of waiting for the lease to expire
+        if self._running:
+            placeholders = ",".join("?" * len(self._running))
+            self._db.execute(
+                f"UPDATE jobs SET state = 'queued', worker = NULL, started_at = NULL WHERE worker = ? AND state = 'running' AND id IN ({placeholders})",
+                (self.worker_id, *self._running),
+            )
+            self._running.clear()
+        self._db.close()
+
+    async def _worker(self, handler) -> None:
+        while True:
+            job = self.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._running.add(job["id"])
+            started = time.perf_counter()
+            # Its own task, so cancel() can stop this job without stopping the worker
+            self._handlers[job["id"]] = task = asyncio.create_task(handler(job["id"], job["payload"]))
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                print(f"Job {job['id']} cancelled")
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e}")
+                self.finish(job["id"], error=str(e))
+            else:
+                self.finish(job["id"], result=result)
+            finally:
+                metrics.observe("job_queue.run", time.perf_counter() - started)
+                self._handlers.pop(job["id"], None)
+            self._running.discard(job["id"])
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if self._running:
+                placeholders = ",".join("?" * len(self._running))
+                self._db.execute(
+                    f"UPDATE jobs SET heartbeat_at = ? WHERE worker = ? AND id IN ({placeholders})",
+                    (time.time(), self.worker_id, *self._running),
+                )
+                # Jobs cancelled through another process's connection
+                cancelled = self._db.execute(
+                    f"SELECT id FROM jobs WHERE state = 'cancelled' AND worker = ? AND id IN ({placeholders})",
+                    (self.worker_id, *self._running),
+                ).fetchall()
+                for row in cancelled:
+                    if row["id"] in self._handlers:
+                        self._handlers[row["id"]].cancel()
+            self.requeue_expired()
+            self.prune()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._db)
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a read-then-write can't race another process."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+video_queue: JobQueue | None = None
+
+
+async def start_job_queue(handler, concurrency: int) -> JobQueue:
+    """Open the video job queue and start its workers (called once from the app lifespan)."""
+    global video_queue
+    if video_queue is None:
+        video_queue = JobQueue()
+        await video_queue.start(handler, concurrency)
+        print(f"Video job queue ready: {video_queue.stats()}")
+    return video_queue
+
+
+async def stop_job_queue() -> None:
+    global video_queue
+    if video_queue is not None:
+        await video_queue.stop()
+        video_queue = None
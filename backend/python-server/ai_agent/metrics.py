@@ -0,0 +1,49 @@
+"""In-process counters and timings, exposed by main.py on GET /metrics."""
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_timings: dict[str, dict] = {}
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Add value to the counter called name."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one duration sample for the timing called name."""
+    with _lock:
+        t = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        t["count"] += 1
+        t["total"] += seconds
+        t["max"] = max(t["max"], seconds)
+        t["last"] = seconds
+
+
+@contextmanager
+def timer(name: str):
+    """Time the body of a with-block into the timing called name."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+def counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> dict:
+    """Copy of all counters and timings (with the mean filled in) for reporting."""
+    with _lock:
+        timings = {
+            name: {**t, "mean": t["total"] / t["count"] if t["count"] else 0.0}
+            for name, t in _timings.items()
+        }
+        return {"counters": dict(_counters), "timings": timings}
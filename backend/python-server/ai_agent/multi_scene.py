@@ -0,0 +1,93 @@
+"""
+Multi-scene rendering: every Scene subclass in a file is rendered as its own
+job, in parallel, and the clips are stitched together in source order.
+"""
+import ast
+import asyncio
+import subprocess
+from pathlib import Path
+
+from .render_pool import find_rendered_video, run_manim
+from .stitching import concat_videos
+
+
+def find_scene_classes(code: str) -> list[str]:
+    """
+    Return the names of all renderable Scene subclasses in code, in source order.
+
+    A class counts if one of its bases is a manim scene type (any name ending in
+    "Scene", e.g. Scene, MovingCameraScene, ThreeDScene) or another scene class
+    defined earlier in the file, and it defines or inherits a construct method.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+
+    scenes: dict[str, bool] = {}  # name -> has construct (own or inherited)
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        base_names = []
+        for base in node.bases:
+            if isinstance(base, ast.Name):
+                base_names.append(base.id)
+            elif isinstance(base, ast.Attribute):
+                base_names.append(base.attr)
+        if not any(b.endswith("Scene") or b in scenes for b in base_names):
+            continue
+        own_construct = any(
+            isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == "construct"
+            for item in node.body
+        )
+        scenes[node.name] = own_construct or any(scenes.get(b, False) for b in base_names)
+    return [name for name, has_construct in scenes.items() if has_construct]
+
+
+async def render_scenes(scenes_path: Path, scene_names: list[str], media_dir: Path, output: Path, quality: str = "l", env: dict | None = None, on_line=None) -> subprocess.CompletedProcess:
+    """
+    Render several scenes of one file concurrently and concatenate the clips.
+
+    Each scene is a separate render job, so scenes run on separate workers (up
+    to MAX_CONCURRENT_RENDERS at once).
+
+    Args:
+        scenes_path: The job's scene file.
+        scene_names: Scene classes in playback order.
+        media_dir: The job's media directory.
+        output: Where to write the stitched video.
+        quality: Manim quality flag suffix.
+        env: Environment for cold subprocess renders.
+        on_line: Optional callback(line, scene_name) for live render output.
+
+    Returns:
+        subprocess.CompletedProcess: Combined result; stdout ends with the
+        "File ready at" line for the stitched video when every scene succeeded.
+    """
+    def scene_output(name: str):
+        return (lambda line: on_line(line, name)) if on_line else None
+
+    results = await asyncio.gather(
+        *(run_manim(scenes_path, name, media_dir, quality=quality, env=env, on_line=scene_output(name)) for name in scene_names)
+    )
+    cmd = ["render_scenes", str(scenes_path), *scene_names]
+    stdout = "\n".join(r.stdout for r in results)
+
+    failed = [(name, r) for name, r in zip(scene_names, results) if r.returncode != 0]
+    if failed:
+        name, first = failed[0]
+        stderr = "\n".join(f"Scene {n} failed:\n{r.stderr}" for n, r in failed)
+        return subprocess.CompletedProcess(cmd, first.returncode, stdout, stderr)
+
+    clips = []
+    for name in scene_names:
+        clip = find_rendered_video(media_dir, name)
+        if clip is None:
+            return subprocess.CompletedProcess(cmd, 1, stdout, f"Rendered clip for scene {name} not found in {media_dir}")
+        clips.append(clip)
+
+    try:
+        await concat_videos(clips, output)
+    except RuntimeError as e:
+        return subprocess.CompletedProcess(cmd, 1, stdout, str(e))
+    return subprocess.CompletedProcess(cmd, 0, f"{stdout}\nFile ready at '{output}'", "")
@@ -0,0 +1,218 @@
+"""
+Staged video pipeline: an LLM stage and a render stage with their own concurrency.
+
+A generation used to hold one job slot from the storyboard through the render,
+so LLM-bound and CPU-bound work shared one limit and a burst ran at
+slots / (LLM latency + render time). Here each job goes through
+
+    LLM stage (LLM_STAGE_CONCURRENCY workers) -> bounded queue -> render stage (RENDER_STAGE_CONCURRENCY workers)
+
+The next job's storyboard and code are written while earlier jobs render, and a
+burst runs at about the render stage's capacity. When renders fall behind,
+the queue between the stages fills, and LLM workers wait to hand off their
+code instead of piling up finished code. LLM calls made from
+the render stage (the code fixer) take a slot from the same llm_slot() limit,
+so Gemini concurrency stays bounded either way.
+
+Both queues hand out the waiting job with the highest priority (earliest first
+among equals), so a job queue that claims as many jobs as the pipeline holds
+still runs an interactive request before claimed batch items or drafts. A
+priority can be a callable, read each time a worker picks its next job, so a
+job whose priority is raised while it waits moves up.
+"""
+import asyncio
+import os
+import time
+
+from . import metrics
+from .render_pool import MAX_CONCURRENT_RENDERS
+
+# LLM calls (script/code writer, code fixer) in flight at once
+LLM_STAGE_CONCURRENCY = max(1, int(os.getenv("LLM_STAGE_CONCURRENCY", "8")))
+# Jobs rendering at once (raise it with RENDERER=remote to match the worker fleet)
+RENDER_STAGE_CONCURRENCY = max(1, int(os.getenv("RENDER_STAGE_CONCURRENCY", MAX_CONCURRENT_RENDERS)))
+# Jobs with finished code that may wait for a render slot
+PIPELINE_QUEUE_SIZE = max(1, int(os.getenv("PIPELINE_QUEUE_SIZE", str(2 * RENDER_STAGE_CONCURRENCY))))
+
+_llm_slots: asyncio.Semaphore | None = None
+
+
+class _PriorityQueue:
+    """Bounded queue of (item, future, queued_at, priority) that gets the highest priority first."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: list[tuple] = []
+        self._changed = asyncio.Condition()
+
+    def qsize(self) -> int:
+        return len(self._entries)
+
+    def empty(self) -> bool:
+        return not self._entries
+
+    async def put(self, entry: tuple) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self._entries) < self.maxsize)
+            self._entries.append(entry)
+            self._changed.notify_all()
+
+    def _pop_best(self) -> tuple:
+        def priority(i: int):
+            p = self._entries[i][3]
+            return (p() if callable(p) else p, -i)
+
+        return self._entries.pop(max(range(len(self._entries)), key=priority))
+
+    async def get(self) -> tuple:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._entries)
+            entry = self._pop_best()
+            self._changed.notify_all()
+            return entry
+
+    def get_nowait(self) -> tuple:
+        return self._pop_best()
+
+
+def llm_slot() -> asyncio.Semaphore:
+    """Semaphore bounding concurrent LLM calls (created lazily on the running loop)."""
+    global _llm_slots
+    if _llm_slots is None:
+        _llm_slots = asyncio.Semaphore(LLM_STAGE_CONCURRENCY)
+    return _llm_slots
+
+
+class StagedPipeline:
+    """
+    Two async stages connected by bounded priority queues.
+
+    Args:
+        first: async first(item) -> item for the second stage (the LLM stage).
+        second: async second(item) -> result (the render stage).
+        first_concurrency: Workers in the first stage.
+        second_concurrency: Workers in the second stage.
+        queue_size: Items that may wait between (and before) the stages.
+    """
+
+    def __init__(self, first, second, first_concurrency: int = LLM_STAGE_CONCURRENCY, second_concurrency: int = RENDER_STAGE_CONCURRENCY, queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.first = first
+        self.second = second
+        self.first_concurrency = first_concurrency
+        self.second_concurrency = second_concurrency
+        self.queue_size = queue_size
+        self._inbox: _PriorityQueue | None = None
+        self._handoff: _PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._busy = {"llm": 0, "render": 0}
+        self._completed = 0
+
+    @property
+    def capacity(self) -> int:
+        """Jobs the pipeline can hold at once (busy workers plus both queues)."""
+        return self.first_concurrency + self.second_concurrency + 2 * self.queue_size
+
+    async def start(self) -> None:
+        self._inbox = _PriorityQueue(self.queue_size)
+        self._handoff = _PriorityQueue(self.queue_size)
+        self._tasks = [asyncio.create_task(self._first_worker()) for _ in range(self.first_concurrency)]
+        self._tasks += [asyncio.create_task(self._second_worker()) for _ in range(self.second_concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Fail anything still queued so its caller doesn't wait forever
+        for queue in (self._inbox, self._handoff):
+            while queue is not None and not queue.empty():
+                _, future, _, _ = queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+    async def run(self, item, priority=0):
+        """
+        Send an item through both stages and return the second stage's result.
+
+        Args:
+            item: The job for the first stage.
+            priority: Higher goes first in both queues; an int, or a callable
+                returning the current priority.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._inbox.put((item, future, time.monotonic(), priority))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "llm_workers": self.first_concurrency,
+            "render_workers": self.second_concurrency,
+            "llm_busy": self._busy["llm"],
+            "render_busy": self._busy["render"],
+            "waiting_for_llm": self._inbox.qsize() if self._inbox else 0,
+            "waiting_for_render": self._handoff.qsize() if self._handoff else 0,
+            "queue_size": self.queue_size,
+            "completed": self._completed,
+        }
+
+    async def _run_stage(self, stage, item, future):
+        """Run stage(item), stopping it if the caller stops waiting (its job was cancelled)."""
+        task = asyncio.create_task(stage(item))
+
+        def stop(f):
+            if f.cancelled():
+                task.cancel()
+
+        future.add_done_callback(stop)
+        try:
+            return await task
+        finally:
+            future.remove_done_callback(stop)
+
+    async def _first_worker(self) -> None:
+        while True:
+            item, future, queued_at, priority = await self._inbox.get()
+            if future.done():
+                continue
+            metrics.observe("pipeline.llm_wait", time.monotonic() - queued_at)
+            self._busy["llm"] += 1
+            try:
+                with metrics.timer("pipeline.llm_stage"):
+                    item = await self._run_stage(self.first, item, future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                metrics.incr("pipeline.cancelled")
+                continue
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self._busy["llm"] -= 1
+            # Blocks while the render stage is saturated (backpressure)
+            await self._handoff.put((item, future, time.monotonic(), priority))
+
+    async def _second_worker(self) -> None:
+        while True:
+            item, future, queued_at, _ = await self._handoff.get()
+            if future.done():
+                continue
+            metrics.observe("pipeline.render_wait", time.monotonic() - queued_at)
+            self._busy["render"] += 1
+            try:
+                with metrics.timer("pipeline.render_stage"):
+                    result = await self._run_stage(self.second, item, future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                metrics.incr("pipeline.cancelled")
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+                self._completed += 1
+            finally:
+                self._busy["render"] -= 1
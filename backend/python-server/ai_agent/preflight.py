@@ -0,0 +1,284 @@
+"""
+Pre-flight validation and auto-fixing of generated Manim code.
+
+One parse of the code finds the failure classes the code_fixer prompt knows
+about and rewrites them in place, before anything is rendered:
+
+    tex_to_text            Tex(...) / MathTex(...) -> Text(...) (LaTeX isn't installed)
+    latex_symbols          \\alpha, \\sigma, ... inside those calls -> Unicode
+    undefined_colors       CYAN -> TEAL, MAGENTA -> PINK
+    create_on_group        Create(Group(...)) / Write(Group(...)) -> FadeIn(...)
+    angle_vertex_kwarg     Angle(..., vertex=...) loses the unsupported kwarg
+    angle_duplicate_radius Angle(a, b, r, radius=...) loses the positional radius
+    axes_label_constructor Axes(...) gets axis_config={"label_constructor": Text}
+    strip_markup           leaked HTML/Tailwind tokens removed (only if the code didn't parse)
+
+Edits are applied to the original source text at the node positions, so
+comments and formatting survive. The report says which rules fired.
+"""
+import ast
+import re
+import time
+
+from . import metrics
+
+LATEX_TO_UNICODE = {
+    "\\sigma": "σ", "\\alpha": "α", "\\beta": "β", "\\gamma": "γ",
+    "\\theta": "θ", "\\pi": "π", "\\Sigma": "Σ", "\\Delta": "Δ",
+    "\\infty": "∞", "\\rightarrow": "→", "\\otimes": "⊗",
+    # Longer commands first so \cdots isn't turned into "·s"
+    "\\cdots": "...", "\\cdot": "·", "\\dots": "...",
+}
+COLOR_REPLACEMENTS = {"CYAN": "TEAL", "MAGENTA": "PINK"}
+TEX_CALLS = {"Tex", "MathTex"}
+# MathTex keywords with a Text equivalent, and ones Text doesn't accept at all
+TEX_KWARG_RENAMES = {"tex_to_color_map": "t2c"}
+TEX_ONLY_KWARGS = {"substrings_to_isolate", "tex_environment", "tex_template", "arg_separator", "organize_left_to_right"}
+GROUP_ONLY_ANIMATIONS = {"Create", "Write"}
+ANGLE_CALLS = {"Angle", "RightAngle"}
+AXES_CALLS = {"Axes", "ThreeDAxes", "NumberPlane"}
+
+# Linear-time markup patterns (no DOTALL, no backreferences)
+_MARKUP_PATTERNS = [
+    re.compile(r"</?(?:span|div|b|i|style|class)\b[^>\n]*>"),
+    re.compile(r"class\s*=\s*[\"'][^\"'\n]*[\"']"),
+    re.compile(r"[\"']text-[a-z]+-\d+[\"']|[\"']font-[a-z]+[\"']"),
+    re.compile(r"<?400\">"),
+]
+_BLANK_LINES = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+
+
+def _strip_fences(code: str) -> str:
+    code = code.strip()
+    if code.startswith("```python"):
+        code = code[len("```python"):]
+    elif code.startswith("```"):
+        code = code[len("```"):]
+    if code.endswith("```"):
+        code = code[:-len("```")]
+    return code.strip()
+
+
+def _strip_markup(code: str) -> str:
+    for pattern in _MARKUP_PATTERNS:
+        code = pattern.sub("", code)
+    return _BLANK_LINES.sub("\n\n", code)
+
+
+def _call_name(node: ast.Call) -> str | None:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+class SourceText:
+    """Map AST (lineno, col_offset) positions, which count UTF-8 bytes, to offsets in the encoded source."""
+
+    def __init__(self, code: str):
+        self.data = code.encode("utf-8")
+        self.line_starts = [0]
+        for line in self.data.splitlines(keepends=True):
+            self.line_starts.append(self.line_starts[-1] + len(line))
+
+    def start(self, node) -> int:
+        return self.line_starts[node.lineno - 1] + node.col_offset
+
+    def end(self, node) -> int:
+        return self.line_starts[node.end_lineno - 1] + node.end_col_offset
+
+    def text(self, node) -> str:
+        return self.data[self.start(node):self.end(node)].decode("utf-8")
+
+
+class _RuleFinder(ast.NodeVisitor):
+    """Collect (start, end, replacement, rule) edits for every known failure pattern."""
+
+    def __init__(self, tree: ast.Module, source: SourceText):
+        self.source = source
+        self.edits: list[tuple[int, int, str, str]] = []
+        self.assigned_names: set[str] = set()
+        self.group_names: set[str] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                self.assigned_names.add(node.id)
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) and _call_name(node.value) == "Group":
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.group_names.add(target.id)
+                    elif isinstance(target, ast.Attribute):
+                        self.group_names.add(target.attr)
+
+    def _replace(self, node, replacement: str, rule: str) -> None:
+        self.edits.append((self.source.start(node), self.source.end(node), replacement, rule))
+
+    def _argument_span(self, call: ast.Call, target) -> tuple[int, int]:
+        """Byte span covering one positional or keyword argument plus its separating comma."""
+        items = sorted([*call.args, *call.keywords], key=lambda n: (n.lineno, n.col_offset))
+        i = items.index(target)
+        if i > 0:
+            start, end = self.source.end(items[i - 1]), self.source.end(target)
+        elif len(items) > 1:
+            start, end = self.source.start(target), self.source.start(items[1])
+        else:
+            start, end = self.source.start(target), self.source.end(target)
+        return start, end
+
+    def visit_Name(self, node: ast.Name) -> None:
+        replacement = COLOR_REPLACEMENTS.get(node.id)
+        if replacement and isinstance(node.ctx, ast.Load) and node.id not in self.assigned_names:
+            self._replace(node, replacement, "undefined_colors")
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = _call_name(node)
+        if name in TEX_CALLS:
+            self._fix_tex(node)
+        elif name in GROUP_ONLY_ANIMATIONS and node.args and self._is_group(node.args[0]):
+            self._replace(node.func, "FadeIn" if isinstance(node.func, ast.Name) else f"{self.source.text(node.func.value)}.FadeIn", "create_on_group")
+        elif name in ANGLE_CALLS:
+            self._fix_angle(node)
+        elif name in AXES_CALLS:
+            self._fix_axes(node)
+        self.generic_visit(node)
+
+    def _is_group(self, node) -> bool:
+        if isinstance(node, ast.Call):
+            return _call_name(node) == "Group"
+        if isinstance(node, ast.Name):
+            return node.id in self.group_names
+        if isinstance(node, ast.Attribute):
+            return node.attr in self.group_names
+        return False
+
+    def _fix_tex(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Name):
+            self._replace(node.func, "Text", "tex_to_text")
+        else:
+            self._replace(node.func, f"{self.source.text(node.func.value)}.Text", "tex_to_text")
+
+        strings = [a for a in node.args if isinstance(a, ast.Constant) and isinstance(a.value, str)]
+        if node.args and len(strings) == len(node.args):
+            # Text() takes a single string; MathTex("a", "+", "b") renders the parts joined
+            joined = "".join(a.value for a in strings)
+            converted = joined
+            for latex, unicode in LATEX_TO_UNICODE.items():
+                converted = converted.replace(latex, unicode)
+            if converted != joined:
+                self.edits.append((self.source.start(node.args[0]), self.source.end(node.args[-1]), repr(converted), "latex_symbols"))
+            elif len(strings) > 1:
+                self.edits.append((self.source.start(node.args[0]), self.source.end(node.args[-1]), repr(joined), "tex_to_text"))
+        elif len(node.args) > 1 or any(isinstance(a, ast.Starred) for a in node.args):
+            # MathTex(r"x=", value): Text's second parameter isn't another part, so join them at
+            # run time. Insertions only, so edits inside the arguments still apply.
+            start, end = self.source.start(node.args[0]), self.source.end(node.args[-1])
+            self.edits.append((start, start, '"".join(map(str, (', "tex_to_text"))
+            self.edits.append((end, end, ",)))", "tex_to_text"))
+            for arg in strings:
+                converted = arg.value
+                for latex, unicode in LATEX_TO_UNICODE.items():
+                    converted = converted.replace(latex, unicode)
+                if converted != arg.value:
+                    self._replace(arg, repr(converted), "latex_symbols")
+
+        for kw in node.keywords:
+            if kw.arg in TEX_KWARG_RENAMES:
+                start = self.source.start(kw)
+                self.edits.append((start, start + len(kw.arg.encode("utf-8")), TEX_KWARG_RENAMES[kw.arg], "tex_to_text"))
+            elif kw.arg in TEX_ONLY_KWARGS:
+                start, end = self._argument_span(node, kw)
+                self.edits.append((start, end, "", "tex_to_text"))
+
+    def _fix_angle(self, node: ast.Call) -> None:
+        for kw in node.keywords:
+            if kw.arg == "vertex":
+                start, end = self._argument_span(node, kw)
+                self.edits.append((start, end, "", "angle_vertex_kwarg"))
+        if len(node.args) > 2 and any(kw.arg == "radius" for kw in node.keywords):
+            start, end = self._argument_span(node, node.args[2])
+            self.edits.append((start, end, "", "angle_duplicate_radius"))
+
+    def _fix_axes(self, node: ast.Call) -> None:
+        axis_config = next((kw for kw in node.keywords if kw.arg == "axis_config"), None)
+        if axis_config is None:
+            items = [*node.args, *node.keywords]
+            insert = '"label_constructor": Text'
+            if items:
+                last_end = max(self.source.end(n) for n in items)
+                self.edits.append((last_end, last_end, f", axis_config={{{insert}}}", "axes_label_constructor"))
+            else:
+                # Axes() -> Axes(axis_config={...}): insert just before the closing parenthesis
+                end = self.source.end(node) - 1
+                self.edits.append((end, end, f"axis_config={{{insert}}}", "axes_label_constructor"))
+        elif isinstance(axis_config.value, ast.Dict):
+            keys = [k.value for k in axis_config.value.keys if isinstance(k, ast.Constant)]
+            if "label_constructor" not in keys:
+                brace = self.source.start(axis_config.value) + 1
+                sep = ", " if axis_config.value.keys else ""
+                self.edits.append((brace, brace, f'"label_constructor": Text{sep}', "axes_label_constructor"))
+
+
+def _apply_edits(source: SourceText, edits: list[tuple[int, int, str, str]]) -> tuple[str, dict]:
+    """Apply non-overlapping edits back to front; returns the new code and rule counts."""
+    data = source.data
+    fired: dict[str, int] = {}
+    applied_start = len(data) + 1
+    for start, end, replacement, rule in sorted(edits, key=lambda e: (e[0], e[1]), reverse=True):
+        if end > applied_start:
+            continue  # overlaps an edit already applied further down
+        data = data[:start] + replacement.encode("utf-8") + data[end:]
+        applied_start = start
+        fired[rule] = fired.get(rule, 0) + 1
+    return data.decode("utf-8"), fired
+
+
+def preflight(code: str) -> dict:
+    """
+    Validate generated code and rewrite known Manim failure patterns.
+
+    Args:
+        code: Raw code from the code writer or fixer (fences and leaked markup allowed).
+
+    Returns:
+        dict: {"code": rewritten code, "rules": {rule: times fired},
+        "error": SyntaxError or None, "elapsed_ms": float}
+    """
+    started = time.perf_counter()
+    rules: dict[str, int] = {}
+    code = _strip_fences(code)
+    error = None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        cleaned = _strip_markup(code)
+        try:
+            tree = ast.parse(cleaned)
+            code = cleaned
+            rules["strip_markup"] = 1
+        except SyntaxError as e:
+            tree = None
+            error = e
+
+    if tree is not None:
+        source = SourceText(code)
+        finder = _RuleFinder(tree, source)
+        finder.visit(tree)
+        if finder.edits:
+            fixed, fired = _apply_edits(source, finder.edits)
+            try:
+                ast.parse(fixed)
+                code = fixed
+                for rule, count in fired.items():
+                    rules[rule] = rules.get(rule, 0) + count
+            except SyntaxError:
+                # A rewrite produced invalid code; keep the parseable original
+                print("Warning: preflight rewrite produced invalid code, keeping original")
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("preflight", elapsed_ms / 1000)
+    for rule, count in rules.items():
+        metrics.incr(f"preflight.rule.{rule}", count)
+    if rules:
+        # Each rewritten job is a render + code_fixer round-trip that didn't have to happen
+        metrics.incr("preflight.jobs_fixed")
+    return {"code": code, "rules": rules, "error": error, "elapsed_ms": elapsed_ms}
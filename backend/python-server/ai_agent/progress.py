@@ -0,0 +1,109 @@
+"""
+Live progress for video generations.
+
+generate_video publishes stage changes and per-animation render progress here;
+main.py mirrors them into the job status and streams them to clients on
+GET /video-events/{generation_id} (Server-Sent Events).
+"""
+import asyncio
+import re
+import time
+
+TERMINAL_STATUSES = {"completed", "error", "cancelled"}
+
+_ANIMATION_DONE_RE = re.compile(r"Animation (\d+) : (?:Partial movie file written|Using cached data)")
+
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+_latest: dict[str, dict] = {}
+_listeners: list = []
+
+
+def add_listener(listener) -> None:
+    """Call listener(generation_id, event) for every published event."""
+    _listeners.append(listener)
+
+
+def publish(generation_id: str | None, **event) -> None:
+    """
+    Publish a progress event (e.g. status, message, progress, eta_seconds) for a generation.
+
+    Events are merged into the generation's latest state and pushed to every
+    subscriber. Terminal statuses close the stream.
+    """
+    if not generation_id:
+        return
+    state = _latest.setdefault(generation_id, {})
+    state.update(event)
+    for listener in _listeners:
+        try:
+            listener(generation_id, event)
+        except Exception as e:
+            print(f"Warning: progress listener failed: {e}")
+    for queue in _subscribers.get(generation_id, ()):
+        queue.put_nowait(dict(state))
+    if event.get("status") in TERMINAL_STATUSES:
+        # Subscribers get the final event; nothing further will be published
+        _latest.pop(generation_id, None)
+
+
+def latest(generation_id: str) -> dict | None:
+    state = _latest.get(generation_id)
+    return dict(state) if state else None
+
+
+def forget(generation_id: str) -> None:
+    """Drop a generation's latest state without publishing a terminal event."""
+    _latest.pop(generation_id, None)
+
+
+def subscribe(generation_id: str) -> asyncio.Queue:
+    queue: asyncio.Queue = asyncio.Queue()
+    _subscribers.setdefault(generation_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe(generation_id: str, queue: asyncio.Queue) -> None:
+    queues = _subscribers.get(generation_id)
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            _subscribers.pop(generation_id, None)
+
+
+class RenderProgress:
+    """
+    Turn manim's "Animation N : ..." log lines into percent-complete and ETA events.
+
+    Args:
+        generation_id: Generation to publish for.
+        total_animations: Animations expected across all render jobs (from the dry run).
+        start: Overall progress percentage when rendering starts.
+        end: Overall progress percentage when rendering finishes.
+    """
+
+    def __init__(self, generation_id: str | None, total_animations: int | None, start: float = 35, end: float = 95):
+        self.generation_id = generation_id
+        self.total = total_animations
+        self.start = start
+        self.end = end
+        self.started_at = time.monotonic()
+        self.done: set[tuple[str, int]] = set()
+
+    def feed(self, line: str, key: str = "") -> None:
+        """Consume one log line; key separates animation numbering of parallel scenes."""
+        m = _ANIMATION_DONE_RE.search(line)
+        if not m:
+            return
+        self.done.add((key, int(m.group(1))))
+        if not self.total:
+            publish(self.generation_id, message=f"Rendered {len(self.done)} animations...")
+            return
+        fraction = min(1.0, len(self.done) / self.total)
+        elapsed = time.monotonic() - self.started_at
+        eta = elapsed / fraction * (1 - fraction) if fraction > 0 else None
+        publish(
+            self.generation_id,
+            message=f"Rendering animation {len(self.done)} of {self.total}...",
+            progress=round(self.start + fraction * (self.end - self.start), 1),
+            eta_seconds=round(eta, 1) if eta is not None else None,
+        )
@@ -0,0 +1,310 @@
+"""
+Storyboard and code cache for repeated and near-duplicate prompts (SQLite).
+
+Classrooms send the same prompt many times ("animate a neural network",
+"Animate a neural network!"), and each one used to pay for script_writer and
+code_writer. Once a prompt's code has been validated (it passed preflight in
+/chat, or rendered in a video job), its storyboard and code are stored under
+the prompt's normalized text. A later prompt is served from the cache when:
+
+- its normalized text is the same (case, punctuation, articles and "please"
+  don't matter), or
+- it is a near duplicate: the MinHash estimate of the Jaccard similarity of
+  the two prompts' character trigrams is at least PROMPT_CACHE_SIMILARITY, and
+  both mention the same numbers and colours ("3 layers" never matches "4
+  layers", "red circles" never matches "blue circles").
+  Candidates come from a locality-sensitive hashing index (bands of the
+  MinHash signature), so a lookup doesn't scan every entry.
+
+Entries are per render mode, expire after PROMPT_CACHE_TTL, and the least
+recently used are evicted beyond PROMPT_CACHE_MAX_ENTRIES. Requests with
+"regenerate": true skip the lookup and replace the entry with the new result.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from . import metrics
+from .preflight import preflight
+
+BASE_PATH = Path(__file__).parent.parent
+PROMPT_CACHE_DB = Path(os.getenv("PROMPT_CACHE_DB", BASE_PATH / "prompt_cache.db"))
+# Set to 0 to always run the agents
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE", "1") != "0"
+# Seconds an entry is served
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", str(7 * 24 * 3600)))
+# Least recently used entries are evicted beyond this many
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "2000"))
+# Minimum estimated similarity (0-1) for a near-duplicate prompt to be served (1 = exact matches only)
+PROMPT_CACHE_SIMILARITY = float(os.getenv("PROMPT_CACHE_SIMILARITY", "0.8"))
+
+# 64 MinHash values in 16 bands of 4: prompts at similarity 0.8 share a band ~99.9% of the time
+NUM_HASHES = 64
+BAND_ROWS = 4
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    key TEXT PRIMARY KEY,
+    render_mode TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    normalized TEXT NOT NULL,
+    exact_terms TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    storyboard TEXT,
+    code TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    hits INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prompts_used ON prompts (used_at);
+CREATE TABLE IF NOT EXISTS bands (
+    band TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (band, key)
+) WITHOUT ROWID;
+"""
+
+_WORD_RE = re.compile(r"\w+")
+# Terms a near duplicate must share: numbers and colours end up literally in the code
+_EXACT_TERM_RE = re.compile(
+    r"\d+(?:\.\d+)?|\b(?:red|blue|green|yellow|orange|purple|pink|white|black|gray|grey|gold|teal|maroon|brown)\b"
+)
+# Words that don't change what is animated
+_FILLER_WORDS = {"a", "an", "the", "please", "can", "could", "would", "you", "me", "for", "some"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, drop punctuation and filler words, collapse whitespace."""
+    words = _WORD_RE.findall(unicodedata.normalize("NFKC", prompt or "").lower())
+    return " ".join(w for w in words if w not in _FILLER_WORDS) or " ".join(words)
+
+
+def minhash(normalized: str) -> list[int]:
+    """MinHash signature of a normalized prompt's character trigrams."""
+    text = f" {normalized} "
+    shingles = {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _HASH_PARAMS]
+
+
+def similarity(signature_a: list[int], signature_b: list[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / NUM_HASHES
+
+
+def _bands(signature: list[int], render_mode: str) -> list[str]:
+    return [
+        f"{render_mode}:{i}:" + ",".join(map(str, signature[i:i + BAND_ROWS]))
+        for i in range(0, NUM_HASHES, BAND_ROWS)
+    ]
+
+
+def _exact_terms(normalized: str) -> str:
+    return json.dumps(sorted(_EXACT_TERM_RE.findall(normalized)))
+
+
+def _key(normalized: str, render_mode: str) -> str:
+    return hashlib.sha256(f"{render_mode}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Prompt -> storyboard and code table shared by every process that opens the same file.
+
+    Args:
+        path: Database file.
+        ttl: Seconds an entry is served.
+        max_entries: Entries kept; the least recently used beyond this are evicted.
+        threshold: Minimum similarity for a near-duplicate match.
+    """
+
+    def __init__(self, path: Path = PROMPT_CACHE_DB, ttl: float = PROMPT_CACHE_TTL,
+                 max_entries: int = PROMPT_CACHE_MAX_ENTRIES, threshold: float = PROMPT_CACHE_SIMILARITY):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, prompt: str, render_mode: str = "single") -> dict | None:
+        """
+        The entry for prompt, or its closest near duplicate.
+
+        Returns:
+            dict | None: {"key", "prompt" (the cached one), "storyboard", "code",
+            "match": "exact" | "near", "similarity"}, or None on a miss.
+        """
+        normalized = normalize_prompt(prompt)
+        now = time.time()
+        fresh_after = now - self.ttl
+        columns = "key, prompt, storyboard, code, signature"
+        row = self._db.execute(
+            f"SELECT {columns} FROM prompts WHERE key = ? AND created_at > ?", (_key(normalized, render_mode), fresh_after)
+        ).fetchone()
+        match, score = "exact", 1.0
+        if row is None and self.threshold < 1:
+            signature = minhash(normalized)
+            bands = _bands(signature, render_mode)
+            candidates = self._db.execute(
+                f"""SELECT {columns} FROM prompts WHERE created_at > ? AND exact_terms = ? AND key IN
+                    (SELECT key FROM bands WHERE band IN ({", ".join("?" * len(bands))}))""",
+                (fresh_after, _exact_terms(normalized), *bands),
+            ).fetchall()
+            scored = [(similarity(signature, json.loads(c[4])), c) for c in candidates]
+            scored = [s for s in scored if s[0] >= self.threshold]
+            if scored:
+                score, row = max(scored, key=lambda s: s[0])
+                match = "near"
+        if row is None:
+            return None
+        self._db.execute("UPDATE prompts SET used_at = ?, hits = hits + 1 WHERE key = ?", (now, row[0]))
+        return {"key": row[0], "prompt": row[1], "storyboard": row[2], "code": row[3], "match": match, "similarity": round(score, 3)}
+
+    def put(self, prompt: str, code: str, storyboard: str | None = None, render_mode: str = "single") -> int:
+        """
+        Store (or replace) a prompt's storyboard and code, dropping expired entries and evicting beyond max_entries.
+
+        Returns:
+            int: Number of entries evicted to stay within max_entries.
+        """
+        normalized = normalize_prompt(prompt)
+        key = _key(normalized, render_mode)
+        signature = minhash(normalized)
+        now = time.time()
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                """INSERT OR REPLACE INTO prompts
+                   (key, render_mode, prompt, normalized, exact_terms, signature, storyboard, code, created_at, used_at, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (key, render_mode, prompt, normalized, _exact_terms(normalized), json.dumps(signature),
+                 storyboard, code, now, now),
+            )
+            self._db.execute("DELETE FROM bands WHERE key = ?", (key,))
+            self._db.executemany("INSERT OR IGNORE INTO bands (band, key) VALUES (?, ?)", [(b, key) for b in _bands(signature, render_mode)])
+            self._db.execute("DELETE FROM prompts WHERE created_at <= ?", (now - self.ttl,))
+            evicted = self._db.execute(
+                "DELETE FROM prompts WHERE key IN (SELECT key FROM prompts ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._db.execute("DELETE FROM bands WHERE key NOT IN (SELECT key FROM prompts)")
+        return evicted
+
+    def forget(self, key: str) -> None:
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM prompts WHERE key = ?", (key,))
+            self._db.execute("DELETE FROM bands WHERE key = ?", (key,))
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_cache: PromptCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> PromptCache:
+    """The prompt cache at PROMPT_CACHE_DB, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptCache()
+        return _cache
+
+
+def lookup(prompt: str, render_mode: str = "single") -> dict | None:
+    """
+    Cached storyboard and code for a prompt (see PromptCache.get), counting hits in metrics.
+
+    Args:
+        prompt: The user's prompt.
+        render_mode: Entries are kept apart per render mode.
+
+    Returns:
+        dict | None: The entry, or None on a miss (or with PROMPT_CACHE=0).
+    """
+    if not PROMPT_CACHE_ENABLED:
+        return None
+    metrics.incr("prompt_cache.lookups")
+    try:
+        entry = get_cache().get(prompt, render_mode)
+    except sqlite3.Error as e:
+        print(f"Prompt cache lookup failed: {e}")
+        entry = None
+    if entry is None:
+        metrics.incr("prompt_cache.misses")
+        return None
+    metrics.incr(f"prompt_cache.{entry['match']}_hits")
+    print(f"Prompt cache {entry['match']} hit ({entry['similarity']}) for {prompt!r}: {entry['prompt']!r}")
+    return entry
+
+
+def remember(prompt: str, code: str, storyboard: str | None = None, render_mode: str = "single") -> bool:
+    """
+    Store a prompt's storyboard and code if the code passes preflight.
+
+    Args:
+        prompt: The user's prompt.
+        code: Code that rendered (or at least passed preflight).
+        storyboard: script_writer's storyboard (with its [CHAT] reply).
+        render_mode: The render mode the code was written for.
+
+    Returns:
+        bool: Whether it was stored.
+    """
+    if not PROMPT_CACHE_ENABLED or not code:
+        return False
+    report = preflight(code)
+    if report["error"] is not None:
+        return False
+    try:
+        metrics.incr("prompt_cache.evicted", get_cache().put(prompt, report["code"], storyboard, render_mode))
+    except sqlite3.Error as e:
+        print(f"Prompt cache store failed: {e}")
+        return False
+    metrics.incr("prompt_cache.stored")
+    return True
+
+
+def forget(entry: dict) -> None:
+    """Drop a served entry whose code failed (the next request regenerates it)."""
+    if PROMPT_CACHE_ENABLED:
+        get_cache().forget(entry["key"])
+        metrics.incr("prompt_cache.forgotten")
+
+
+def stats() -> dict:
+    """Prompt cache figures for /metrics."""
+    lookups = metrics.counter("prompt_cache.lookups")
+    exact = metrics.counter("prompt_cache.exact_hits")
+    near = metrics.counter("prompt_cache.near_hits")
+    return {
+        "enabled": PROMPT_CACHE_ENABLED,
+        "entries": get_cache().count() if PROMPT_CACHE_ENABLED else 0,
+        "lookups": lookups,
+        "exact_hits": exact,
+        "near_hits": near,
+        "hit_rate": round((exact + near) / lookups, 3) if lookups else 0.0,
+        "stored": metrics.counter("prompt_cache.stored"),
+        "forgotten": metrics.counter("prompt_cache.forgotten"),
+        "evicted": metrics.counter("prompt_cache.evicted"),
+        "similarity_threshold": PROMPT_CACHE_SIMILARITY,
+    }
@@ -0,0 +1,154 @@
+"""
+Remote render worker.
+
+Pulls render jobs that API nodes running with RENDERER=remote put on the render
+queue (RENDER_QUEUE_DB), renders them with the local pool, uploads the video to
+shared storage (RENDER_STORAGE_DIR) and stores the manim output as the job
+result. Start as many as the render load needs, on any machine that can reach
+the queue file and the storage directory:
+
+    python -m ai_agent.remote_worker --concurrency 2
+
+Render progress is written to the shared status store (STATUS_DB), so
+/video-status and /video-events keep updating while a remote worker renders.
+A worker that dies mid-render stops heartbeating and its job is requeued for
+another worker.
+
+A job's workspace is kept between attempts so fixer retries of the same
+generation reuse manim's partial movie files; workspaces no attempt has used
+for REMOTE_WORKSPACE_TTL_SECONDS are swept.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import time
+
+from . import progress
+from .job_queue import JobQueue
+from .render_pool import JOBS_CODE_ROOT, JOBS_MEDIA_ROOT, MAX_CONCURRENT_RENDERS, cleanup_workspace, job_workspace, start_warm_pool, stop_warm_pool, write_scene
+from .renderers import RENDER_QUEUE_DB, LocalDirectoryStorage, LocalPoolRenderer, Renderer, rendered_video
+from .status_store import StatusStore
+
+WORKER_NAME = f"{socket.gethostname()}-{os.getpid()}"
+# Remove a job's workspace once no attempt has used it for this long (longer than a generation's retries take)
+REMOTE_WORKSPACE_TTL_SECONDS = float(os.getenv("REMOTE_WORKSPACE_TTL_SECONDS", str(6 * 3600)))
+WORKSPACE_SWEEP_SECONDS = 600
+
+
+def sweep_workspaces(max_age: float = REMOTE_WORKSPACE_TTL_SECONDS) -> int:
+    """Remove job workspaces that no attempt has used for max_age seconds; returns how many."""
+    cutoff = time.time() - max_age
+    last_used: dict[str, float] = {}
+    for root in (JOBS_CODE_ROOT, JOBS_MEDIA_ROOT):
+        if root.exists():
+            for path in root.iterdir():
+                if path.is_dir():
+                    last_used[path.name] = max(last_used.get(path.name, 0.0), path.stat().st_mtime)
+    stale = [job_id for job_id, used in last_used.items() if used < cutoff]
+    for job_id in stale:
+        cleanup_workspace(job_id)
+    return len(stale)
+
+
+async def _sweep_periodically() -> None:
+    while True:
+        removed = sweep_workspaces()
+        if removed:
+            print(f"[{WORKER_NAME}] Removed {removed} unused job workspaces")
+        await asyncio.sleep(WORKSPACE_SWEEP_SECONDS)
+
+
+def make_handler(renderer: Renderer, storage: LocalDirectoryStorage):
+    """Queue handler that renders one job and uploads its video."""
+
+    async def handle(render_id: str, payload: dict) -> dict:
+        job_id = payload["job_id"]
+        scenes_path, media_dir = job_workspace(job_id)
+        # Mark the workspace as in use for the sweep
+        for path in (scenes_path.parent, media_dir):
+            os.utime(path)
+        stitched_path = media_dir / "videos" / "stitched" / f"{render_id}.mp4"
+        job = {**payload, "scene_file": str(scenes_path), "media_dir": str(media_dir), "output": str(stitched_path)}
+        print(f"[{WORKER_NAME}] Rendering {render_id} ({', '.join(payload['scene_names'])})")
+
+        tracker = progress.RenderProgress(payload.get("generation_id"), None)
+        seen_dry_runs = []
+
+        def on_dry_run(dry_runs):
+            seen_dry_runs.extend(dry_runs)
+            tracker.total = sum(d["num_plays"] or 0 for d in dry_runs) or None
+
+        video = None
+        try:
+            write_scene(scenes_path, payload["code"])
+            result, report = await renderer.render(job, on_line=tracker.feed, on_dry_run=on_dry_run)
+            video_key = None
+            if result.returncode == 0:
+                video = rendered_video(result, job)
+                if video is None:
+                    return {"returncode": 1, "stdout": result.stdout, "stderr": "Render finished but no video file was found", "dry_runs": seen_dry_runs, "worker": WORKER_NAME}
+                video_key = f"{render_id}.mp4"
+                storage.put(video_key, video)
+        finally:
+            # The API node publishes the terminal status; this process only relays render progress
+            progress.forget(payload.get("generation_id") or "")
+            # Drop this attempt's videos; the partial movie files stay for the next attempt
+            for path in (stitched_path, video):
+                if path is not None:
+                    path.unlink(missing_ok=True)
+        return {
+            "returncode": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "dry_runs": seen_dry_runs,
+            "timing": report.get("timing"),
+            "video_key": video_key,
+            "worker": WORKER_NAME,
+        }
+
+    return handle
+
+
+async def serve(renderer: Renderer | None = None, concurrency: int = MAX_CONCURRENT_RENDERS, queue_path=RENDER_QUEUE_DB, storage: LocalDirectoryStorage | None = None, stop: asyncio.Event | None = None) -> None:
+    """
+    Run a worker until `stop` is set (forever if not given).
+
+    Args:
+        renderer: Renderer to use (a LocalPoolRenderer with warm workers by default).
+        concurrency: Render jobs taken from the queue at once.
+        queue_path: Render queue database shared with the API nodes.
+        storage: Where rendered videos are uploaded.
+        stop: Event that shuts the worker down cleanly (running jobs are requeued).
+    """
+    uses_pool = renderer is None
+    renderer = renderer or LocalPoolRenderer()
+    storage = storage or LocalDirectoryStorage()
+    if uses_pool:
+        await start_warm_pool()
+    status_store = StatusStore()
+    progress.add_listener(lambda generation_id, event: status_store.update(generation_id, **event))
+
+    queue = JobQueue(queue_path)
+    await queue.start(make_handler(renderer, storage), concurrency)
+    sweeper = asyncio.create_task(_sweep_periodically())
+    print(f"[{WORKER_NAME}] Render worker ready ({renderer.name}, concurrency {concurrency}): {queue.stats()}")
+    try:
+        await (stop or asyncio.Event()).wait()
+    finally:
+        sweeper.cancel()
+        await queue.stop()
+        await renderer.close()
+        if uses_pool:
+            await stop_warm_pool()
+        status_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_RENDERS, help="Render jobs to run at once")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(concurrency=args.concurrency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,115 @@
+"""
+Content-addressed cache of rendered videos.
+
+Keys hash the AST of the sanitized scene code together with the render quality
+and scene name, so edits that only touch whitespace or comments still hit. Videos
+are kept under media/cache/ within a disk budget; the least recently used ones
+(by mtime, refreshed on every hit) are evicted first.
+"""
+import ast
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from . import metrics
+
+BASE_PATH = Path(__file__).parent.parent
+CACHE_DIR = BASE_PATH / "media" / "cache"
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+_evict_lock = threading.Lock()
+
+
+def cache_key(code: str, quality: str, scene_name: str) -> str | None:
+    """
+    Hash the normalized code, quality and scene name into a cache key.
+
+    Args:
+        code: Sanitized scene code.
+        quality: Manim quality flag suffix (l, m, h, p, k).
+        scene_name: Scene class being rendered.
+
+    Returns:
+        str | None: Hex digest, or None if the code doesn't parse (nothing to cache).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    normalized = ast.dump(tree, include_attributes=False)
+    digest = hashlib.sha256()
+    for part in (normalized, quality, scene_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def lookup(key: str | None) -> Path | None:
+    """Return the cached video for key (marking it recently used), or None on a miss."""
+    if key is None:
+        return None
+    path = CACHE_DIR / f"{key}.mp4"
+    try:
+        os.utime(path)
+    except OSError:
+        metrics.incr("render_cache.misses")
+        return None
+    metrics.incr("render_cache.hits")
+    return path
+
+
+def store(key: str | None, video_path: Path) -> Path | None:
+    """Copy a freshly rendered video into the cache and evict down to the budget."""
+    if key is None:
+        return None
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    target = CACHE_DIR / f"{key}.mp4"
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        shutil.copyfile(video_path, tmp)
+        os.replace(tmp, target)
+    except OSError as e:
+        print(f"Warning: Could not store video in render cache: {e}")
+        tmp.unlink(missing_ok=True)
+        return None
+    evict()
+    return target
+
+
+def evict(max_bytes: int = RENDER_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used videos until the cache fits in max_bytes. Returns files removed."""
+    removed = 0
+    with _evict_lock:
+        entries = []
+        for p in CACHE_DIR.glob("*.mp4"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+    if removed:
+        metrics.incr("render_cache.evictions", removed)
+    return removed
+
+
+def stats() -> dict:
+    files = list(CACHE_DIR.glob("*.mp4")) if CACHE_DIR.exists() else []
+    hits = metrics.counter("render_cache.hits")
+    misses = metrics.counter("render_cache.misses")
+    return {
+        "entries": len(files),
+        "bytes": sum(p.stat().st_size for p in files if p.exists()),
+        "max_bytes": RENDER_CACHE_MAX_BYTES,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+    }
@@ -0,0 +1,501 @@
+import asyncio
+import base64
+import codecs
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+from .tools.filesystem import write_file
+
+# Every render job gets its own scene file and media directory under these roots,
+# so concurrent generations never overwrite each other's scenes.py or videos.
+BASE_PATH = Path(__file__).parent.parent
+JOBS_CODE_ROOT = BASE_PATH / "manim_generated_files" / "jobs"
+JOBS_MEDIA_ROOT = BASE_PATH / "media" / "jobs"
+
+# Upper bound on manim processes running at once (defaults to one per core)
+MAX_CONCURRENT_RENDERS = max(1, int(os.getenv("MAX_CONCURRENT_RENDERS", os.cpu_count() or 1)))
+
+# Warm workers keep manim imported between renders (0 disables them and every
+# render pays for a fresh `python -m manim` interpreter instead)
+RENDER_WARM_WORKERS = max(0, int(os.getenv("RENDER_WARM_WORKERS", MAX_CONCURRENT_RENDERS)))
+# Recycle a warm worker after this many jobs or once its RSS grows past the limit
+RENDER_WORKER_MAX_JOBS = max(1, int(os.getenv("RENDER_WORKER_MAX_JOBS", "50")))
+RENDER_WORKER_MAX_RSS_MB = float(os.getenv("RENDER_WORKER_MAX_RSS_MB", "1500"))
+# Wait before retrying a worker that failed to start, doubling (up to the max) while starts keep failing
+RENDER_WORKER_RESPAWN_DELAY = 1.0
+RENDER_WORKER_RESPAWN_MAX_DELAY = 60.0
+# Partial movie files manim keeps per scene. The default of 100 can evict animations
+# that an upcoming fixer retry of the same generation would otherwise reuse.
+RENDER_MAX_FILES_CACHED = int(os.getenv("RENDER_MAX_FILES_CACHED", "1000"))
+
+_CACHED_ANIMATION_RE = re.compile(r"Animation (\d+) : Using cached data")
+_RENDERED_ANIMATION_RE = re.compile(r"Animation (\d+) : Partial movie file written")
+
+_render_slots: asyncio.Semaphore | None = None
+warm_pool: "WarmWorkerPool | None" = None
+
+
+def _get_render_slots() -> asyncio.Semaphore:
+    """Create the render semaphore lazily so it binds to the running event loop."""
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(MAX_CONCURRENT_RENDERS)
+    return _render_slots
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def job_workspace(job_id: str) -> tuple[Path, Path]:
+    """
+    Return the (scene_path, media_dir) pair reserved for a render job.
+
+    Args:
+        job_id: Generation ID (or any unique token) identifying the job.
+
+    Returns:
+        tuple: Path of the job's scenes.py and the media directory manim should write to.
+    """
+    code_dir = JOBS_CODE_ROOT / job_id
+    media_dir = JOBS_MEDIA_ROOT / job_id
+    code_dir.mkdir(parents=True, exist_ok=True)
+    media_dir.mkdir(parents=True, exist_ok=True)
+    return code_dir / "scenes.py", media_dir
+
+
+def cleanup_workspace(job_id: str) -> None:
+    """Remove a job's scene file and intermediate media once the final video has been copied out."""
+    for root in (JOBS_CODE_ROOT, JOBS_MEDIA_ROOT):
+        shutil.rmtree(root / job_id, ignore_errors=True)
+
+
+def write_scene(scenes_path: Path, code: str) -> None:
+    """Write a job's scene file, plus placeholder PNGs for any ImageMobject files it references."""
+    if not write_file(path=str(scenes_path), content=code):
+        raise RuntimeError(f"Failed to write Manim scene to {scenes_path}")
+
+    # Ensure any referenced images exist to avoid Manim FileNotFoundError
+    try:
+        img_names = set(re.findall(r"ImageMobject\((?:\\\"|\')([^\"']+)(?:\\\"|\')\)", code))
+        if img_names:
+            # 1x1 transparent PNG
+            tiny_png_b64 = (
+                b"iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAEElEQVR42mP8/5+hHgAHGgK8N1d9WwAAAABJRU5ErkJggg=="
+            )
+            png_bytes = base64.b64decode(tiny_png_b64)
+            for name in img_names:
+                candidates = []
+                p_name = Path(name)
+                # Candidate 1: CWD/name
+                candidates.append(Path.cwd() / p_name)
+                # Candidate 2: alongside scenes.py
+                candidates.append(scenes_path.parent / p_name)
+                for candidate in candidates:
+                    try:
+                        candidate.parent.mkdir(parents=True, exist_ok=True)
+                        if not candidate.exists():
+                            with open(candidate, "wb") as f:
+                                f.write(png_bytes)
+                            print(f"Created placeholder image: {candidate}")
+                        else:
+                            print(f"Image already exists: {candidate}")
+                    except Exception as ie:
+                        print(f"Failed creating placeholder at {candidate}: {ie}")
+    except Exception as e:
+        print(f"Warning: Could not ensure placeholder images: {e}")
+
+
+def animation_cache_stats(output: str) -> dict:
+    """
+    Count animations manim served from its partial movie cache vs. rendered anew.
+
+    Args:
+        output: Render log (stdout) of one or more manim runs.
+
+    Returns:
+        dict: {"cached": int, "rendered": int}
+    """
+    return {
+        "cached": len(_CACHED_ANIMATION_RE.findall(output)),
+        "rendered": len(_RENDERED_ANIMATION_RE.findall(output)),
+    }
+
+
+def find_rendered_video(media_dir: Path, scene_name: str) -> Path | None:
+    """Locate the final mp4 manim wrote for scene_name inside a job's media directory."""
+    for p in (media_dir / "videos").glob(f"**/{scene_name}.mp4"):
+        if "partial_movie_files" not in p.parts:
+            return p
+    return None
+
+
+def _worker_env() -> dict:
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(BASE_PATH), env.get("PYTHONPATH")) if p)
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        env["FFMPEG_BINARY"] = ffmpeg_path
+    return env
+
+
+class _WarmWorker:
+    """A single long-lived render_worker process and its bookkeeping."""
+
+    def __init__(self, proc: asyncio.subprocess.Process, rss_mb: float | None):
+        self.proc = proc
+        self.rss_mb = rss_mb
+        self.jobs_done = 0
+
+    @classmethod
+    async def spawn(cls) -> "_WarmWorker":
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "ai_agent.render_worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=_worker_env(),
+            limit=16 * 1024 * 1024,  # result messages carry the full render log
+        )
+        line = await proc.stdout.readline()
+        if not line:
+            await proc.wait()
+            raise RuntimeError(f"Render worker exited during startup (code {proc.returncode})")
+        ready = json.loads(line)
+        return cls(proc, ready.get("rss_mb"))
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    def should_recycle(self, max_jobs: int, max_rss_mb: float) -> bool:
+        if not self.alive or self.jobs_done >= max_jobs:
+            return True
+        return self.rss_mb is not None and self.rss_mb > max_rss_mb
+
+    async def run(self, job: dict, on_log=None) -> dict:
+        self.proc.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+        await self.proc.stdin.drain()
+        while True:
+            line = await self.proc.stdout.readline()
+            if not line:
+                code = await self.proc.wait()
+                return {
+                    "returncode": code or 1,
+                    "stdout": "",
+                    "stderr": f"Render worker exited unexpectedly (code {code})",
+                    "video_path": None,
+                }
+            message = json.loads(line)
+            if message.get("type") == "log":
+                if on_log:
+                    on_log(message["line"])
+            elif message.get("type") == "result":
+                self.jobs_done += 1
+                self.rss_mb = message.get("rss_mb")
+                return message
+
+    async def stop(self) -> None:
+        if self.alive:
+            self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+
+
+class WarmWorkerPool:
+    """
+    Pool of render_worker processes that import manim once and render many scenes.
+
+    Workers are handed out one job at a time and replaced after
+    RENDER_WORKER_MAX_JOBS jobs, when their RSS exceeds RENDER_WORKER_MAX_RSS_MB,
+    or when they die.
+    """
+
+    def __init__(self, size: int, max_jobs: int = RENDER_WORKER_MAX_JOBS, max_rss_mb: float = RENDER_WORKER_MAX_RSS_MB):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        # None entries stand for slots whose worker failed to (re)start; they wake a
+        # waiting job so it can fall back to a cold subprocess instead of hanging
+        self._idle: asyncio.Queue[_WarmWorker | None] = asyncio.Queue()
+        self._dead_slots = 0
+        self._busy = 0
+        self._starting = 0
+        self._spawn_failures = 0  # consecutive failed starts, for the respawn backoff
+        self.recycled = 0
+        self._closed = False
+
+    async def start(self) -> None:
+        await asyncio.gather(*(self._replenish() for _ in range(self.size)))
+
+    async def _replenish(self, delay: float = 0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        if self._closed:
+            return
+        self._starting += 1
+        try:
+            worker = await _WarmWorker.spawn()
+            self._spawn_failures = 0
+        except Exception as e:
+            print(f"Warning: Could not start warm render worker: {e}")
+            worker = None
+            self._dead_slots += 1
+            self._spawn_failures += 1
+        finally:
+            self._starting -= 1
+        self._idle.put_nowait(worker)
+
+    @property
+    def free(self) -> int:
+        return self._idle.qsize() - self._dead_slots
+
+    @property
+    def available(self) -> bool:
+        """True if a job submitted now would eventually get a warm worker."""
+        return not self._closed and (self.free + self._busy + self._starting) > 0
+
+    async def render(self, job: dict, on_log=None) -> dict | None:
+        """Run a job on the next free worker; None means no warm worker could be started."""
+        worker = await self._idle.get()
+        if worker is None:
+            # Retry the slot in the background so one failed start doesn't shrink the pool for good
+            self._dead_slots -= 1
+            delay = min(RENDER_WORKER_RESPAWN_MAX_DELAY, RENDER_WORKER_RESPAWN_DELAY * 2 ** max(0, self._spawn_failures - 1))
+            asyncio.ensure_future(self._replenish(delay))
+            return None
+        self._busy += 1
+        try:
+            result = await worker.run(job, on_log=on_log)
+        except BaseException:
+            # Cancelled or broken mid-job: the worker's state is unknown, replace it
+            worker.proc.kill()
+            await worker.proc.wait()
+            asyncio.ensure_future(self._replenish())
+            raise
+        finally:
+            self._busy -= 1
+        if worker.should_recycle(self.max_jobs, self.max_rss_mb):
+            self.recycled += 1
+            await worker.stop()
+            asyncio.ensure_future(self._replenish())
+        else:
+            self._idle.put_nowait(worker)
+        return result
+
+    async def close(self) -> None:
+        self._closed = True
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                await worker.stop()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "free": self.free,
+            "busy": self._busy,
+            "starting": self._starting,
+            "recycled": self.recycled,
+        }
+
+
+async def start_warm_pool() -> None:
+    """Start the warm worker pool (called once from the app lifespan)."""
+    global warm_pool
+    if RENDER_WARM_WORKERS <= 0 or warm_pool is not None:
+        return
+    warm_pool = WarmWorkerPool(RENDER_WARM_WORKERS)
+    await warm_pool.start()
+    print(f"Warm render workers ready: {warm_pool.stats()}")
+
+
+async def stop_warm_pool() -> None:
+    global warm_pool
+    if warm_pool is not None:
+        await warm_pool.close()
+        warm_pool = None
+
+
+def warm_pool_status() -> dict:
+    if warm_pool is None:
+        return {"enabled": False, "size": 0, "free": 0, "busy": 0, "starting": 0, "recycled": 0}
+    return {"enabled": True, **warm_pool.stats()}
+
+
+async def _run_worker_once(job: dict) -> dict:
+    """Run a single job on a throwaway render_worker process (no warm pool available)."""
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "ai_agent.render_worker",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        env=_worker_env(),
+        limit=16 * 1024 * 1024,
+    )
+    try:
+        stdout, _ = await proc.communicate((json.dumps(job) + "\n").encode("utf-8"))
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+    for line in reversed(stdout.decode("utf-8", errors="replace").splitlines()):
+        message = json.loads(line)
+        if message.get("type") == "result":
+            return message
+    return {
+        "returncode": proc.returncode or 1,
+        "stdout": "",
+        "stderr": f"Render worker exited without a result (code {proc.returncode})",
+        "video_path": None,
+    }
+
+
+async def dry_run_scene(scene_path: Path, scene_name: str, media_dir: Path) -> dict:
+    """
+    Run a scene's construct() with animations skipped and no frames or video written.
+
+    Python-level errors (TypeError, AttributeError, NameError, ...) surface here in
+    about a second instead of after a full render has been set up.
+
+    Returns:
+        dict: {"ok": bool, "num_plays": int | None, "error": traceback text, "elapsed": seconds}
+    """
+    job = {
+        "op": "dry_run",
+        "scene_file": str(scene_path),
+        "scene_name": scene_name,
+        "media_dir": str(media_dir),
+    }
+    async with _get_render_slots():
+        result = None
+        if warm_pool is not None and warm_pool.available:
+            result = await warm_pool.render(job)
+        if result is None:
+            result = await _run_worker_once(job)
+    return {
+        "ok": result.get("returncode") == 0,
+        "num_plays": result.get("num_plays"),
+        "error": result.get("stderr") or "",
+        "elapsed": result.get("elapsed", 0.0),
+    }
+
+
+async def count_animations(scene_path: Path, scene_name: str, media_dir: Path) -> int | None:
+    """
+    Count the play()/wait() calls a scene makes, using a dry run.
+
+    Returns:
+        int | None: Number of animations, or None if the scene failed to run.
+    """
+    result = await dry_run_scene(scene_path, scene_name, media_dir)
+    return result["num_plays"] if result["ok"] else None
+
+
+async def run_manim(scene_path: Path, scene_name: str, media_dir: Path, quality: str = "l", env: dict | None = None, animation_range: tuple[int, int] | None = None, on_line=None) -> subprocess.CompletedProcess:
+    """
+    Render one scene, on a warm worker when one is available.
+
+    Waits for a free render slot first, so at most MAX_CONCURRENT_RENDERS renders
+    run at once while the API event loop stays responsive. Falls back to a cold
+    `python -m manim` subprocess when the warm pool is disabled or failed to start.
+
+    Args:
+        scene_path: Path to the job's scene file.
+        scene_name: Scene class to render.
+        media_dir: Job-specific media directory passed to manim's --media_dir.
+        quality: Manim quality flag suffix (l, m, h, p, k).
+        env: Environment for the subprocess.
+        animation_range: Optional inclusive (first, last) animation indices to render (manim's -n).
+        on_line: Optional callback receiving each line of manim's output as it is produced.
+
+    Returns:
+        subprocess.CompletedProcess: Return code and decoded stdout/stderr of the render.
+    """
+    async with _get_render_slots():
+        if warm_pool is not None and warm_pool.available:
+            job = {
+                "scene_file": str(scene_path),
+                "scene_name": scene_name,
+                "media_dir": str(media_dir),
+                "quality": quality,
+                "max_files_cached": RENDER_MAX_FILES_CACHED,
+            }
+            if animation_range is not None:
+                job["from_animation"], job["upto_animation"] = animation_range
+            result = await warm_pool.render(job, on_log=on_line)
+            if result is not None:
+                return subprocess.CompletedProcess(
+                    ["render_worker", str(scene_path), scene_name],
+                    result["returncode"],
+                    result.get("stdout") or "",
+                    result.get("stderr") or "",
+                )
+        return await _run_manim_subprocess(scene_path, scene_name, media_dir, quality, env, animation_range, on_line)
+
+
+async def _read_lines(stream: asyncio.StreamReader, lines: list[str], on_line=None) -> None:
+    """Collect a subprocess stream line by line (splitting on \\r too, for progress bars)."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        *complete, pending = re.split(r"\r\n|\r|\n", pending)
+        for line in complete:
+            lines.append(line)
+            if on_line and line.strip():
+                on_line(line)
+    if pending:
+        lines.append(pending)
+        if on_line and pending.strip():
+            on_line(pending)
+
+
+async def _run_manim_subprocess(scene_path: Path, scene_name: str, media_dir: Path, quality: str, env: dict | None, animation_range: tuple[int, int] | None = None, on_line=None) -> subprocess.CompletedProcess:
+    """Cold path: render with a fresh `python -m manim` interpreter."""
+    config_file = scene_path.parent / "manim.cfg"
+    if not config_file.exists():
+        config_file.write_text(f"[CLI]\nmax_files_cached = {RENDER_MAX_FILES_CACHED}\n", encoding="utf-8")
+    cmd = [
+        sys.executable, "-m", "manim", f"-q{quality}",
+        "--media_dir", str(media_dir),
+        "--config_file", str(config_file),
+        "--progress_bar", "none",
+    ]
+    if animation_range is not None:
+        cmd += ["-n", f"{animation_range[0]},{animation_range[1]}"]
+    cmd += [str(scene_path), scene_name]
+    # Wide virtual terminal so Rich doesn't wrap manim's log lines (they get parsed)
+    env = dict(env if env is not None else os.environ)
+    env.setdefault("COLUMNS", "400")
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    # Stream output as it's produced (for live progress) rather than buffering until exit
+    stdout_lines: list[str] = []
+    stderr_lines: list[str] = []
+    try:
+        await asyncio.gather(
+            _read_lines(proc.stdout, stdout_lines, on_line),
+            _read_lines(proc.stderr, stderr_lines, on_line),
+        )
+        await proc.wait()
+    except asyncio.CancelledError:
+        # Don't leave an orphaned manim process behind a cancelled request
+        proc.kill()
+        await proc.wait()
+        raise
+    return subprocess.CompletedProcess(cmd, proc.returncode, "\n".join(stdout_lines), "\n".join(stderr_lines))
@@ -0,0 +1,173 @@
+"""
+Long-lived Manim render worker.
+
+Started by WarmWorkerPool as `python -m ai_agent.render_worker`. The worker imports
+manim (and initializes Cairo/Pango) once, then renders jobs read from stdin as JSON
+lines, one at a time. Replies are JSON lines on the original stdout:
+
+    {"type": "ready", "pid": ..., "rss_mb": ...}
+    {"type": "log", "line": ...}            # manim log output while a job runs
+    {"type": "result", "returncode": ..., "stdout": ..., "stderr": ..., "video_path": ..., "rss_mb": ...}
+
+Jobs with "op": "dry_run" run construct() with animations skipped and nothing
+written, which surfaces Python-level errors (TypeError, NameError, ...) in well
+under a second, and report the number of animations in "num_plays". Render jobs may set
+"from_animation"/"upto_animation" (inclusive, like manim's -n) to render a range.
+The worker exits when stdin closes, so it can also be run for a single job.
+"""
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+
+
+def _current_rss_mb() -> float | None:
+    """Resident set size of this process in MB (None if it can't be determined)."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux and bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except Exception:
+        return None
+
+
+class _JobLogHandler(logging.Handler):
+    """Forward manim's log records for the current job to the pool and keep a copy."""
+
+    def __init__(self, send):
+        super().__init__(level=logging.INFO)
+        self.send = send
+        self.lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = record.getMessage().strip()
+        except Exception:
+            return
+        if line:
+            self.lines.append(line)
+            self.send({"type": "log", "line": line})
+
+
+def render_job(job: dict, send) -> dict:
+    """
+    Render one scene in-process using the already imported manim.
+
+    Args:
+        job: Job description with scene_file, scene_name, media_dir, quality and
+            optionally op ("render" or "dry_run") and an animation range.
+        send: Callable used to push progress messages back to the pool.
+
+    Returns:
+        dict: Result message (returncode, stdout, stderr, video_path, num_plays).
+    """
+    from manim import tempconfig
+    from manim.constants import QUALITIES
+    from manim.utils.module_ops import scene_classes_from_file
+
+    scene_file = Path(job["scene_file"])
+    scene_name = job["scene_name"]
+    quality = next((q for q in QUALITIES.values() if q["flag"] == job.get("quality", "l")), QUALITIES["low_quality"])
+    overrides = {
+        "input_file": str(scene_file),
+        "scene_names": [scene_name],
+        "media_dir": job["media_dir"],
+        "pixel_width": quality["pixel_width"],
+        "pixel_height": quality["pixel_height"],
+        "frame_rate": quality["frame_rate"],
+    }
+    if job.get("max_files_cached") is not None:
+        overrides["max_files_cached"] = job["max_files_cached"]
+    dry_run = job.get("op") == "dry_run"
+    if dry_run:
+        overrides.update({"dry_run": True, "disable_caching": True})
+    if job.get("from_animation") is not None:
+        overrides["from_animation_number"] = job["from_animation"]
+    if job.get("upto_animation") is not None:
+        overrides["upto_animation_number"] = job["upto_animation"]
+
+    # manim's get_module registers the scene file under its dotted path and puts
+    # the job directory at the front of sys.path on every load
+    module_name = ".".join(scene_file.with_suffix("").parts)
+    job_dir = str(scene_file.parent.absolute())
+    job_dir_entries = sys.path.count(job_dir)
+
+    handler = _JobLogHandler(send)
+    manim_logger = logging.getLogger("manim")
+    manim_logger.addHandler(handler)
+    started = time.perf_counter()
+    try:
+        with tempconfig(overrides):
+            scene_classes = scene_classes_from_file(scene_file, full_list=True)
+            scene_class = next((c for c in scene_classes if c.__name__ == scene_name), None)
+            if scene_class is None:
+                raise LookupError(f"Scene class '{scene_name}' not found in {scene_file}")
+            scene = scene_class(skip_animations=dry_run)
+            scene.render()
+            num_plays = scene.renderer.num_plays
+            video_path = None if dry_run else str(scene.renderer.file_writer.movie_file_path)
+        if video_path:
+            handler.lines.append(f"File ready at '{video_path}'")
+        return {
+            "type": "result",
+            "returncode": 0,
+            "stdout": "\n".join(handler.lines),
+            "stderr": "",
+            "video_path": video_path,
+            "num_plays": num_plays,
+            "elapsed": time.perf_counter() - started,
+        }
+    except Exception:
+        return {
+            "type": "result",
+            "returncode": 1,
+            "stdout": "\n".join(handler.lines),
+            "stderr": traceback.format_exc(),
+            "video_path": None,
+            "elapsed": time.perf_counter() - started,
+        }
+    finally:
+        manim_logger.removeHandler(handler)
+        # Generated modules are re-executed per job; don't let them (or their
+        # sys.path entries) pile up in a long-lived worker
+        sys.modules.pop(module_name, None)
+        while sys.path.count(job_dir) > job_dir_entries:
+            sys.path.remove(job_dir)
+
+
+def main() -> None:
+    # Keep a private handle on the real stdout for the protocol and point fd 1 at
+    # stderr, so anything manim or the scene code prints can't corrupt the stream.
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def send(message: dict) -> None:
+        protocol.write(json.dumps(message) + "\n")
+        protocol.flush()
+
+    import manim  # noqa: F401  (the whole point: pay the import cost once)
+
+    send({"type": "ready", "pid": os.getpid(), "rss_mb": _current_rss_mb()})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        result = render_job(job, send)
+        result["rss_mb"] = _current_rss_mb()
+        send(result)
+
+
+if __name__ == "__main__":
+    main()
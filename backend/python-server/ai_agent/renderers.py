@@ -0,0 +1,327 @@
+"""
+Render backends behind one interface.
+
+generate_video hands every render to a Renderer: dry-run the scenes, then render
+them (one scene, every scene of a multi-scene file, or animation-range shards)
+into the job's output. Which backend runs is chosen with RENDERER:
+
+    pool       (default) warm worker processes / manim subprocesses on this machine
+    inprocess  manim inside the API process, one render at a time (no extra processes)
+    remote     jobs go onto a shared render queue; `python -m ai_agent.remote_worker`
+               processes (on this or other machines) render them and upload the
+               mp4 to shared storage, so render capacity scales apart from API nodes
+
+Every renderer returns (CompletedProcess, report): returncode/stdout/stderr as
+from manim (stdout ends with "File ready at '<path>'" on success) and a report
+with the dry runs and, for sharded renders, the timing.
+"""
+import asyncio
+import os
+import re
+import shutil
+import subprocess
+import time
+import uuid
+from pathlib import Path
+
+from . import metrics
+from .job_queue import JobQueue
+from .multi_scene import render_scenes
+from .render_pool import BASE_PATH, dry_run_scene, find_rendered_video, run_manim
+from .sharding import render_sharded
+from .stitching import concat_videos
+
+RENDERER = os.getenv("RENDERER", "pool")
+# Shared between API nodes and remote workers (a network filesystem when they're on different machines)
+RENDER_QUEUE_DB = Path(os.getenv("RENDER_QUEUE_DB", BASE_PATH / "render_queue.db"))
+RENDER_STORAGE_DIR = Path(os.getenv("RENDER_STORAGE_DIR", BASE_PATH / "media" / "render_storage"))
+# Give up on a remote render that hasn't finished after this many seconds
+REMOTE_RENDER_TIMEOUT = float(os.getenv("REMOTE_RENDER_TIMEOUT", "1800"))
+REMOTE_POLL_SECONDS = 0.5
+
+
+def _render_env() -> dict:
+    """Environment for manim subprocesses (FFMPEG_BINARY made explicit)."""
+    # Ensure ffmpeg is available (Manim depends on it)
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        raise RuntimeError(
+            "ffmpeg not found on PATH. Please install ffmpeg and ensure it's available on PATH.\n"
+            "Windows (choco): choco install ffmpeg\n"
+            "Windows (scoop): scoop install ffmpeg\n"
+            "Or download from https://ffmpeg.org/download.html and add bin to PATH."
+        )
+    env = os.environ.copy()
+    env["FFMPEG_BINARY"] = ffmpeg_path
+    return env
+
+
+def _failed_dry_run(job: dict, dry_runs: list[dict]) -> subprocess.CompletedProcess | None:
+    failed = [d for d in dry_runs if not d["ok"]]
+    if not failed:
+        return None
+    metrics.incr("render.dry_run_failures")
+    return subprocess.CompletedProcess(["dry_run", job["scene_file"], *job["scene_names"]], 1, "", "\n".join(d["error"] for d in failed))
+
+
+class Renderer:
+    """
+    Base class for render backends.
+
+    render() takes a job dict with job_id, generation_id, code, scene_file,
+    scene_names, media_dir, output, render_mode, quality and dry_run, plus
+    optionally checked_dry_runs: dry runs this exact code already passed (a
+    winning fixer candidate), used instead of running them again. The scene
+    file has already been written (the remote renderer ships the code instead).
+    """
+
+    name = "base"
+
+    async def render(self, job: dict, on_line=None, on_dry_run=None) -> tuple[subprocess.CompletedProcess, dict]:
+        """
+        Dry-run and render a job.
+
+        Args:
+            job: Job description (see class docstring).
+            on_line: Optional callback(line, key) for live render output.
+            on_dry_run: Optional callback(dry_runs) once the dry runs are done.
+
+        Returns:
+            tuple: (CompletedProcess, report)
+        """
+        raise NotImplementedError
+
+    async def dry_run(self, scene_file, scene_names: list[str], media_dir) -> list[dict] | None:
+        """
+        Dry-run scenes without rendering (used to vet candidate fixes).
+
+        Returns:
+            list: One dry_run_scene() style dict per scene, or None if this
+            renderer can't dry-run on this machine.
+        """
+        return None
+
+    def stats(self) -> dict:
+        return {"name": self.name}
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalPoolRenderer(Renderer):
+    """Render on this machine through render_pool (warm workers, else manim subprocesses)."""
+
+    name = "pool"
+
+    async def render(self, job: dict, on_line=None, on_dry_run=None) -> tuple[subprocess.CompletedProcess, dict]:
+        scenes_path = Path(job["scene_file"])
+        media_dir = Path(job["media_dir"])
+        output = Path(job["output"])
+        scene_names = job["scene_names"]
+        quality = job.get("quality", "l")
+        env = _render_env()
+
+        # Dry run construct() first: broken code fails here in about a second with a
+        # traceback for the fixer, instead of after a full render has been set up
+        dry_runs = job.get("checked_dry_runs") or []
+        if not dry_runs and job.get("dry_run", True):
+            dry_runs = await self.dry_run(scenes_path, scene_names, media_dir)
+        report = {"renderer": self.name, "dry_runs": dry_runs, "timing": None}
+        if on_dry_run:
+            on_dry_run(dry_runs)
+        failed = _failed_dry_run(job, dry_runs)
+        if failed:
+            return failed, report
+
+        if len(scene_names) > 1:
+            result = await render_scenes(scenes_path, scene_names, media_dir, output, quality=quality, env=env, on_line=on_line)
+        elif job.get("render_mode") == "sharded":
+            num_animations = dry_runs[0]["num_plays"] if dry_runs else None
+            result, report["timing"] = await render_sharded(scenes_path, scene_names[0], media_dir, output, quality=quality, env=env, num_animations=num_animations, on_line=on_line)
+        else:
+            result = await run_manim(scenes_path, scene_names[0], media_dir, quality=quality, env=env, on_line=on_line)
+        return result, report
+
+    async def dry_run(self, scene_file, scene_names: list[str], media_dir) -> list[dict]:
+        with metrics.timer("render.dry_run"):
+            return list(await asyncio.gather(*(dry_run_scene(Path(scene_file), name, Path(media_dir)) for name in scene_names)))
+
+
+class InProcessRenderer(Renderer):
+    """
+    Render with manim imported into this process.
+
+    manim's config is process-global, so renders are serialized; multi-scene jobs
+    render their scenes one after another and sharded jobs render in one piece.
+    Suited to development and single-user setups without spare cores.
+    """
+
+    name = "inprocess"
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    async def _run(self, job: dict, on_line=None) -> dict:
+        from .render_worker import render_job
+
+        loop = asyncio.get_running_loop()
+
+        def send(message: dict) -> None:
+            if on_line and message.get("type") == "log":
+                loop.call_soon_threadsafe(on_line, message["line"])
+
+        async with self._lock:
+            return await asyncio.to_thread(render_job, job, send)
+
+    async def dry_run(self, scene_file, scene_names: list[str], media_dir) -> list[dict]:
+        dry_runs = []
+        for name in scene_names:
+            r = await self._run({"op": "dry_run", "scene_file": str(scene_file), "scene_name": name, "media_dir": str(media_dir)})
+            dry_runs.append({"ok": r["returncode"] == 0, "num_plays": r.get("num_plays"), "error": r.get("stderr") or "", "elapsed": r.get("elapsed", 0.0)})
+        return dry_runs
+
+    async def render(self, job: dict, on_line=None, on_dry_run=None) -> tuple[subprocess.CompletedProcess, dict]:
+        _render_env()  # fail early without ffmpeg, like the other local renderers
+        scene_names = job["scene_names"]
+        base = {"scene_file": job["scene_file"], "media_dir": job["media_dir"], "quality": job.get("quality", "l")}
+
+        dry_runs = job.get("checked_dry_runs") or []
+        if not dry_runs and job.get("dry_run", True):
+            dry_runs = await self.dry_run(job["scene_file"], scene_names, job["media_dir"])
+        report = {"renderer": self.name, "dry_runs": dry_runs, "timing": None}
+        if on_dry_run:
+            on_dry_run(dry_runs)
+        failed = _failed_dry_run(job, dry_runs)
+        if failed:
+            return failed, report
+
+        cmd = ["inprocess", job["scene_file"], *scene_names]
+        results = []
+        for name in scene_names:
+            scene_line = (lambda line, name=name: on_line(line, name)) if on_line else None
+            r = await self._run({**base, "scene_name": name}, on_line=scene_line)
+            results.append(r)
+            if r["returncode"] != 0:
+                stdout = "\n".join(x.get("stdout") or "" for x in results)
+                return subprocess.CompletedProcess(cmd, r["returncode"], stdout, f"Scene {name} failed:\n{r.get('stderr') or ''}"), report
+        stdout = "\n".join(r.get("stdout") or "" for r in results)
+        if len(scene_names) > 1:
+            try:
+                await concat_videos([Path(r["video_path"]) for r in results], Path(job["output"]))
+            except RuntimeError as e:
+                return subprocess.CompletedProcess(cmd, 1, stdout, str(e)), report
+            stdout += f"\nFile ready at '{job['output']}'"
+        return subprocess.CompletedProcess(cmd, 0, stdout, ""), report
+
+
+class LocalDirectoryStorage:
+    """
+    Shared storage for rendered videos: a directory every API node and worker can reach.
+
+    Stand-in for an object store; put/get/delete are the operations a bucket client would implement.
+    """
+
+    def __init__(self, root: Path = RENDER_STORAGE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, key: str, path: Path) -> None:
+        tmp = self.root / f".{key}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, self.root / key)
+
+    def get(self, key: str, destination: Path) -> None:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.root / key, destination)
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+
+class RemoteRenderer(Renderer):
+    """
+    Hand jobs to remote workers through the render queue and fetch the mp4 from shared storage.
+
+    Dry runs happen on the worker too, so API nodes never need manim or ffmpeg.
+    """
+
+    name = "remote"
+
+    def __init__(self, queue_path: Path = RENDER_QUEUE_DB, storage: LocalDirectoryStorage | None = None, timeout: float = REMOTE_RENDER_TIMEOUT):
+        self.queue = JobQueue(queue_path)
+        self.storage = storage or LocalDirectoryStorage()
+        self.timeout = timeout
+
+    async def render(self, job: dict, on_line=None, on_dry_run=None) -> tuple[subprocess.CompletedProcess, dict]:
+        # One queue entry per attempt, so a fixer retry never picks up an earlier attempt's result
+        render_id = f"{job['job_id']}-{uuid.uuid4().hex[:8]}"
+        payload = {key: job.get(key) for key in ("job_id", "generation_id", "code", "scene_names", "render_mode", "quality", "dry_run")}
+        self.queue.submit(render_id, payload)
+        cmd = ["remote", render_id, *job["scene_names"]]
+        started = time.monotonic()
+        try:
+            while True:
+                info = self.queue.get(render_id)
+                if info["state"] in ("done", "failed"):
+                    break
+                if time.monotonic() - started > self.timeout:
+                    # Take it off the queue (or stop the worker rendering it) instead of leaving it for nobody
+                    self.queue.cancel(render_id)
+                    return subprocess.CompletedProcess(cmd, 1, "", f"Remote render {render_id} did not finish within {self.timeout:.0f}s (state {info['state']})"), {"renderer": self.name}
+                await asyncio.sleep(REMOTE_POLL_SECONDS)
+        except asyncio.CancelledError:
+            self.queue.cancel(render_id)
+            raise
+        metrics.observe("render.remote_wait", info["wait_seconds"])
+
+        if info["state"] == "failed":
+            return subprocess.CompletedProcess(cmd, 1, "", f"Remote worker error: {info.get('error')}"), {"renderer": self.name}
+        remote = self.queue.result(render_id) or {}
+        report = {"renderer": self.name, "dry_runs": remote.get("dry_runs", []), "timing": remote.get("timing"), "worker": remote.get("worker")}
+        if on_dry_run:
+            on_dry_run(report["dry_runs"])
+        stdout = remote.get("stdout") or ""
+        if remote.get("returncode") == 0 and remote.get("video_key"):
+            # "Download" the upload and point the File ready line at the local copy
+            output = Path(job["output"])
+            self.storage.get(remote["video_key"], output)
+            self.storage.delete(remote["video_key"])
+            stdout += f"\nFile ready at '{output}'"
+        return subprocess.CompletedProcess(cmd, remote.get("returncode", 1), stdout, remote.get("stderr") or ""), report
+
+    def stats(self) -> dict:
+        return {"name": self.name, "queue": self.queue.stats()}
+
+    async def close(self) -> None:
+        await self.queue.stop()
+
+
+RENDERERS = {"pool": LocalPoolRenderer, "inprocess": InProcessRenderer, "remote": RemoteRenderer}
+_renderer: Renderer | None = None
+
+
+def get_renderer() -> Renderer:
+    """The renderer selected by RENDERER, created on first use."""
+    global _renderer
+    if _renderer is None:
+        if RENDERER not in RENDERERS:
+            raise RuntimeError(f"RENDERER must be one of {sorted(RENDERERS)}, got {RENDERER!r}")
+        _renderer = RENDERERS[RENDERER]()
+    return _renderer
+
+
+async def close_renderer() -> None:
+    global _renderer
+    if _renderer is not None:
+        await _renderer.close()
+        _renderer = None
+
+
+def rendered_video(result: subprocess.CompletedProcess, job: dict) -> Path | None:
+    """Where a successful render left its video: the last "File ready at" path, the job's output, or a search."""
+    ready_paths = re.findall(r"File ready at\s+'([^']+\.mp4)'", result.stdout or "")
+    if ready_paths and Path(ready_paths[-1]).exists():
+        return Path(ready_paths[-1])
+    if Path(job["output"]).exists():
+        return Path(job["output"])
+    return find_rendered_video(Path(job["media_dir"]), job["scene_names"][0])
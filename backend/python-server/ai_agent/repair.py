@@ -0,0 +1,262 @@
+"""
+Code repair: asking code_fixer for a corrected script.
+
+With FIXER_CANDIDATES=1 (default) one fix is requested per failed attempt, as
+before. With K > 1 the fixer is asked K times concurrently, each copy at its own
+temperature (FIXER_TEMPERATURES), and every candidate is checked by the cheap
+stages as soon as it arrives: preflight (parse + known rewrites), then a dry run
+of its scenes. The first candidate that passes goes on to the full render and
+the others are cancelled, so a hard failure costs one round of parallel LLM
+calls per attempt instead of a render for every wrong guess.
+
+Before any LLM call, a known error signature gets the patch that fixed it
+last time (fix_memory), applied locally.
+
+The fixer prompt holds the current code in full, the parsed error with a
+window around the failing line, and earlier attempts as one-line errors plus
+the diff that was tried. Earlier versions were sent as full copies of the code
+with their raw stderr, so the prompt grew with every retry.
+"""
+import asyncio
+import difflib
+import os
+import re
+import time
+
+from google.genai import types
+from google.genai.types import Content, Part
+
+from . import fix_memory, metrics
+from .agent import code_fixer
+from .history import CHARS_PER_TOKEN
+from .multi_scene import find_scene_classes
+from .pipeline import llm_slot
+from .preflight import preflight
+from .render_pool import cleanup_workspace, job_workspace, write_scene
+from .renderers import get_renderer
+from .sessions import get_runner, get_session_service
+from .tracebacks import code_window, parse_traceback, summarize
+
+# Fixes requested in parallel per failed attempt (1 = one sequential fix)
+FIXER_CANDIDATES = max(1, int(os.getenv("FIXER_CANDIDATES", "1")))
+# Temperature of each candidate's fixer call, reused in order when K is larger
+FIXER_TEMPERATURES = [float(t) for t in os.getenv("FIXER_TEMPERATURES", "0.2,0.7,1.0").split(",") if t.strip()]
+# Longest diff kept per earlier attempt in the fixer prompt
+MAX_HISTORY_DIFF_CHARS = 3000
+
+_fixer_variants: dict[float, object] = {}
+
+
+def scene_names_for(code: str, render_mode: str = "single") -> list[str]:
+    """Scene classes a render of code covers: every Scene class in multi-scene mode, else the first (fallback "Introduce")."""
+    scene_name = "Introduce"
+    m = re.search(r"class\s+([A-Za-z_]\w*)\s*\(\s*Scene\s*\)", code)
+    if m:
+        scene_name = m.group(1)
+    if render_mode == "multi_scene":
+        return find_scene_classes(code) or [scene_name]
+    return [scene_name]
+
+
+def build_fixer_input(code: str, error_text: str, history: list[dict], line: int | None = None) -> str:
+    """
+    Fixer prompt for one failed attempt.
+
+    Args:
+        code: The code that failed (sent in full; the fixer returns a whole file).
+        error_text: stderr/stdout of the failure, or a syntax error description.
+        history: Earlier attempts from record_attempt(), oldest first.
+        line: Failing line when already known (syntax errors).
+
+    Returns:
+        str: The prompt text.
+    """
+    parsed = parse_traceback(error_text)
+    parsed["line"] = parsed["line"] or line
+    sections = []
+    if history:
+        attempts = "\n\n".join(f"ATTEMPT {h['attempt']} ERROR: {h['error']}\nCHANGE TRIED:\n{h['diff'] or '(none)'}" for h in history)
+        sections.append(f"HISTORY OF FAILED ATTEMPTS:\n{attempts}")
+    sections.append(f"CURRENT FAILED CODE:\n{code}")
+    sections.append(f"CURRENT ERROR:\n{summarize(parsed, error_text)}")
+    window = code_window(code, parsed["line"])
+    if window:
+        sections.append(f"FAILING LINE {parsed['line']} (marked >>):\n{window}")
+    return "\n\n".join(sections)
+
+
+def record_attempt(attempt: int, failed_code: str, fixed_code: str, error_text: str, line: int | None = None, source: str = "fixer") -> dict:
+    """
+    History entry for a failed attempt: its error summary and the diff that was applied.
+
+    The entry also carries the error's signature, the change reduced to a
+    reusable patch and where the fix came from ("fixer" or "memory"), which
+    fix_memory.learn() reads when the generation finishes.
+    """
+    parsed = parse_traceback(error_text)
+    parsed["line"] = parsed["line"] or line
+    diff = "\n".join(difflib.unified_diff(failed_code.splitlines(), fixed_code.splitlines(), "failed", "fixed", n=1, lineterm=""))
+    if len(diff) > MAX_HISTORY_DIFF_CHARS:
+        diff = diff[:MAX_HISTORY_DIFF_CHARS] + "\n... (diff truncated)"
+    return {
+        "attempt": attempt,
+        "error": summarize(parsed, error_text),
+        "diff": diff,
+        "signature": fix_memory.error_signature(parsed, failed_code),
+        "patch": fix_memory.derive_patch(failed_code, fixed_code, parsed) if source == "fixer" else None,
+        "source": source,
+    }
+
+
+def _fixer_at(temperature: float | None):
+    """code_fixer, or a copy of it that samples at the given temperature."""
+    if temperature is None:
+        return code_fixer
+    if temperature not in _fixer_variants:
+        config = (code_fixer.generate_content_config or types.GenerateContentConfig()).model_copy(update={"temperature": temperature})
+        _fixer_variants[temperature] = code_fixer.clone(update={"generate_content_config": config})
+    return _fixer_variants[temperature]
+
+
+async def run_code_fixer(fixer_input: str, fixer_session_id: str, temperature: float | None = None) -> str:
+    """
+    Ask the code_fixer agent for a corrected script.
+
+    Args:
+        fixer_input: Failed code, error and history of earlier attempts.
+        fixer_session_id: Fixer session; retries of one generation share it.
+        temperature: Sampling temperature (None keeps the agent's default).
+
+    Returns:
+        str: The fixer's final response, or "" if it returned nothing.
+    """
+    try:
+        await get_session_service().create_session(app_name="code_fixer_app", user_id="system", session_id=fixer_session_id)
+    except Exception:
+        # Session might already exist from a previous retry attempt
+        pass
+    runner = get_runner(_fixer_at(temperature), "code_fixer_app")
+
+    fixed_code = ""
+    fixer_msg = Content(role='user', parts=[Part(text=fixer_input)])
+    input_tokens = len(fixer_input) // CHARS_PER_TOKEN
+    async with llm_slot():
+        started = time.perf_counter()
+        async for event in runner.run_async(user_id="system", session_id=fixer_session_id, new_message=fixer_msg):
+            if event.is_final_response():
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    fixed_code = event.content.parts[0].text.strip()
+        elapsed = time.perf_counter() - started
+    metrics.observe("fixer.latency", elapsed)
+    metrics.observe("fixer.input_tokens", input_tokens)
+    print(f"Fixer call {fixer_session_id}: ~{input_tokens} input tokens, {elapsed:.1f}s")
+    return fixed_code
+
+
+async def check_candidate(code: str, render_mode: str, workspace_id: str) -> dict:
+    """
+    Run a candidate fix through preflight and a dry run.
+
+    Returns:
+        dict: {"ok": bool, "stage": "preflight" | "dry_run", "error": str,
+        "dry_runs": the dry run results, or None if there was no dry run}
+    """
+    report = preflight(code)
+    if report["error"] is not None:
+        return {"ok": False, "stage": "preflight", "error": str(report["error"]), "dry_runs": None}
+    scenes_path, media_dir = job_workspace(workspace_id)
+    try:
+        write_scene(scenes_path, report["code"])
+        dry_runs = await get_renderer().dry_run(scenes_path, scene_names_for(report["code"], render_mode), media_dir)
+    finally:
+        cleanup_workspace(workspace_id)
+    if dry_runs is None:
+        # Renders happen elsewhere (RENDERER=remote): compiling is the cheap check available here
+        return {"ok": True, "stage": "preflight", "error": "", "dry_runs": None}
+    failed = [d["error"] for d in dry_runs if not d["ok"]]
+    return {"ok": not failed, "stage": "dry_run", "error": "\n".join(failed), "dry_runs": dry_runs}
+
+
+async def request_fix(fixer_input: str, fixer_session_id: str, render_mode: str = "single", job_id: str = "fix", candidates: int = FIXER_CANDIDATES) -> tuple[str, list[dict] | None]:
+    """
+    Get a fixed script from code_fixer, speculatively when candidates > 1.
+
+    Args:
+        fixer_input: The fixer prompt (failed code, error, history).
+        fixer_session_id: Base fixer session; candidate i uses its own session.
+        render_mode: Decides which scene classes a candidate's dry run covers.
+        job_id: Prefix for the candidates' scratch workspaces.
+        candidates: Fixes to request in parallel.
+
+    Returns:
+        tuple: (code, dry_runs). The code is the first candidate that passes
+        preflight and the dry run, with the dry runs it passed; if none passes,
+        the first non-empty candidate (the next attempt reports its error) and
+        None; "" if the fixer returned nothing.
+    """
+    if candidates <= 1:
+        return await run_code_fixer(fixer_input, fixer_session_id), None
+
+    started = time.perf_counter()
+    temperatures = [FIXER_TEMPERATURES[i % len(FIXER_TEMPERATURES)] if FIXER_TEMPERATURES else None for i in range(candidates)]
+
+    async def candidate(i: int) -> tuple[int, str, dict]:
+        code = await run_code_fixer(fixer_input, f"{fixer_session_id}_c{i}", temperatures[i])
+        if not code:
+            return i, code, {"ok": False, "stage": "fixer", "error": "empty response"}
+        return i, code, await check_candidate(code, render_mode, f"{job_id}-fix{i}")
+
+    metrics.incr("fixer.candidates", candidates)
+    tasks = [asyncio.create_task(candidate(i)) for i in range(candidates)]
+    fallback = ""
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                i, code, check = await next_done
+            except Exception as e:
+                print(f"Fix candidate failed: {e}")
+                continue
+            fallback = fallback or code
+            if check["ok"]:
+                elapsed = time.perf_counter() - started
+                metrics.incr("fixer.candidate_passed")
+                metrics.incr(f"fixer.winning_temperature.{temperatures[i]}")
+                metrics.observe("fixer.speculative", elapsed)
+                print(f"Fix candidate {i} (temperature {temperatures[i]}) passed {check['stage']} after {elapsed:.1f}s")
+                return code, check["dry_runs"]
+            print(f"Fix candidate {i} (temperature {temperatures[i]}) failed {check['stage']}: {check['error'][:200]}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    metrics.incr("fixer.no_candidate_passed")
+    metrics.observe("fixer.speculative", time.perf_counter() - started)
+    return fallback, None
+
+
+async def fix_attempt(code: str, error_text: str, history: list[dict], fixer_session_id: str, render_mode: str = "single", job_id: str = "fix", line: int | None = None) -> tuple[str, dict | None]:
+    """
+    Fix a failed attempt: a remembered patch for its error if there is one, else code_fixer.
+
+    Args:
+        code: The code that failed.
+        error_text: stderr/stdout of the failure, or a syntax error description.
+        history: Earlier attempts of this generation, oldest first.
+        fixer_session_id: Base fixer session (see request_fix).
+        render_mode: Passed on to request_fix.
+        job_id: Passed on to request_fix.
+        line: Failing line when already known (syntax errors).
+
+    Returns:
+        tuple: (fixed code, its record_attempt() entry), or ("", None) if there was no fix.
+        A fix that already passed a dry run carries those results as the entry's
+        "checked_dry_runs", so the next attempt doesn't dry-run it again.
+    """
+    attempt = len(history) + 1
+    remembered = fix_memory.recall(code, error_text, history, line)
+    if remembered:
+        return remembered, record_attempt(attempt, code, remembered, error_text, line, source="memory")
+    fixed_code, dry_runs = await request_fix(build_fixer_input(code, error_text, history, line), fixer_session_id, render_mode, job_id)
+    if not fixed_code:
+        return "", None
+    return fixed_code, {**record_attempt(attempt, code, fixed_code, error_text, line), "checked_dry_runs": dry_runs}
@@ -0,0 +1,356 @@
+"""
+Cached web search for script_writer's research.
+
+ADK's built-in google_search runs inside the Gemini request, so its queries and
+results never reach this process and can't be reused. script_writer uses the
+search_web function tool instead: the query is normalized (case, punctuation,
+filler words and word order don't matter), looked up in a SQLite cache shared by
+every API process, and only sent to the backend on a miss. Entries expire after
+SEARCH_CACHE_TTL and the least recently used ones are evicted beyond
+SEARCH_CACHE_MAX_ENTRIES. Identical searches in flight at the same time share
+one backend call.
+
+The backend is chosen with SEARCH_BACKEND:
+
+    google  (default) a Gemini call grounded with Google Search; returns its
+            summary and the cited sources
+    local   offline stand-in: ranks the documents of a JSON corpus
+            (SEARCH_CORPUS, else a few built-in topics) by word overlap, after
+            an optional simulated delay; for tests and benchmarks
+
+set_backend() installs any other SearchBackend (e.g. a stub in a test).
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from . import metrics
+
+BASE_PATH = Path(__file__).parent.parent
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "google")
+# Model that runs grounded searches for the google backend
+SEARCH_MODEL = os.getenv("SEARCH_MODEL", "gemini-2.0-flash")
+SEARCH_CACHE_DB = Path(os.getenv("SEARCH_CACHE_DB", BASE_PATH / "search_cache.db"))
+# Seconds a cached result is served (0 disables the cache)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+# Least recently used results are evicted beyond this many entries
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# Documents for the local backend (a JSON list of {"title", "url", "text"})
+SEARCH_CORPUS = os.getenv("SEARCH_CORPUS")
+# Simulated latency of the local backend, in seconds
+SEARCH_LOCAL_LATENCY = float(os.getenv("SEARCH_LOCAL_LATENCY", "0"))
+MAX_RESULTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS searches_used ON searches (used_at);
+"""
+
+_WORD_RE = re.compile(r"\w+")
+# Words that don't change what a search returns
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "and", "or", "is", "are", "what", "how", "does", "do",
+    "explain", "explained", "explanation", "about", "please", "search",
+}
+
+_BUILTIN_CORPUS = [
+    {"title": "Backpropagation", "url": "https://en.wikipedia.org/wiki/Backpropagation",
+     "text": "Backpropagation computes the gradient of a neural network's loss with respect to its weights by applying the chain rule layer by layer, from the output back to the input. Gradient descent then updates each weight against its gradient."},
+    {"title": "Fourier series", "url": "https://en.wikipedia.org/wiki/Fourier_series",
+     "text": "A Fourier series writes a periodic function as a sum of sines and cosines. Square waves are built from odd harmonics whose amplitudes fall as 1/n; adding terms sharpens the corners (the Gibbs phenomenon)."},
+    {"title": "Sorting algorithm", "url": "https://en.wikipedia.org/wiki/Sorting_algorithm",
+     "text": "Sorting algorithms put elements in order. Bubble sort repeatedly swaps adjacent out-of-order pairs; merge sort splits the list, sorts the halves and merges them; quicksort partitions around a pivot. Comparison sorts need O(n log n) comparisons."},
+    {"title": "Pythagorean theorem", "url": "https://en.wikipedia.org/wiki/Pythagorean_theorem",
+     "text": "In a right triangle the square on the hypotenuse equals the sum of the squares on the other two sides, a^2 + b^2 = c^2. Rearrangement proofs move four copies of the triangle inside a square."},
+    {"title": "Gradient descent", "url": "https://en.wikipedia.org/wiki/Gradient_descent",
+     "text": "Gradient descent minimizes a function by taking repeated steps opposite the gradient. The learning rate sets the step size; too large and it overshoots, too small and it converges slowly."},
+    {"title": "Binary search", "url": "https://en.wikipedia.org/wiki/Binary_search",
+     "text": "Binary search finds a value in a sorted array by comparing it with the middle element and discarding the half that cannot contain it, taking O(log n) steps."},
+]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key of a search query.
+
+    Lowercases, drops punctuation and filler words, and sorts the remaining
+    words, so "What is the Fourier series?" and "fourier series explained" share
+    one entry. A query made only of filler words keeps its words.
+    """
+    words = _WORD_RE.findall(unicodedata.normalize("NFKC", query or "").lower())
+    kept = [w for w in words if w not in _FILLER_WORDS] or words
+    return " ".join(sorted(set(kept)))
+
+
+class SearchBackend:
+    """Base class for search backends: search() returns {"summary": str, "results": [{"title", "url", "snippet"}]}."""
+
+    name = "base"
+
+    async def search(self, query: str) -> dict:
+        raise NotImplementedError
+
+
+class GoogleSearchBackend(SearchBackend):
+    """Google Search through a grounded Gemini call (uses the same API key as the agents)."""
+
+    name = "google"
+
+    def __init__(self, model: str = SEARCH_MODEL):
+        from google import genai
+
+        self.model = model
+        self._client = genai.Client()
+
+    async def search(self, query: str) -> dict:
+        from google.genai import types
+
+        response = await self._client.aio.models.generate_content(
+            model=self.model,
+            contents=f"Search the web and summarize the most relevant facts for: {query}",
+            config=types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())]),
+        )
+        results = []
+        candidate = response.candidates[0] if response.candidates else None
+        grounding = candidate.grounding_metadata if candidate else None
+        for chunk in (grounding.grounding_chunks if grounding and grounding.grounding_chunks else [])[:MAX_RESULTS]:
+            if chunk.web:
+                results.append({"title": chunk.web.title or "", "url": chunk.web.uri or "", "snippet": ""})
+        return {"summary": response.text or "", "results": results}
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    Offline stand-in that ranks local documents by word overlap with the query.
+
+    Args:
+        documents: [{"title", "url", "text"}]; defaults to SEARCH_CORPUS or the built-in topics.
+        latency: Seconds to wait before answering, to simulate a real search.
+    """
+
+    name = "local"
+
+    def __init__(self, documents: list[dict] | None = None, latency: float = SEARCH_LOCAL_LATENCY):
+        if documents is None:
+            documents = json.loads(Path(SEARCH_CORPUS).read_text(encoding="utf-8")) if SEARCH_CORPUS else _BUILTIN_CORPUS
+        self.documents = documents
+        self.latency = latency
+        self._words = [set(normalize_query(f"{d['title']} {d['text']}").split()) for d in documents]
+
+    async def search(self, query: str) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        words = set(normalize_query(query).split())
+        scored = sorted(
+            ((len(words & doc_words), i) for i, doc_words in enumerate(self._words) if words & doc_words),
+            key=lambda s: (-s[0], s[1]),
+        )
+        results = [
+            {"title": self.documents[i]["title"], "url": self.documents[i].get("url", ""), "snippet": self.documents[i]["text"]}
+            for _, i in scored[:MAX_RESULTS]
+        ]
+        return {"summary": results[0]["snippet"] if results else "", "results": results}
+
+
+SEARCH_BACKENDS = {"google": GoogleSearchBackend, "local": LocalSearchBackend}
+
+
+class SearchCache:
+    """
+    Normalized query -> result table with a TTL and LRU eviction, shared by every process that opens the same file.
+
+    Args:
+        path: Database file.
+        ttl: Seconds an entry is served.
+        max_entries: Entries kept; the least recently used beyond this are evicted.
+    """
+
+    def __init__(self, path: Path = SEARCH_CACHE_DB, ttl: float = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, key: str) -> dict | None:
+        """The unexpired result for key (marking it recently used), or None."""
+        now = time.time()
+        row = self._db.execute("SELECT result FROM searches WHERE key = ? AND created_at > ?", (key, now - self.ttl)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE searches SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, query: str, result: dict) -> int:
+        """
+        Store a result, dropping expired entries and evicting beyond max_entries.
+
+        Returns:
+            int: Number of entries evicted to stay within max_entries.
+        """
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO searches (key, query, result, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+            (key, query, json.dumps(result), now, now),
+        )
+        self._db.execute("DELETE FROM searches WHERE created_at <= ?", (now - self.ttl,))
+        evicted = self._db.execute(
+            "DELETE FROM searches WHERE key IN (SELECT key FROM searches ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        return evicted
+
+    def count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_backend: SearchBackend | None = None
+_cache: SearchCache | None = None
+_lock = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+# Search seconds per agent invocation, reported once script_writer finishes
+_invocation_seconds: dict[str, float] = {}
+
+
+def get_backend() -> SearchBackend:
+    """The backend selected by SEARCH_BACKEND (or set_backend), created on first use."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            if SEARCH_BACKEND not in SEARCH_BACKENDS:
+                raise RuntimeError(f"SEARCH_BACKEND must be one of {sorted(SEARCH_BACKENDS)}, got {SEARCH_BACKEND!r}")
+            _backend = SEARCH_BACKENDS[SEARCH_BACKEND]()
+        return _backend
+
+
+def set_backend(backend: SearchBackend | None) -> None:
+    """Install a backend (None goes back to SEARCH_BACKEND on next use)."""
+    global _backend
+    with _lock:
+        _backend = backend
+
+
+def get_cache() -> SearchCache:
+    """The search cache at SEARCH_CACHE_DB, opened on first use."""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = SearchCache()
+        return _cache
+
+
+async def cached_search(query: str) -> dict:
+    """
+    Search through the cache.
+
+    Args:
+        query: The search query.
+
+    Returns:
+        dict: The backend's result plus "query" and "cached" (whether the
+        backend was skipped).
+    """
+    started = time.perf_counter()
+    key = normalize_query(query)
+    metrics.incr("search.lookups")
+    result = get_cache().get(key) if SEARCH_CACHE_TTL > 0 else None
+    if result is not None:
+        metrics.incr("search.hits")
+        cached = True
+    elif key in _inflight:
+        metrics.incr("search.hits")
+        metrics.incr("search.shared")
+        result = await asyncio.shield(_inflight[key])
+        cached = True
+    else:
+        metrics.incr("search.misses")
+        cached = False
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            with metrics.timer("search.backend_latency"):
+                result = await get_backend().search(query)
+            future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception; nobody else needs to retrieve it
+            future.exception()
+            raise
+        finally:
+            _inflight.pop(key, None)
+        if SEARCH_CACHE_TTL > 0:
+            metrics.incr("search.evicted", get_cache().put(key, query, result))
+    metrics.observe("search.latency", time.perf_counter() - started)
+    return {"query": query, "cached": cached, **result}
+
+
+async def search_web(query: str, tool_context=None) -> dict:
+    """
+    Search the web for facts, examples and visual analogies about a topic.
+
+    Args:
+        query: What to search for, e.g. "backpropagation chain rule intuition".
+
+    Returns:
+        dict: "summary" of what was found and "results" with the title, url and
+        snippet of each source.
+    """
+    started = time.perf_counter()
+    try:
+        return await cached_search(query)
+    except Exception as e:
+        metrics.incr("search.errors")
+        print(f"Search for {query!r} failed: {e}")
+        return {"query": query, "error": str(e), "summary": "", "results": []}
+    finally:
+        if tool_context is not None:
+            invocation_id = tool_context.invocation_id
+            _invocation_seconds[invocation_id] = _invocation_seconds.get(invocation_id, 0.0) + time.perf_counter() - started
+
+
+def record_request_search_time(callback_context) -> None:
+    """after_agent_callback for script_writer: record the time this request spent searching."""
+    seconds = _invocation_seconds.pop(callback_context.invocation_id, None)
+    if seconds is not None:
+        metrics.observe("search.request_seconds", seconds)
+    return None
+
+
+def stats() -> dict:
+    """Search cache figures for /metrics."""
+    lookups = metrics.counter("search.lookups")
+    hits = metrics.counter("search.hits")
+    timings = metrics.snapshot()["timings"]
+    empty = {"count": 0, "mean": 0.0, "max": 0.0}
+    return {
+        "backend": _backend.name if _backend else SEARCH_BACKEND,
+        "entries": get_cache().count() if SEARCH_CACHE_TTL > 0 else 0,
+        "lookups": lookups,
+        "hits": hits,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "errors": metrics.counter("search.errors"),
+        "evicted": metrics.counter("search.evicted"),
+        "search_seconds": {k: timings.get(f"search.{k}", empty)["mean"] for k in ("latency", "backend_latency")},
+        "per_request_seconds": {k: timings.get("search.request_seconds", empty)[k] for k in ("count", "mean", "max")},
+    }
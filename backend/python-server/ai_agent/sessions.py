@@ -0,0 +1,105 @@
+"""
+Process-wide ADK session service and runners.
+
+Building a DatabaseSessionService means a new SQLAlchemy engine, a fresh
+connection and a schema check; building a Runner per request throws away the
+same agent wiring every time. Both are created once (in main.py's lifespan, or
+lazily by scripts) and shared by /chat, generate_video and the fixer.
+
+SQLite runs in WAL mode so readers don't block the writer, with a pooled set of
+connections and a busy timeout instead of immediate "database is locked" errors.
+"""
+import os
+
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+SESSION_DB_URL = os.getenv("DATABASE_URL", "sqlite:///./my_agent_data.db")
+SESSION_DB_POOL_SIZE = max(1, int(os.getenv("SESSION_DB_POOL_SIZE", "10")))
+SESSION_DB_MAX_OVERFLOW = max(0, int(os.getenv("SESSION_DB_MAX_OVERFLOW", "20")))
+# Seconds a connection waits on SQLite's write lock before giving up
+SESSION_DB_BUSY_TIMEOUT = float(os.getenv("SESSION_DB_BUSY_TIMEOUT", "30"))
+
+_session_service: DatabaseSessionService | None = None
+_runners: dict[tuple[str, int], Runner] = {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # WAL makes NORMAL durable across application crashes; FULL only adds an fsync per commit
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SESSION_DB_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
+
+
+def create_session_service(db_url: str = SESSION_DB_URL) -> DatabaseSessionService:
+    """
+    Build a DatabaseSessionService; SQLite URLs get WAL mode and a connection pool.
+
+    Args:
+        db_url: SQLAlchemy database URL.
+
+    Returns:
+        DatabaseSessionService: A new service with its own engine.
+    """
+    if not db_url.startswith("sqlite") or ":memory:" in db_url:
+        return DatabaseSessionService(db_url=db_url)
+
+    service = DatabaseSessionService(
+        db_url=db_url,
+        poolclass=QueuePool,
+        pool_size=SESSION_DB_POOL_SIZE,
+        max_overflow=SESSION_DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        # Pooled connections move between the event loop and ADK's worker threads
+        connect_args={"check_same_thread": False, "timeout": SESSION_DB_BUSY_TIMEOUT},
+    )
+    event.listen(service.db_engine, "connect", _set_sqlite_pragmas)
+    # The constructor already connected for its schema check; reconnect with the pragmas set
+    service.db_engine.dispose()
+    return service
+
+
+def get_session_service() -> DatabaseSessionService:
+    """The shared session service, created on first use."""
+    global _session_service
+    if _session_service is None:
+        _session_service = create_session_service()
+    return _session_service
+
+
+def get_runner(agent, app_name: str) -> Runner:
+    """
+    The shared Runner for an agent under app_name, created on first use.
+
+    Runners hold no per-session state, so one per agent serves every request.
+    """
+    key = (app_name, id(agent))
+    runner = _runners.get(key)
+    if runner is None:
+        runner = Runner(agent=agent, app_name=app_name, session_service=get_session_service())
+        _runners[key] = runner
+    return runner
+
+
+def start_sessions() -> None:
+    """Create the session service up front so the first request doesn't pay for it."""
+    get_session_service()
+
+
+async def close_sessions() -> None:
+    """Close every shared runner and release the database connections."""
+    global _session_service
+    runners = list(_runners.values())
+    _runners.clear()
+    for runner in runners:
+        try:
+            await runner.close()
+        except Exception as e:
+            print(f"Warning: failed to close runner {runner.app_name}: {e}")
+    if _session_service is not None:
+        _session_service.db_engine.dispose()
+        _session_service = None
@@ -0,0 +1,105 @@
+"""
+Animation-range sharding for long single scenes.
+
+A scene with many play()/wait() calls is split into contiguous animation index
+ranges. Each range is rendered by its own worker (manim's -n first,last), into its
+own media directory, and the partial movies are concatenated in order.
+"""
+import asyncio
+import math
+import os
+import subprocess
+import time
+from pathlib import Path
+
+from . import metrics
+from .render_pool import MAX_CONCURRENT_RENDERS, count_animations, find_rendered_video, run_manim
+from .stitching import concat_videos
+
+# Don't bother sharding below this many animations per shard
+MIN_ANIMATIONS_PER_SHARD = max(1, int(os.getenv("MIN_ANIMATIONS_PER_SHARD", "4")))
+MAX_RENDER_SHARDS = max(1, int(os.getenv("MAX_RENDER_SHARDS", MAX_CONCURRENT_RENDERS)))
+
+
+def plan_shards(num_animations: int, max_shards: int = MAX_RENDER_SHARDS, min_per_shard: int = MIN_ANIMATIONS_PER_SHARD) -> list[tuple[int, int]]:
+    """
+    Split animations 0..num_animations-1 into contiguous inclusive ranges of near-equal size.
+
+    Example: plan_shards(10, max_shards=3, min_per_shard=2) -> [(0, 3), (4, 7), (8, 9)]
+    """
+    if num_animations <= 0:
+        return []
+    shards = max(1, min(max_shards, num_animations // min_per_shard))
+    size = math.ceil(num_animations / shards)
+    return [(start, min(start + size, num_animations) - 1) for start in range(0, num_animations, size)]
+
+
+async def render_sharded(scenes_path: Path, scene_name: str, media_dir: Path, output: Path, quality: str = "l", env: dict | None = None, num_animations: int | None = None, on_line=None) -> tuple[subprocess.CompletedProcess, dict]:
+    """
+    Render one scene as parallel animation-range shards and stitch the results.
+
+    Args:
+        scenes_path: The job's scene file.
+        scene_name: Scene class to render.
+        media_dir: The job's media directory (each shard gets a subdirectory).
+        output: Where to write the stitched video.
+        quality: Manim quality flag suffix.
+        env: Environment for cold subprocess renders.
+        num_animations: Animation count if already known (e.g. from the dry run); counted otherwise.
+        on_line: Optional callback receiving each line of render output (animation
+            numbers are absolute, so shards don't collide).
+
+    Returns:
+        tuple: The combined CompletedProcess (stdout ends with "File ready at" on
+        success) and a timing report with the count, per-shard and concat times.
+    """
+    started = time.perf_counter()
+    if num_animations is None:
+        num_animations = await count_animations(scenes_path, scene_name, media_dir)
+    timing = {"count_seconds": time.perf_counter() - started, "animations": num_animations, "shards": []}
+    metrics.observe("render.shard_count", timing["count_seconds"])
+
+    ranges = plan_shards(num_animations or 0)
+    if len(ranges) <= 1:
+        # Counting failed (let the normal render surface the error) or the scene is too short
+        result = await run_manim(scenes_path, scene_name, media_dir, quality=quality, env=env, on_line=on_line)
+        timing["total_seconds"] = time.perf_counter() - started
+        return result, timing
+
+    async def render_shard(index: int, animation_range: tuple[int, int]):
+        shard_started = time.perf_counter()
+        shard_dir = media_dir / f"shard_{index}"
+        result = await run_manim(scenes_path, scene_name, shard_dir, quality=quality, env=env, animation_range=animation_range, on_line=on_line)
+        seconds = time.perf_counter() - shard_started
+        metrics.observe("render.shard", seconds)
+        return result, shard_dir, {"range": list(animation_range), "seconds": seconds}
+
+    print(f"Rendering {scene_name} as {len(ranges)} shards: {ranges}")
+    shard_results = await asyncio.gather(*(render_shard(i, r) for i, r in enumerate(ranges)))
+    timing["shards"] = [shard_timing for _, _, shard_timing in shard_results]
+
+    cmd = ["render_sharded", str(scenes_path), scene_name]
+    stdout = "\n".join(r.stdout for r, _, _ in shard_results)
+    failed = [(t["range"], r) for r, _, t in shard_results if r.returncode != 0]
+    if failed:
+        timing["total_seconds"] = time.perf_counter() - started
+        stderr = "\n".join(f"Animations {rng[0]}-{rng[1]} failed:\n{r.stderr}" for rng, r in failed)
+        return subprocess.CompletedProcess(cmd, failed[0][1].returncode, stdout, stderr), timing
+
+    clips = [find_rendered_video(shard_dir, scene_name) for _, shard_dir, _ in shard_results]
+    if any(clip is None for clip in clips):
+        timing["total_seconds"] = time.perf_counter() - started
+        return subprocess.CompletedProcess(cmd, 1, stdout, f"A shard of {scene_name} produced no video in {media_dir}"), timing
+
+    concat_started = time.perf_counter()
+    try:
+        await concat_videos(clips, output)
+    except RuntimeError as e:
+        timing["total_seconds"] = time.perf_counter() - started
+        return subprocess.CompletedProcess(cmd, 1, stdout, str(e)), timing
+    timing["concat_seconds"] = time.perf_counter() - concat_started
+    timing["total_seconds"] = time.perf_counter() - started
+    # Sum of shard times is what a serial render would roughly have cost
+    timing["serial_estimate_seconds"] = sum(t["seconds"] for t in timing["shards"])
+    metrics.observe("render.sharded_total", timing["total_seconds"])
+    return subprocess.CompletedProcess(cmd, 0, f"{stdout}\nFile ready at '{output}'", ""), timing
@@ -0,0 +1,116 @@
+"""
+Shared job-status store with TTL eviction (SQLite).
+
+Replaces the module-level status dict in main.py: every uvicorn worker opens the
+same file, so a status poll can land on any worker, and statuses survive
+restarts. Entries expire STATUS_TTL_SECONDS after their last update.
+
+Lookups are a primary-key read served from SQLite's memory-mapped page cache;
+an unknown ID costs one index probe, not a filesystem walk.
+"""
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+BASE_PATH = Path(__file__).parent.parent
+STATUS_DB = Path(os.getenv("STATUS_DB", BASE_PATH / "job_status.db"))
+STATUS_TTL_SECONDS = float(os.getenv("STATUS_TTL_SECONDS", str(24 * 3600)))
+# Expired rows are deleted every this many writes
+EVICT_EVERY_WRITES = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS status (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS status_expiry ON status (expires_at);
+"""
+
+
+class StatusStore:
+    """
+    Dict-like status store shared by every process that opens the same file.
+
+    Args:
+        path: Database file.
+        ttl: Seconds an entry lives after its last write.
+    """
+
+    def __init__(self, path: Path = STATUS_DB, ttl: float = STATUS_TTL_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._writes = 0
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Serve reads from the page cache instead of read() calls
+        self._db.execute("PRAGMA mmap_size=67108864")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, status_id: str) -> dict | None:
+        row = self._db.execute(
+            "SELECT data FROM status WHERE id = ? AND expires_at > ?", (status_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __contains__(self, status_id: str) -> bool:
+        return self.get(status_id) is not None
+
+    def set(self, status_id: str, status: dict) -> None:
+        """Replace a status (and restart its TTL)."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO status (id, data, expires_at) VALUES (?, ?, ?)",
+            (status_id, json.dumps(status, default=str), time.time() + self.ttl),
+        )
+        self._after_write()
+
+    def update(self, status_id: str, **fields) -> dict:
+        """Merge fields into a status (creating it if missing); returns the merged status."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            status = self.get(status_id) or {}
+            status.update(fields)
+            self._db.execute(
+                "INSERT OR REPLACE INTO status (id, data, expires_at) VALUES (?, ?, ?)",
+                (status_id, json.dumps(status, default=str), time.time() + self.ttl),
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._after_write()
+        return status
+
+    def setdefault(self, status_id: str, status: dict) -> dict:
+        """Insert status unless an unexpired one exists; returns the stored status."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            existing = self.get(status_id)
+            if existing is None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO status (id, data, expires_at) VALUES (?, ?, ?)",
+                    (status_id, json.dumps(status, default=str), time.time() + self.ttl),
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return existing if existing is not None else status
+
+    def evict_expired(self) -> int:
+        return self._db.execute("DELETE FROM status WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM status WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _after_write(self) -> None:
+        self._writes += 1
+        if self._writes % EVICT_EVERY_WRITES == 0:
+            self.evict_expired()
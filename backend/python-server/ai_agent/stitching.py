@@ -0,0 +1,47 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+
+async def concat_videos(clips: list[Path], output: Path) -> Path:
+    """
+    Join clips end to end with ffmpeg's concat demuxer, without re-encoding.
+
+    All clips must share codec, resolution and frame rate (true for clips
+    rendered by manim at the same quality).
+
+    Args:
+        clips: Video files in playback order.
+        output: Path of the joined video.
+
+    Returns:
+        Path: The output path.
+    """
+    if not clips:
+        raise ValueError("No clips to concatenate")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if len(clips) == 1:
+        shutil.copyfile(clips[0], output)
+        return output
+
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        raise RuntimeError("ffmpeg not found on PATH; it is required to stitch rendered clips together.")
+
+    list_file = output.with_suffix(".concat.txt")
+    # The concat demuxer treats backslashes and quotes specially; escape single quotes
+    lines = ["file '{}'".format(str(Path(c).resolve()).replace("'", "'\\''")) for c in clips]
+    list_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    proc = await asyncio.create_subprocess_exec(
+        ffmpeg_path, "-y", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", str(list_file),
+        "-c", "copy", str(output),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await proc.communicate()
+    list_file.unlink(missing_ok=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {stderr.decode('utf-8', errors='replace')[:2000]}")
+    return output
@@ -0,0 +1,19 @@
+from google.adk.agents import Agent
+
+from ...history import compact_history
+
+chat_responder = Agent(
+    name="chat_responder",
+    model="gemini-2.0-flash-lite",
+    instruction="""
+You are the friendly assistant of an app that turns text prompts into Manim animation videos.
+
+The user's message is conversation (a greeting, thanks, a question about you or the app), not a request for an animation. Reply in one to three short sentences. If it fits, mention that they can describe a concept, formula or process and you will storyboard and animate it.
+
+## Output Format
+- Start your reply with **[CHAT]**.
+- Do **NOT** write a storyboard, code or markdown headings.
+""",
+    description="Answers conversational messages that don't ask for an animation, in one short model call.",
+    before_model_callback=compact_history,
+)
@@ -1,5 +1,7 @@
 from google.adk.agents import Agent
 
+from ...history import compact_history
+
 code_fixer = Agent(
     name="code_fixer",
     model="gemini-2.0-flash",
@@ -28,7 +30,7 @@ You are an expert Manim Debugging specialist. Your job is to take Python code th
    - **INDENTATION**: You MUST use exactly **4 spaces** for indentation. Never use 1 or 2 spaces. This is critical for Python syntax.
    - Ensure the code follows the best practices for Manim (Community Edition).
    - Maintain the original intent and scene structure as much as possible.
-   - Guarantee that the `Introduce` class name and `construct(self)` method are used correctly.
+   - Guarantee that the existing scene class names (`Introduce`, or `Scene1`, `Scene2`, ... when the file has one class per scene) and their `construct(self)` methods are used correctly.
 
 3. **Output Format**:
    - Provide **ONLY** the corrected Python code.
@@ -59,4 +61,5 @@ CURRENT ERROR:
 [The traceback or error message for the current failure]
 """,
     description="Debugs and fixes Manim Python code based on error tracebacks.",
+    before_model_callback=compact_history,
 )
@@ -1,10 +1,10 @@
 from pathlib import Path
 from google.adk.agents import Agent
 
-code_writer = Agent(
-    name="code_writer",
-    model="gemini-2.0-flash",
-    instruction=f"""
+from ...history import compact_history
+from ...intent import skip_code_writer_without_storyboard
+
+CODE_WRITER_INSTRUCTION = f"""
 You are a specialized Manim Code Generator that converts detailed storyboards into complete, executable Python/Manim code. Your output must be production-ready code that runs without errors.
 
 ## Core Requirements
@@ -113,6 +113,33 @@ class Introduce(Scene):
         # Implementation here
         pass
 
-Your code must be complete, runnable, and faithful to the storyboard while leveraging manim's full capabilities for educational animation.""" + "Here is the storyboard: {storyboard}",
+Your code must be complete, runnable, and faithful to the storyboard while leveraging manim's full capabilities for educational animation."""
+
+MULTI_SCENE_INSTRUCTION = """
+
+## Multi-Scene Output (overrides the single `Introduce` class rules above)
+
+The scenes of this video are rendered in parallel and joined afterwards, so:
+- Emit one `Scene` subclass per storyboard scene, named `Scene1`, `Scene2`, ... in storyboard order.
+- Each class is rendered on its own: build every mobject it needs inside its own `construct(self)` and never rely on state from another class.
+- Every class starts from an empty screen; do not add clearing transitions between classes.
+- Do not define an `Introduce` class.
+"""
+
+code_writer = Agent(
+    name="code_writer",
+    model="gemini-2.0-flash",
+    instruction=CODE_WRITER_INSTRUCTION + "Here is the storyboard: {storyboard}",
     description="Expert agent that transforms video scripts into optimized Manim Python code, writing to 'scenes.py' using write_file tool.",
+    before_model_callback=compact_history,
+    before_agent_callback=skip_code_writer_without_storyboard,
+)
+
+multi_scene_code_writer = Agent(
+    name="multi_scene_code_writer",
+    model="gemini-2.0-flash",
+    instruction=CODE_WRITER_INSTRUCTION + MULTI_SCENE_INSTRUCTION + "Here is the storyboard: {storyboard}",
+    description="Transforms video scripts into Manim code with one Scene class per storyboard scene.",
+    before_model_callback=compact_history,
+    before_agent_callback=skip_code_writer_without_storyboard,
 )
\ No newline at end of file
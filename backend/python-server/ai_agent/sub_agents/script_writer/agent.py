@@ -1,5 +1,7 @@
 from google.adk.agents import Agent
-from google.adk.tools import google_search
+
+from ...history import compact_history
+from ...search import record_request_search_time, search_web
 
 script_writer = Agent(
     name="script_writer",
@@ -15,7 +17,7 @@ script_writer = Agent(
 
 1. **Analyze User Input**: Parse the user's text prompt to understand the topic, learning objectives, target audience, and desired video style.
 
-2. **Research Enhancement**: Use the google_search tool when you need to:
+2. **Research Enhancement**: Use the search_web tool when you need to:
    - Gather accurate information about unfamiliar topics
    - Find current data, statistics, or examples
    - Verify facts and ensure content accuracy
@@ -74,7 +76,7 @@ For each scene, provide:
 
 ## Search Strategy
 
-When using google_search:
+When using search_web:
 - Search for recent, authoritative sources
 - Look for visual examples, diagrams, or analogies
 - Verify mathematical accuracy and current best practices
@@ -87,6 +89,8 @@ Always cite your sources when incorporating researched information into the stor
 Be specific, actionable, and visualization-focused. Think like a director planning a educational film - every detail should serve the learning objective while being visually engaging.
 """,
     description="Writes animation scripts on any topic using Google Search for research.",
-    tools=[google_search],
+    tools=[search_web],
     output_key="storyboard",
+    before_model_callback=compact_history,
+    after_agent_callback=record_request_search_time,
 )
\ No newline at end of file
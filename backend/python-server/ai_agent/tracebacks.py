@@ -0,0 +1,96 @@
+"""
+Compact error context for the code fixer.
+
+Manim's stderr is mostly Rich formatting: box-drawn frames, source excerpts
+from manim's own files and colour codes around one useful line. parse_traceback
+reduces it (or a plain Python traceback from a warm worker) to the exception
+type, message and the failing line of the generated scene file, and
+code_window shows the code around that line.
+"""
+import re
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_BOX_CHARS = "│╭╮╰╯─❱ "
+# File "/x/scenes.py", line 12, in construct
+_PLAIN_FRAME_RE = re.compile(r'File "([^"]+)", line (\d+), in (\S+)')
+# /x/scenes.py:12 in construct   (Rich)
+_RICH_FRAME_RE = re.compile(r"(\S+\.py):(\d+) in (\S+)")
+# TypeError: message   /   manim.utils.SomethingError: message   /   NotImplementedError
+_EXCEPTION_RE = re.compile(r"^((?:[A-Za-z_]\w*\.)*[A-Za-z_]\w*(?:Error|Exception|Interrupt|Exit)|KeyError|StopIteration)(?::\s*(.*))?$")
+_SYNTAX_LINE_RE = re.compile(r"(?:SyntaxError|IndentationError|TabError) at line (\d+)")
+
+
+def _clean_lines(text: str) -> list[str]:
+    lines = []
+    for line in _ANSI_RE.sub("", text or "").splitlines():
+        line = line.strip().strip(_BOX_CHARS).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def parse_traceback(text: str, scene_file: str = "scenes.py") -> dict:
+    """
+    Extract the essentials of a manim / Python error.
+
+    Args:
+        text: stderr (and/or stdout) of the failed run.
+        scene_file: Name of the generated file; its last frame is the failing line.
+
+    Returns:
+        dict: {"exc_type", "message", "line" (int or None), "function", "frames"}.
+        exc_type is None when no exception line was found.
+    """
+    lines = _clean_lines(text)
+    frames = []
+    exc_type, message = None, ""
+    for line in lines:
+        m = _PLAIN_FRAME_RE.search(line) or _RICH_FRAME_RE.search(line)
+        if m:
+            frames.append({"file": m.group(1), "line": int(m.group(2)), "function": m.group(3)})
+            continue
+        m = _EXCEPTION_RE.match(line)
+        if m:
+            # The last exception wins (chained tracebacks end with the one that escaped)
+            exc_type = m.group(1).rsplit(".", 1)[-1]
+            message = (m.group(2) or "").strip()
+
+    scene_frames = [f for f in frames if f["file"].replace("\\", "/").endswith(scene_file)]
+    failing = scene_frames[-1] if scene_frames else None
+    line = failing["line"] if failing else None
+    if line is None:
+        m = _SYNTAX_LINE_RE.search(text or "")
+        if m:
+            line = int(m.group(1))
+    return {
+        "exc_type": exc_type,
+        "message": message[:500],
+        "line": line,
+        "function": failing["function"] if failing else None,
+        "frames": frames,
+    }
+
+
+def summarize(parsed: dict, fallback: str = "") -> str:
+    """One or two lines describing the error, e.g. "TypeError at line 12 in construct: ..."."""
+    if not parsed["exc_type"]:
+        # Nothing recognisable: the last meaningful lines of the output
+        return "\n".join(_clean_lines(fallback)[-15:])[-1500:]
+    where = f" at line {parsed['line']}" if parsed["line"] else ""
+    if parsed["function"]:
+        where += f" in {parsed['function']}"
+    return f"{parsed['exc_type']}{where}: {parsed['message']}".rstrip(": ")
+
+
+def code_window(code: str, line: int | None, radius: int = 6) -> str:
+    """Numbered lines around line (marked with >>), or "" if line is unknown."""
+    if not line:
+        return ""
+    lines = code.splitlines()
+    start = max(1, line - radius)
+    end = min(len(lines), line + radius)
+    width = len(str(end))
+    return "\n".join(
+        f"{'>>' if n == line else '  '} {n:>{width}} | {lines[n - 1]}"
+        for n in range(start, end + 1)
+    )
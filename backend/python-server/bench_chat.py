@@ -0,0 +1,105 @@
+"""
+Benchmark /chat throughput with a stubbed model.
+
+Compares the old per-request setup (a new DatabaseSessionService and Runner for
+every call) with the shared session service and runner from ai_agent/sessions.py.
+The model is replaced by a stub that answers after a fixed delay, so the numbers
+measure session/database overhead rather than Gemini latency.
+
+Usage:
+    python bench_chat.py [--requests 200] [--concurrency 20] [--model-latency 0.0]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+_bench_dir = Path(tempfile.mkdtemp(prefix="bench_chat_"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_bench_dir / 'shared.db'}"
+os.environ.setdefault("RENDER_WARM_WORKERS", "0")
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from google.genai.types import Content, Part
+
+import main
+from ai_agent.agent import root_agent
+from ai_agent.sessions import close_sessions, start_sessions
+
+STUB_REPLY = (
+    "[CHAT] Here is a bouncing ball.\n## Storyboard\n1. A ball drops.\n"
+    "```python\nfrom manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n        self.play(Create(Circle()))\n```"
+)
+
+
+class StubLlm(BaseLlm):
+    """Answers every request with STUB_REPLY after `latency` seconds."""
+
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        await asyncio.sleep(self.latency)
+        yield LlmResponse(content=Content(role="model", parts=[Part(text=STUB_REPLY)]))
+
+
+async def chat_per_request(message: str, db_url: str) -> None:
+    """The /chat setup before sessions.py: new service and runner every call."""
+    session_service = DatabaseSessionService(db_url=db_url)
+    session = await session_service.create_session(app_name="lumen_anima_app", user_id="bench")
+    runner = Runner(agent=root_agent, app_name="lumen_anima_app", session_service=session_service)
+    async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=Content(role="user", parts=[Part(text=message)])):
+        pass
+    await runner.close()
+    session_service.db_engine.dispose()
+
+
+async def chat_shared(message: str) -> None:
+    """The current /chat endpoint."""
+    await main.chat_endpoint(main.ChatMessage(message=message, user_id="bench"))
+
+
+async def run(label: str, call, requests: int, concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one(i: int):
+        nonlocal failures
+        async with slots:
+            try:
+                await call(f"Animate request {i}")
+            except Exception as e:
+                failures += 1
+                if failures == 1:
+                    print(f"  {label}: first failure: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    rps = requests / elapsed
+    print(f"{label:<12} {requests} requests, concurrency {concurrency}: {elapsed:.2f}s, {rps:.1f} req/s, {failures} failed")
+    return rps
+
+
+async def main_async(args) -> None:
+    stub = StubLlm(model="gemini-stub", latency=args.model_latency)
+    for agent in root_agent.sub_agents:
+        agent.model = stub
+
+    before = await run("before", lambda m: chat_per_request(m, f"sqlite:///{_bench_dir / 'per_request.db'}"), args.requests, args.concurrency)
+    start_sessions()
+    try:
+        after = await run("after", chat_shared, args.requests, args.concurrency)
+    finally:
+        await close_sessions()
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds the stub model waits before answering")
+    asyncio.run(main_async(parser.parse_args()))
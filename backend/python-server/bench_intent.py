@@ -0,0 +1,109 @@
+"""
+Benchmark conversational /chat turns with a stubbed model.
+
+Compares the old path (every message runs root_agent: script_writer, then
+code_writer even when there is no storyboard) with the current /chat endpoint,
+which classifies the message locally and answers chit-chat with chat_responder.
+The stub model counts calls and prompt size and answers after a fixed delay
+plus a per-prompt-size delay (prefill), so the numbers approximate per-turn
+Gemini latency and cost.
+
+Usage:
+    python bench_intent.py [--turns 50] [--model-latency 0.3] [--latency-per-1k-chars 0.02]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+_bench_dir = Path(tempfile.mkdtemp(prefix="bench_intent_"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_bench_dir / 'shared.db'}"
+os.environ.setdefault("RENDER_WARM_WORKERS", "0")
+
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai.types import Content, Part
+
+import main
+from ai_agent.agent import chat_responder, root_agent
+from ai_agent.sessions import close_sessions, start_sessions
+
+MESSAGES = ["Hello!", "Thanks!", "Who are you?", "What can you do?", "ok cool"]
+STUB_REPLY = "[CHAT] Hi! Describe a concept and I'll animate it."
+
+
+class StubLlm(BaseLlm):
+    """Answers every request with STUB_REPLY after `latency` (+ `latency_per_1k_chars` of prompt) seconds, counting calls and prompt characters."""
+
+    latency: float = 0.0
+    latency_per_1k_chars: float = 0.0
+    calls: int = 0
+    prompt_chars: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        chars = len(str(llm_request.config.system_instruction or ""))
+        chars += sum(len(p.text or "") for c in llm_request.contents for p in c.parts or [])
+        self.calls += 1
+        self.prompt_chars += chars
+        await asyncio.sleep(self.latency + self.latency_per_1k_chars * chars / 1000)
+        yield LlmResponse(content=Content(role="model", parts=[Part(text=STUB_REPLY)]))
+
+
+async def chat_before(message: str, runner: Runner, session_service: InMemorySessionService) -> None:
+    """/chat before the intent stage: the whole pipeline for every message."""
+    session = await session_service.create_session(app_name="lumen_anima_app", user_id="bench")
+    async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=Content(role="user", parts=[Part(text=message)])):
+        pass
+
+
+async def chat_after(message: str) -> None:
+    """The current /chat endpoint."""
+    await main.chat_endpoint(main.ChatMessage(message=message, user_id="bench"))
+
+
+async def run(label: str, call, stub: StubLlm, turns: int) -> dict:
+    stub.calls = stub.prompt_chars = 0
+    started = time.perf_counter()
+    for i in range(turns):
+        await call(MESSAGES[i % len(MESSAGES)])
+    elapsed = time.perf_counter() - started
+    result = {"latency": elapsed / turns, "calls": stub.calls / turns, "prompt_chars": stub.prompt_chars / turns}
+    print(f"{label:<8} {turns} turns: {result['latency'] * 1000:.0f} ms/turn, {result['calls']:.1f} model calls/turn, {result['prompt_chars']:.0f} prompt chars/turn")
+    return result
+
+
+async def main_async(args) -> None:
+    stub = StubLlm(model="gemini-stub", latency=args.model_latency, latency_per_1k_chars=args.latency_per_1k_chars)
+    for agent in [*root_agent.sub_agents, chat_responder]:
+        agent.model = stub
+
+    # The old pipeline, without the code_writer skip
+    callbacks = {agent.name: agent.before_agent_callback for agent in root_agent.sub_agents}
+    for agent in root_agent.sub_agents:
+        agent.before_agent_callback = None
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, app_name="lumen_anima_app", session_service=session_service)
+    before = await run("before", lambda m: chat_before(m, runner, session_service), stub, args.turns)
+    await runner.close()
+    for agent in root_agent.sub_agents:
+        agent.before_agent_callback = callbacks[agent.name]
+
+    start_sessions()
+    try:
+        after = await run("after", chat_after, stub, args.turns)
+    finally:
+        await close_sessions()
+    print(f"latency: {before['latency'] / after['latency']:.2f}x lower, "
+          f"model calls: {before['calls'] / after['calls']:.2f}x fewer, "
+          f"prompt size: {before['prompt_chars'] / after['prompt_chars']:.2f}x smaller")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--model-latency", type=float, default=0.3, help="Seconds the stub model waits before answering")
+    parser.add_argument("--latency-per-1k-chars", type=float, default=0.02, help="Extra seconds per 1000 prompt characters")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Benchmark a burst of video jobs through the staged pipeline.
+
+Compares the old scheduling, where each of VIDEO_QUEUE_WORKERS job slots ran
+the LLM stage and then the render, with ai_agent/pipeline.py, where the LLM
+stage and the render stage have their own worker counts and a bounded queue
+between them. Both stages are stubbed with fixed delays (the LLM stage waits
+like a Gemini call; a render holds one of the render slots), so the numbers
+show scheduling, not model or manim speed.
+
+Usage:
+    python bench_pipeline.py [--jobs 50] [--llm-seconds 0.4] [--render-seconds 0.2] [--render-slots 4] [--llm-slots 8] [--old-workers 4]
+"""
+import argparse
+import asyncio
+import time
+
+from ai_agent.pipeline import StagedPipeline
+
+
+async def run_old(args) -> float:
+    """Each job slot writes the code, then renders (render slots shared)."""
+    job_slots = asyncio.Semaphore(args.old_workers)
+    render_slots = asyncio.Semaphore(args.render_slots)
+
+    async def job(i: int):
+        async with job_slots:
+            await asyncio.sleep(args.llm_seconds)
+            async with render_slots:
+                await asyncio.sleep(args.render_seconds)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(job(i) for i in range(args.jobs)))
+    return time.perf_counter() - started
+
+
+async def run_staged(args) -> tuple[float, dict]:
+    async def write(job):
+        await asyncio.sleep(args.llm_seconds)
+        return job
+
+    async def render(job):
+        await asyncio.sleep(args.render_seconds)
+        return job
+
+    pipeline = StagedPipeline(write, render, first_concurrency=args.llm_slots, second_concurrency=args.render_slots, queue_size=2 * args.render_slots)
+    await pipeline.start()
+    # Like the job queue, keep at most `capacity` jobs in flight
+    claims = asyncio.Semaphore(pipeline.capacity)
+
+    async def job(i: int):
+        async with claims:
+            await pipeline.run(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(job(i) for i in range(args.jobs)))
+    elapsed = time.perf_counter() - started
+    stats = pipeline.stats()
+    await pipeline.stop()
+    return elapsed, stats
+
+
+async def main_async(args) -> None:
+    render_capacity = args.render_slots / args.render_seconds
+    print(f"{args.jobs} jobs, LLM {args.llm_seconds}s, render {args.render_seconds}s, render capacity {render_capacity:.1f} jobs/s")
+    old = await run_old(args)
+    print(f"old     ({args.old_workers} job slots): {old:.2f}s, {args.jobs / old:.1f} jobs/s")
+    staged, stats = await run_staged(args)
+    print(f"staged  ({args.llm_slots} LLM, {args.render_slots} render): {staged:.2f}s, {args.jobs / staged:.1f} jobs/s "
+          f"({args.jobs / staged / render_capacity:.0%} of render capacity)")
+    print(f"speedup: {old / staged:.2f}x, final stats: {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--llm-seconds", type=float, default=0.4)
+    parser.add_argument("--render-seconds", type=float, default=0.2)
+    parser.add_argument("--render-slots", type=int, default=4)
+    parser.add_argument("--llm-slots", type=int, default=8)
+    parser.add_argument("--old-workers", type=int, default=4, help="The old VIDEO_QUEUE_WORKERS default")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,132 @@
+"""
+Load test for remote render workers.
+
+Starts 1, 2, 4, ... worker processes (ai_agent.remote_worker.serve) on a local
+render queue and storage directory, submits a burst of jobs through
+RemoteRenderer exactly as generate_video does with RENDERER=remote, and reports
+throughput for each worker count. Renders are synthetic (a fixed delay that
+writes a small file), so the numbers show how the queue, upload and download
+path scale with workers rather than manim speed. By default a render sleeps,
+standing in for a worker on its own machine; --cpu burns CPU instead, which
+only scales up to the number of local cores.
+
+Usage:
+    python bench_renderers.py [--jobs 24] [--workers 1 2 4] [--render-seconds 0.5] [--cpu]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+_bench_dir = Path(os.environ.setdefault("BENCH_RENDERERS_DIR", tempfile.mkdtemp(prefix="bench_renderers_")))
+os.environ.setdefault("STATUS_DB", str(_bench_dir / "status.db"))
+
+from ai_agent.renderers import LocalDirectoryStorage, Renderer, RemoteRenderer
+from ai_agent.remote_worker import serve
+
+
+class SyntheticRenderer(Renderer):
+    """Takes `seconds` per job (sleeping, or burning CPU), then writes a fake mp4 to the job's output."""
+
+    name = "synthetic"
+
+    def __init__(self, seconds: float, cpu: bool = False):
+        self.seconds = seconds
+        self.cpu = cpu
+
+    def _work(self, output: Path) -> None:
+        if self.cpu:
+            deadline = time.process_time() + self.seconds
+            while time.process_time() < deadline:
+                pass
+        else:
+            time.sleep(self.seconds)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(b"\x00" * 64 * 1024)
+
+    async def render(self, job, on_line=None, on_dry_run=None):
+        if on_dry_run:
+            on_dry_run([{"ok": True, "num_plays": 1, "error": "", "elapsed": 0.0}])
+        await asyncio.to_thread(self._work, Path(job["output"]))
+        return subprocess.CompletedProcess(["synthetic"], 0, f"File ready at '{job['output']}'", ""), {"renderer": self.name}
+
+
+def _worker_process(queue_path: str, storage_dir: str, render_seconds: float, cpu: bool, stop_file: str) -> None:
+    async def run():
+        stop = asyncio.Event()
+
+        async def watch():
+            while not os.path.exists(stop_file):
+                await asyncio.sleep(0.2)
+            stop.set()
+
+        watcher = asyncio.create_task(watch())
+        await serve(SyntheticRenderer(render_seconds, cpu), concurrency=1, queue_path=Path(queue_path), storage=LocalDirectoryStorage(Path(storage_dir)), stop=stop)
+        watcher.cancel()
+
+    asyncio.run(run())
+
+
+async def run_round(workers: int, jobs: int, render_seconds: float, cpu: bool) -> float:
+    round_dir = _bench_dir / f"workers_{workers}"
+    queue_path = round_dir / "render_queue.db"
+    storage_dir = round_dir / "storage"
+    stop_file = round_dir / "stop"
+    round_dir.mkdir(parents=True, exist_ok=True)
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(str(queue_path), str(storage_dir), render_seconds, cpu, str(stop_file)))
+        for _ in range(workers)
+    ]
+    for p in processes:
+        p.start()
+
+    renderer = RemoteRenderer(queue_path, LocalDirectoryStorage(storage_dir))
+    code = "from manim import *\n\nclass Bench(Scene):\n    def construct(self):\n        pass\n"
+
+    async def one(i: int) -> bool:
+        job = {
+            "job_id": f"bench{i}",
+            "generation_id": None,
+            "code": code,
+            "scene_names": ["Bench"],
+            "scene_file": "",
+            "media_dir": str(round_dir / "media"),
+            "output": str(round_dir / "out" / f"bench{i}.mp4"),
+        }
+        result, _ = await renderer.render(job)
+        return result.returncode == 0 and Path(job["output"]).exists()
+
+    try:
+        started = time.perf_counter()
+        ok = await asyncio.gather(*(one(i) for i in range(jobs)))
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_file.touch()
+        for p in processes:
+            p.join(timeout=30)
+        await renderer.close()
+    throughput = jobs / elapsed
+    print(f"{workers} workers: {jobs} jobs in {elapsed:.2f}s, {throughput:.2f} jobs/s, {jobs - sum(ok)} failed")
+    return throughput
+
+
+async def main_async(args) -> None:
+    baseline = None
+    for workers in args.workers:
+        throughput = await run_round(workers, args.jobs, args.render_seconds, args.cpu)
+        baseline = baseline or throughput
+        print(f"  scaling vs {args.workers[0]} worker(s): {throughput / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=24)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--render-seconds", type=float, default=0.5, help="Seconds each synthetic render takes")
+    parser.add_argument("--cpu", action="store_true", help="Burn CPU during a render instead of sleeping")
+    asyncio.run(main_async(parser.parse_args()))
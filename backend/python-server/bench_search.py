@@ -0,0 +1,72 @@
+"""
+Benchmark script_writer's research searches with and without the search cache.
+
+Replays a stream of research queries where popular topics (backpropagation,
+Fourier series, sorting algorithms, ...) come up again and again, phrased in
+different ways. Queries go to the offline local backend with a simulated
+per-search delay, either straight to the backend (the old behaviour) or through
+search_web's cache.
+
+Usage:
+    python bench_search.py [--queries 300] [--concurrency 8] [--backend-latency 0.2]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from ai_agent import metrics, search
+
+TOPICS = [
+    "backpropagation", "Fourier series", "sorting algorithms", "Pythagorean theorem", "gradient descent",
+    "binary search", "neural network layers", "bubble sort", "merge sort", "derivative of sine",
+]
+PHRASINGS = ["{}", "what is {}", "{} explained", "How does {} work?", "{} visual intuition"]
+
+
+def workload(queries: int, seed: int = 0) -> list[str]:
+    """Zipf-like topic popularity, each query in a random phrasing."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    return [rng.choice(PHRASINGS).format(rng.choices(TOPICS, weights)[0]) for _ in range(queries)]
+
+
+async def run(label: str, call, queries: list[str], concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query: str):
+        async with slots:
+            started = time.perf_counter()
+            await call(query)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    elapsed = time.perf_counter() - started
+    mean = sum(latencies) / len(latencies)
+    print(f"{label:<9} {len(queries)} searches, concurrency {concurrency}: {elapsed:.2f}s total, {mean * 1000:.0f} ms mean per search")
+    return mean
+
+
+async def main_async(args) -> None:
+    backend = search.LocalSearchBackend(latency=args.backend_latency)
+    search.set_backend(backend)
+    search._cache = search.SearchCache(Path(tempfile.mkdtemp(prefix="bench_search_")) / "search_cache.db")
+    queries = workload(args.queries)
+
+    before = await run("uncached", backend.search, queries, args.concurrency)
+    after = await run("cached", search.search_web, queries, args.concurrency)
+    stats = search.stats()
+    print(f"hit rate: {stats['hit_rate']:.1%} ({stats['entries']} distinct queries cached, "
+          f"{metrics.counter('search.shared'):.0f} shared in flight), mean search time {before / after:.1f}x lower")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend-latency", type=float, default=0.2, help="Seconds each backend search takes")
+    asyncio.run(main_async(parser.parse_args()))
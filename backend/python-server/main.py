@@ -7,25 +7,62 @@ from datetime import datetime
 import aiofiles
 import subprocess
 import shutil
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Load environment variables at the very beginning
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
-from ai_agent.generate_video import generate_video
-from ai_agent.agent import root_agent
-from google.adk.sessions import DatabaseSessionService
-from google.adk.runners import Runner
+from ai_agent.generate_video import generate_video, write_code
+from ai_agent.pipeline import StagedPipeline
+from ai_agent import fix_memory, history, metrics, progress, render_cache
+from ai_agent import batches, chat_code, job_queue, prompt_cache, search
+from ai_agent.status_store import StatusStore
+from ai_agent.sessions import close_sessions, get_runner, get_session_service, start_sessions
+from ai_agent.render_pool import cleanup_workspace, start_warm_pool, stop_warm_pool, warm_pool_status
+from ai_agent.renderers import RENDERER, close_renderer, get_renderer
+from ai_agent.agent import chat_responder, root_agent
+from ai_agent.intent import classify
+from ai_agent.chat_parser import IncrementalChatParser, extract_chat_and_code
+from ai_agent.preflight import preflight
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event, EventActions
 from google.genai.types import Content, Part
 
-app = FastAPI(title="Lumen Anima Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import manim once in long-lived render workers instead of once per render
+    # (API nodes that hand renders to remote workers don't render themselves)
+    if RENDERER != "remote":
+        await start_warm_pool()
+    # One session service (engine + connection pool) and one runner per agent for all requests
+    start_sessions()
+    # Durable video job queue; jobs left over from a previous run are picked up again.
+    # By default it claims as many jobs as the staged pipeline can hold; the
+    # pipeline's queues still run claimed jobs in priority order.
+    await video_pipeline.start()
+    await job_queue.start_job_queue(run_video_job, job_queue.VIDEO_QUEUE_WORKERS or video_pipeline.capacity)
+    try:
+        yield
+    finally:
+        for task in list(_batch_tasks):
+            task.cancel()
+        await job_queue.stop_job_queue()
+        await video_pipeline.stop()
+        await close_sessions()
+        await close_renderer()
+        await stop_warm_pool()
+
+app = FastAPI(title="Lumen Anima Backend", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend communication
 app.add_middleware(
@@ -55,120 +92,236 @@ class ChatMessage(BaseModel):
     message: str
     user_id: Optional[str] = "user123"
     session_id: Optional[str] = None
+    speculative_render: Optional[bool] = None  # Start a low-priority draft render of the reply's code (default: SPECULATIVE_RENDER)
+    regenerate: Optional[bool] = False  # Run the agents even if the prompt cache has a matching reply
 
 class CodeRequest(BaseModel):
     filename: str
     content: str
+    session_id: Optional[str] = None  # Chat session the code came from; an edit cancels its draft render
 
 class VideoRequest(BaseModel):
     message: str
     user_id: Optional[str] = "user123"
     code_filename: Optional[str] = None  # Optional: use existing saved code file
+    code_ref: Optional[str] = None  # Optional: code returned by /chat (its code_ref)
+    session_id: Optional[str] = None  # Optional: render the latest code /chat produced in this session
+    render_mode: Optional[str] = "single"  # "single", "multi_scene" (every Scene class in parallel) or "sharded" (animation ranges in parallel)
+    priority: Optional[int] = 0  # Higher runs first
+    regenerate: Optional[bool] = False  # Write a new storyboard and code even if the prompt cache has a match
+
+class BatchRequest(BaseModel):
+    prompts: List[str] = []
+    code_filenames: List[str] = []  # Saved code files to render as they are
+    user_id: Optional[str] = "user123"
+    render_mode: Optional[str] = "single"
+    priority: Optional[int] = 0
+    regenerate: Optional[bool] = False
+    output: Optional[str] = "none"  # "zip" or "concat": one file with every completed video at the end
+
+RENDER_MODES = {"single", "multi_scene", "sharded"}
+
+# Video generation status, shared by every worker process and kept for STATUS_TTL_SECONDS
+video_generation_status = StatusStore()
+
+# Seconds between keep-alive comments on idle event streams
+EVENT_STREAM_KEEPALIVE = 15
+# How often an event stream re-reads the shared status (jobs running in another worker process)
+EVENT_STREAM_POLL = 1.0
+# How often a batch's watcher checks whether all of its items have finished
+BATCH_POLL_SECONDS = 2.0
+_batch_tasks: set[asyncio.Task] = set()
 
-# Global state for tracking video generation
-video_generation_status = {}
-current_project_data = {}
+def _mirror_progress(generation_id: str, event: dict):
+    """Keep /video-status in sync with live progress events."""
+    video_generation_status.update(generation_id, **event)
+
+progress.add_listener(_mirror_progress)
 
 @app.get("/")
 async def root():
     return {"message": "Lumen Anima Backend API", "status": "running"}
 
+@app.get("/ready")
+async def readiness():
+    """Report whether warm render workers are available to take a job"""
+    workers = warm_pool_status()
+    return {
+        "ready": not workers["enabled"] or workers["free"] > 0,
+        "render_workers": workers,
+        "renderer": RENDERER,
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Expose in-process counters and timings (cache hit rates, stage latencies)"""
+    return {
+        **metrics.snapshot(),
+        "render_cache": render_cache.stats(),
+        "history": history.stats(),
+        "renderer": get_renderer().stats(),
+        "job_queue": job_queue.video_queue.stats() if job_queue.video_queue else None,
+        "pipeline": video_pipeline.stats(),
+        "fix_memory": fix_memory.stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "search": search.stats(),
+    }
+
+@app.get("/sessions/{session_id}/prompt-stats")
+async def get_prompt_stats(session_id: str):
+    """Prompt size (approximate tokens) before and after history compaction for a chat session"""
+    stats = history.session_stats(session_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No prompts recorded for this session yet")
+    return stats
+
+async def _open_chat(request: ChatMessage):
+    """
+    Create (or reuse) the chat session and pick the shared runner for the message's intent.
+
+    Returns:
+        tuple: (runner, session_id, whether the reply may come from / go into the prompt cache)
+    """
+    app_name = "lumen_anima_app"
+
+    # Initialize session (the service and runner are shared process-wide)
+    try:
+        session = await get_session_service().create_session(
+            app_name=app_name,
+            user_id=request.user_id,
+            session_id=request.session_id
+        )
+        session_id = session.id
+        new_session = True
+    except Exception:
+        # Session already exists, use the ID from request
+        session_id = request.session_id
+        new_session = False
+
+    # Chit-chat gets one short chat_responder call instead of script_writer + code_writer
+    has_code = request.session_id is not None and chat_code.lookup(video_generation_status, session_id=request.session_id) is not None
+    intent = classify(request.message, has_code)
+    print(f"Intent for session {session_id}: {intent}")
+    agent = chat_responder if intent["intent"] == "chat" else root_agent
+    # Only a session's first prompt stands on its own; later ones depend on the conversation
+    cacheable = new_session and agent is root_agent
+    return get_runner(agent, app_name), session_id, cacheable
+
+async def _replay_cached_reply(request: ChatMessage, session_id: str, cached: dict) -> list[str]:
+    """Add a prompt cache hit to the session as if the agents had written it; returns the agents' responses"""
+    responses = [cached["storyboard"], f"```python\n{cached['code']}\n```"] if cached["storyboard"] else [f"```python\n{cached['code']}\n```"]
+    session_service = get_session_service()
+    session = await session_service.get_session(app_name="lumen_anima_app", user_id=request.user_id, session_id=session_id)
+    invocation_id = new_invocation_context_id()
+    turns = [("user", request.message, {})]
+    if cached["storyboard"]:
+        turns.append(("script_writer", cached["storyboard"], {"storyboard": cached["storyboard"]}))
+    turns.append(("code_writer", responses[-1], {}))
+    for author, text, state_delta in turns:
+        await session_service.append_event(session, Event(
+            invocation_id=invocation_id,
+            author=author,
+            content=Content(role="user" if author == "user" else "model", parts=[Part(text=text)]),
+            actions=EventActions(state_delta=state_delta),
+        ))
+    return responses
+
+async def _remember_chat_prompt(request: ChatMessage, session_id: str, code_content: str | None) -> None:
+    """Store a new session's first reply in the prompt cache"""
+    if not code_content:
+        return
+    session = await get_session_service().get_session(app_name="lumen_anima_app", user_id=request.user_id, session_id=session_id)
+    storyboard = session.state.get("storyboard") if session else None
+    prompt_cache.remember(request.message, code_content, storyboard)
+
+def _prompt_cache_info(cached: dict | None) -> dict | None:
+    """What the client sees of a prompt cache hit (send "regenerate": true for a new result)"""
+    if cached is None:
+        return None
+    return {"match": cached["match"], "similarity": cached["similarity"], "prompt": cached["prompt"]}
+
+def _response_text(event) -> str | None:
+    if event.content and event.content.parts and hasattr(event.content.parts[0], "text") and event.content.parts[0].text:
+        return event.content.parts[0].text
+    return None
+
+async def _store_chat_code(request: ChatMessage, session_id: str, code_content: str | None) -> tuple[str | None, str | None]:
+    """Keep a chat reply's code for /generate-video and, if asked, queue a draft render of it; returns (code_ref, draft generation_id)"""
+    if not code_content:
+        return None, None
+    # A new reply replaces the code an earlier draft render was started for
+    _cancel_speculative(session_id, code_content)
+    code_ref = chat_code.remember(video_generation_status, code_content, session_id, request.user_id)
+    speculative = chat_code.SPECULATIVE_RENDER if request.speculative_render is None else request.speculative_render
+    if not speculative or preflight(code_content)["error"] is not None:
+        return code_ref, None
+    generation_id, attached = await _submit_video(request.message, request.user_id, None, "single", chat_code.SPECULATIVE_RENDER_PRIORITY, code_ref)
+    if not attached:
+        # Only a job this reply started is a draft that an edit may cancel
+        video_generation_status.update(generation_id, speculative=True)
+        chat_code.mark_speculative(video_generation_status, session_id, generation_id, code_ref)
+        metrics.incr("speculative.started")
+    return code_ref, generation_id
+
+def _cancel_speculative(session_id: str | None, code: str | None = None, render_mode: str = "single") -> str | None:
+    """Cancel the session's draft render unless it renders the same code the same way; returns the cancelled generation_id"""
+    draft = chat_code.speculative_render(video_generation_status, session_id)
+    if draft is None:
+        return None
+    # Drafts render in single mode, so this is the key a matching request attaches with
+    same = draft["code"] is not None and job_queue.dedup_key(code=code, render_mode=render_mode) == job_queue.dedup_key(code=draft["code"], render_mode="single")
+    if code is not None and same:
+        return None
+    chat_code.clear_speculative(video_generation_status, session_id)
+    # None when it already finished or a /generate-video attached to it
+    if job_queue.video_queue.cancel(draft["generation_id"]) is None:
+        return None
+    progress.publish(draft["generation_id"], status="cancelled", message="Draft render cancelled: the code was changed", progress=0)
+    metrics.incr("speculative.cancelled")
+    print(f"Cancelled draft render {draft['generation_id']} for session {session_id}")
+    return draft["generation_id"]
+
 @app.post("/chat")
 async def chat_endpoint(request: ChatMessage):
     """Handle chat messages and return AI responses"""
     try:
-        app_name = "lumen_anima_app"
         user_id = request.user_id
+        runner, session_id, cacheable = await _open_chat(request)
+        # Repeated (or near-duplicate) first prompts reuse a validated storyboard and code
+        cached = prompt_cache.lookup(request.message) if cacheable and not request.regenerate else None
 
-        # Initialize session
-        db_url = "sqlite:///./my_agent_data.db"
-        session_service = DatabaseSessionService(db_url=db_url)
-        try:
-            session = await session_service.create_session(
-                app_name=app_name,
-                user_id=user_id,
-                session_id=request.session_id
-            )
-            session_id = session.id
-        except Exception:
-            # Session already exists, use the ID from request
-            session_id = request.session_id
-        
-        runner = Runner(
-            agent=root_agent,
-            app_name=app_name,
-            session_service=session_service
-        )
+        if cached:
+            responses = await _replay_cached_reply(request, session_id, cached)
+        else:
+            user_message = Content(role='user', parts=[Part(text=request.message)])
 
-        user_message = Content(role='user', parts=[Part(text=request.message)])
-        
-        # Collect all responses for streaming
-        responses = []
-        async for event in runner.run_async(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=user_message
-        ):
-            if event.is_final_response():
-                if (
-                    event.content
-                    and event.content.parts
-                    and hasattr(event.content.parts[0], "text")
-                    and event.content.parts[0].text
-                ):
-                    final_response = event.content.parts[0].text.strip()
-                    responses.append(final_response)
-        
-        await runner.close()
+            # Collect all responses for streaming
+            responses = []
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=user_message
+            ):
+                if event.is_final_response():
+                    text = _response_text(event)
+                    if text:
+                        responses.append(text.strip())
         
         # Process responses to extract chat and code
-        code_content = ""
-        chat_response = ""
-        
-        # 1. Extract Chat Response (find [CHAT] anywhere in the response sequence)
-        for resp in responses:
-            if "[CHAT]" in resp:
-                chat_start = resp.find("[CHAT]") + 6
-                # Extract until next header or end
-                chat_end = resp.find("\n#", chat_start)
-                if chat_end == -1: 
-                    chat_end = resp.find("---", chat_start)
-                if chat_end == -1: 
-                    chat_end = len(resp)
-                
-                extracted_chat = resp[chat_start:chat_end].strip()
-                # Clean up bolding/tags
-                chat_response = extracted_chat.replace("**", "").replace(":", "", 1).strip()
-                break # Take the first [CHAT] found
-        
-        # 2. Extract Code Content (from the last response)
-        if responses:
-            last_resp = responses[-1]
-            if "```python" in last_resp:
-                c_start = last_resp.find("```python") + 9
-                c_end = last_resp.find("```", c_start)
-                if c_end != -1:
-                    code_content = last_resp[c_start:c_end].strip()
-            elif "from manim import" in last_resp or "class Introduce" in last_resp:
-                # Raw code fallback
-                code_content = last_resp.strip()
-            
-            # If we still don't have a chat response, use the last resp (but remove code)
-            if not chat_response:
-                if "```python" in last_resp:
-                    chat_response = last_resp.split("```python")[0].strip()
-                elif code_content:
-                    chat_response = "" # It's just code
-        
-        # Final fallback for chat
-        if not chat_response:
-            chat_response = "I've generated the animation code for you! Starting the render now..."
+        chat_response, code_content = extract_chat_and_code(responses)
+        if cacheable and not cached:
+            await _remember_chat_prompt(request, session_id, code_content)
+        # Kept so /generate-video can render this code without running the agents again
+        code_ref, generation_id = await _store_chat_code(request, session_id, code_content)
         
         return {
             "success": True,
             "chat_response": chat_response,
             "code_content": code_content,
+            "code_ref": code_ref,
+            "generation_id": generation_id,
             "session_id": session_id,
+            "prompt_cache": _prompt_cache_info(cached),
             "timestamp": datetime.now().isoformat()
         }
         
@@ -176,42 +329,319 @@ async def chat_endpoint(request: ChatMessage):
         print(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
-@app.post("/generate-video")
-async def generate_video_endpoint(request: VideoRequest, background_tasks: BackgroundTasks):
-    """Generate video from user message"""
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatMessage):
+    """
+    Stream a chat reply as Server-Sent Events.
+
+    Events: {"type": "chat", "text": ...} pieces of the [CHAT] reply as the script
+    writer produces it, {"type": "code", "text": ...} pieces of the code as the code
+    writer produces it, then one {"type": "done", ...} with the same fields /chat
+    returns (or {"type": "error", "detail": ...}). A prompt cache hit sends the
+    whole reply and code as one piece each.
+    """
     try:
-        generation_id = str(uuid.uuid4())
-        video_generation_status[generation_id] = {
-            "status": "processing",
-            "message": "Starting video generation...",
+        runner, session_id, cacheable = await _open_chat(request)
+        cached = prompt_cache.lookup(request.message) if cacheable and not request.regenerate else None
+    except Exception as e:
+        print(f"Chat error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+
+    def sse(payload: dict) -> str:
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def event_stream():
+        started = time.perf_counter()
+        first_piece = True
+        parser = IncrementalChatParser()
+        responses = []
+        streamed_current = False  # partial text already fed for the current response
+        user_message = Content(role='user', parts=[Part(text=request.message)])
+        try:
+            if cached:
+                responses = await _replay_cached_reply(request, session_id, cached)
+                chat_response, code_content = extract_chat_and_code(responses)
+                metrics.observe("chat.time_to_first_piece", time.perf_counter() - started)
+                yield sse({"type": "chat", "text": chat_response})
+                yield sse({"type": "code", "text": code_content})
+            else:
+                async for event in runner.run_async(
+                    user_id=request.user_id,
+                    session_id=session_id,
+                    new_message=user_message,
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+                ):
+                    text = _response_text(event)
+                    pieces = []
+                    if event.partial:
+                        if text:
+                            pieces = parser.feed(text)
+                            streamed_current = True
+                    elif event.is_final_response():
+                        if text:
+                            responses.append(text.strip())
+                            if not streamed_current:
+                                # The model didn't stream this one; parse it whole
+                                pieces = parser.feed(text)
+                        pieces += parser.end_response()
+                        streamed_current = False
+                    for kind, piece in pieces:
+                        if first_piece:
+                            metrics.observe("chat.time_to_first_piece", time.perf_counter() - started)
+                            first_piece = False
+                        yield sse({"type": kind, "text": piece})
+
+            chat_response, code_content = extract_chat_and_code(responses)
+            if cacheable and not cached:
+                await _remember_chat_prompt(request, session_id, code_content)
+            code_ref, generation_id = await _store_chat_code(request, session_id, code_content)
+            metrics.observe("chat.stream_total", time.perf_counter() - started)
+            yield sse({
+                "type": "done",
+                "success": True,
+                "chat_response": chat_response,
+                "code_content": code_content,
+                "code_ref": code_ref,
+                "generation_id": generation_id,
+                "session_id": session_id,
+                "prompt_cache": _prompt_cache_info(cached),
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield sse({"type": "error", "detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _submit_video(message: str, user_id: str, code_filename: str | None, render_mode: str, priority: int, code_ref: str | None = None, regenerate: bool = False) -> tuple[str, bool]:
+    """Put one generation on the job queue; returns (generation_id, attached to an identical job)"""
+    # Identical prompts (or identical saved or chat code) share one job while it is queued or running
+    code = None
+    if code_ref:
+        record = chat_code.lookup(video_generation_status, code_ref)
+        code = record["code"] if record else None
+    elif code_filename:
+        code_path = manim_files_path / code_filename
+        if code_path.exists():
+            async with aiofiles.open(code_path, 'r', encoding='utf-8') as f:
+                code = await f.read()
+    # A regenerate request doesn't attach to a job that may be serving cached code
+    key = job_queue.dedup_key(prompt=message, code=code, render_mode=render_mode, **({"regenerate": True} if regenerate else {}))
+
+    generation_id, attached = job_queue.video_queue.submit(
+        str(uuid.uuid4()),
+        {
+            "message": message,
+            "user_id": user_id,
+            "code_filename": code_filename,
+            "code_ref": code_ref,
+            "render_mode": render_mode,
+            "regenerate": regenerate,
+        },
+        priority=priority,
+        dedup_key=key,
+    )
+    if not attached:
+        video_generation_status.set(generation_id, {
+            "status": "queued",
+            "message": "Waiting for a free worker...",
             "progress": 0
-        }
-        
-        # Start video generation in background
-        background_tasks.add_task(
-            process_video_generation,
-            request.message,
-            request.user_id,
-            generation_id,
-            request.code_filename
-        )
-        
+        })
+    return generation_id, attached
+
+@app.post("/generate-video")
+async def generate_video_endpoint(request: VideoRequest):
+    """Queue a video generation (or attach to an identical one already in flight)"""
+    if request.render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode must be one of {sorted(RENDER_MODES)}")
+    # Code /chat already generated (by code_ref, or the session's latest) skips the LLM stage
+    code_ref = None
+    if not request.code_filename and (request.code_ref or request.session_id):
+        record = chat_code.lookup(video_generation_status, request.code_ref, request.session_id)
+        if record is None and request.code_ref:
+            raise HTTPException(status_code=404, detail="Unknown or expired code_ref for this session")
+        code_ref = record["code_ref"] if record else None
+    if request.session_id:
+        # Rendering different code than the session's draft: the draft is stale
+        code = None
+        if request.code_filename and (manim_files_path / request.code_filename).exists():
+            async with aiofiles.open(manim_files_path / request.code_filename, 'r', encoding='utf-8') as f:
+                code = await f.read()
+        elif code_ref:
+            code = record["code"]
+        if code is not None:
+            _cancel_speculative(request.session_id, code, request.render_mode)
+    try:
+        generation_id, attached = await _submit_video(request.message, request.user_id, request.code_filename, request.render_mode, request.priority or 0, code_ref, request.regenerate or False)
+        if attached and (video_generation_status.get(generation_id) or {}).get("speculative"):
+            # The draft render started by /chat is now the requested video
+            video_generation_status.update(generation_id, speculative=False)
+            metrics.incr("speculative.adopted")
         return {
             "success": True,
             "generation_id": generation_id,
-            "message": "Video generation started"
+            "attached": attached,
+            "message": "Attached to an identical generation already in progress" if attached else "Video generation queued"
         }
         
     except Exception as e:
         print(f"Video generation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Video generation error: {str(e)}")
 
-async def process_video_generation(message: str, user_id: str, generation_id: str, code_filename: str | None = None):
+@app.post("/cancel-generation/{generation_id}")
+async def cancel_generation(generation_id: str):
+    """Cancel a queued or running generation that no other request is waiting on"""
+    state = job_queue.video_queue.cancel(generation_id)
+    if state is None:
+        raise HTTPException(status_code=409, detail="Generation is finished, unknown or shared with another request")
+    progress.publish(generation_id, status="cancelled", message="Video generation cancelled", progress=0)
+    return {"success": True, "generation_id": generation_id, "cancelled_while": state}
+
+@app.post("/generate-batch")
+async def generate_batch_endpoint(request: BatchRequest):
+    """Queue many generations (prompts and/or saved code files) under one batch ID"""
+    if request.render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode must be one of {sorted(RENDER_MODES)}")
+    if request.output not in batches.BATCH_OUTPUTS:
+        raise HTTPException(status_code=400, detail=f"output must be one of {sorted(batches.BATCH_OUTPUTS)}")
+    items = [(prompt, None) for prompt in request.prompts] + [(f"Render {name}", name) for name in request.code_filenames]
+    if not items:
+        raise HTTPException(status_code=400, detail="Provide at least one prompt or code_filename")
+    if len(items) > batches.MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can have at most {batches.MAX_BATCH_ITEMS} items")
+    try:
+        # Straight onto the job queue: the items share the pipeline's LLM and render limits
+        submitted = [await _submit_video(message, request.user_id, code_filename, request.render_mode, request.priority or 0, regenerate=request.regenerate or False) for message, code_filename in items]
+        batch = batches.new_batch([gid for gid, _ in submitted], [attached for _, attached in submitted], request.output)
+        video_generation_status.set(batches.batch_key(batch["batch_id"]), batch)
+        metrics.incr("batch.submitted")
+        metrics.incr("batch.items", len(items))
+        if request.output != "none":
+            _watch_batch(batch["batch_id"])
+        return {
+            "success": True,
+            "batch_id": batch["batch_id"],
+            "generation_ids": batch["generation_ids"],
+            "attached": sum(batch["attached"]),
+            "message": f"Queued {len(items)} generations",
+        }
+    except Exception as e:
+        print(f"Batch generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch generation error: {str(e)}")
+
+def _watch_batch(batch_id: str):
+    """Build the batch's zip/concat output once every item has finished"""
+    async def watch():
+        while True:
+            batch = video_generation_status.get(batches.batch_key(batch_id))
+            if batch is None:
+                return
+            if batches.aggregate(batches.item_statuses(batch, video_generation_status, job_queue.video_queue))["done"]:
+                await _finalize_batch(batch_id)
+                return
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+
+    task = asyncio.create_task(watch())
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+
+async def _finalize_batch(batch_id: str):
+    key = batches.batch_key(batch_id)
+    # Only one process builds the output (whichever inserts the claim first)
+    token = uuid.uuid4().hex
+    if video_generation_status.setdefault(f"{key}:output", {"owner": token})["owner"] != token:
+        return
+    batch = video_generation_status.update(key, output_status="building")
+    videos = []
+    for i, gid in enumerate(batch["generation_ids"]):
+        status = video_generation_status.get(gid) or {}
+        filename = status.get("filename")
+        if status.get("status") == "completed" and filename and (videos_path / filename).exists():
+            videos.append((f"{i + 1:03d}_{filename}", videos_path / filename))
+    try:
+        output = await batches.build_output(batch, videos)
+        video_generation_status.update(key, output_status="ready", output_url=f"/media/batches/{output.name}", output_videos=len(videos))
+        print(f"Batch {batch_id} output ready: {output}")
+    except Exception as e:
+        print(f"Batch {batch_id} output failed: {e}")
+        video_generation_status.update(key, output_status="error", output_error=str(e))
+
+@app.get("/batch-status/{batch_id}")
+async def get_batch_status(batch_id: str):
+    """Aggregate progress of a batch plus the state of each item"""
+    batch = video_generation_status.get(batches.batch_key(batch_id))
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    statuses = batches.item_statuses(batch, video_generation_status, job_queue.video_queue)
+    summary = batches.aggregate(statuses)
+    if summary["done"] and batch["output"] != "none" and not batch.get("output_status"):
+        # The watcher didn't finish (e.g. the process restarted): build the output now
+        _watch_batch(batch_id)
+    return {
+        "batch_id": batch_id,
+        **summary,
+        "items": [
+            {
+                "generation_id": gid,
+                "status": (status or {}).get("status", "pending"),
+                "progress": (status or {}).get("progress", 0),
+                "message": (status or {}).get("message"),
+                "url": (status or {}).get("url"),
+            }
+            for gid, status in zip(batch["generation_ids"], statuses)
+        ],
+        "output": batch["output"],
+        "output_status": batch.get("output_status"),
+        "output_url": batch.get("output_url"),
+        "output_error": batch.get("output_error"),
+    }
+
+async def run_video_job(generation_id: str, payload: dict):
+    """Job queue handler: run one generation; raising marks the job failed"""
+    # Statuses expire; a job requeued long after submission may need a fresh one
+    video_generation_status.setdefault(generation_id, {"status": "queued", "message": "Starting video generation...", "progress": 0})
+    await process_video_generation(
+        payload["message"],
+        payload["user_id"],
+        generation_id,
+        payload.get("code_filename"),
+        payload.get("render_mode", "single"),
+        payload.get("code_ref"),
+        payload.get("regenerate", False),
+    )
+    status = video_generation_status.get(generation_id) or {}
+    if status.get("status") == "error":
+        raise RuntimeError(status.get("error_details") or status.get("message"))
+
+async def write_stage(job: dict) -> dict:
+    """Pipeline LLM stage: storyboard and code (skipped for saved code and prompt cache hits)"""
+    if not job["code_content"]:
+        cached = None if job["regenerate"] else prompt_cache.lookup(job["message"], job["render_mode"])
+        if cached:
+            job["code_content"], job["storyboard"], job["prompt_cache"] = cached["code"], cached["storyboard"], cached
+            progress.publish(job["generation_id"], message="Reusing the storyboard and code of a matching prompt...", progress=25)
+        else:
+            job["code_content"], job["storyboard"] = await write_code(job["message"], job["generation_id"], job["render_mode"])
+            progress.publish(job["generation_id"], message="Code written, waiting for a render slot...", progress=25)
+        job["written"] = True
+    return job
+
+async def render_stage(job: dict) -> dict:
+    """Pipeline render stage: preflight, render, fix and copy the video"""
+    return await generate_video(job["message"], generation_id=job["generation_id"], code_content=job["code_content"], render_mode=job["render_mode"])
+
+# Staged pipeline: LLM calls and renders run under separate concurrency limits
+video_pipeline = StagedPipeline(write_stage, render_stage)
+
+async def process_video_generation(message: str, user_id: str, generation_id: str, code_filename: str | None = None, render_mode: str = "single", code_ref: str | None = None, regenerate: bool = False):
     """Background task for video generation"""
+    job = {}
     try:
-        video_generation_status[generation_id]["status"] = "processing"
-        video_generation_status[generation_id]["message"] = "Analyzing your request..."
-        video_generation_status[generation_id]["progress"] = 10
+        progress.publish(generation_id, status="processing", message="Analyzing your request...", progress=10)
         
         # If code_filename is provided, read the saved code and use it
         code_content = None
@@ -224,25 +654,55 @@ async def process_video_generation(message: str, user_id: str, generation_id: st
                     print(f"Using existing code from {code_filename}")
             except Exception as e:
                 print(f"Warning: Could not read code file {code_filename}: {e}")
+        elif code_ref:
+            # Code from /chat: straight to preflight and render, no second round of agent calls
+            record = chat_code.lookup(video_generation_status, code_ref)
+            if record is None:
+                raise RuntimeError(f"Code {code_ref[:12]} from /chat has expired; send the request again")
+            code_content = record["code"]
+            metrics.incr("chat_code.reused")
+            print(f"Using code {code_ref[:12]} from chat session {record['session_id']}")
         
-        # Generate video using existing function (now returns dict with video info)
-        result = await generate_video(message, generation_id=generation_id, code_content=code_content)
+        # LLM stage, then render stage (see ai_agent/pipeline.py); returns dict with video info
+        job = {
+            "message": message,
+            "generation_id": generation_id,
+            "code_content": code_content,
+            "render_mode": render_mode,
+            "regenerate": regenerate,
+            "prompt_cache": None,
+        }
+        # Stages pick the highest-priority waiting job; attaching can raise it while it waits
+        result = await video_pipeline.run(job, priority=lambda: job_queue.video_queue.priority(generation_id) if job_queue.video_queue else 0)
         
         print(f"Video generation result for {generation_id}: {result}")
+        if job.get("written") and isinstance(result, dict) and not (job["prompt_cache"] and result.get("message") == job["prompt_cache"]["code"]):
+            # The code that rendered (after any fixes) serves the next matching prompt
+            prompt_cache.remember(message, result.get("message"), job.get("storyboard"), render_mode)
         
-        video_generation_status[generation_id]["status"] = "completed"
-        video_generation_status[generation_id]["message"] = "Video generated successfully!"
-        video_generation_status[generation_id]["progress"] = 100
-        video_generation_status[generation_id]["result"] = result
+        completed = {
+            "status": "completed",
+            "message": "Video generated successfully!",
+            "progress": 100,
+            "result": result,
+        }
         # Bubble up convenient fields for the UI
         if isinstance(result, dict):
-            video_generation_status[generation_id]["filename"] = result.get("video_filename")
-            video_generation_status[generation_id]["url"] = result.get("video_url")
+            completed["filename"] = result.get("video_filename")
+            completed["url"] = result.get("video_url")
+            # Animations served from manim's partial movie cache vs. rendered on the final attempt
+            completed["animation_cache"] = result.get("animation_cache")
+            completed["prompt_cache"] = _prompt_cache_info(job["prompt_cache"])
             print(f"Set status - filename: {result.get('video_filename')}, url: {result.get('video_url')}")
+        # Published events are mirrored into video_generation_status
+        progress.publish(generation_id, **completed)
         
     except Exception as e:
         error_str = str(e)
         print(f"Video generation background error: {error_str}")
+        if job.get("prompt_cache"):
+            # Cached code that doesn't render any more shouldn't be served again
+            prompt_cache.forget(job["prompt_cache"])
         import traceback
         traceback.print_exc()
         
@@ -270,27 +730,27 @@ async def process_video_generation(message: str, user_id: str, generation_id: st
         else:
             user_message = f"Error: {error_str[:200]}" if len(error_str) > 200 else f"Error: {error_str}"
         
-        video_generation_status[generation_id]["status"] = "error"
-        video_generation_status[generation_id]["message"] = user_message
-        video_generation_status[generation_id]["progress"] = 0
-        video_generation_status[generation_id]["error_details"] = error_str  # Keep full error for debugging
+        progress.publish(
+            generation_id,
+            status="error",
+            message=user_message,
+            progress=0,
+            error_details=error_str,  # Keep full error for debugging
+        )
+    finally:
+        # The final mp4 lives in media/videos/{generation_id}.mp4; drop the job's scratch files
+        cleanup_workspace(generation_id)
 
 @app.get("/video-status/{generation_id}")
-async def get_video_status(generation_id: str):
-    """Get video generation status"""
-    if generation_id in video_generation_status:
-        return video_generation_status[generation_id]
-
-    # Fallback after reload: if file exists in media/videos/{generation_id}.mp4, synthesize a completed status
-    video_path = videos_path / f"{generation_id}.mp4"
-    if video_path.exists():
-        return {
-            "status": "completed",
-            "message": "Video ready",
-            "progress": 100,
-            "filename": video_path.name,
-            "url": f"/media/videos/{video_path.name}",
-        }
+async def get_video_status(generation_id: str, queue: bool = False):
+    """Get video generation status (keyed lookups in the status store and job queue; ?queue=1 adds the queue position)"""
+    status = video_generation_status.get(generation_id)
+    if status is not None:
+        # Wait and run time; position and depth only on request, since they count the queued jobs
+        queue_info = job_queue.video_queue.get(generation_id, position=queue) if job_queue.video_queue else None
+        if queue_info:
+            status["queue"] = queue_info
+        return status
 
     # Return pending status instead of 404 - generation might not have started yet
     return {
@@ -299,6 +759,45 @@ async def get_video_status(generation_id: str):
         "progress": 0
     }
 
+@app.get("/video-events/{generation_id}")
+async def video_events(generation_id: str):
+    """Stream status and render progress for a generation as Server-Sent Events"""
+    async def event_stream():
+        queue = progress.subscribe(generation_id)
+        try:
+            # Start with the current state so late subscribers don't wait for the next event
+            current = await get_video_status(generation_id)
+            yield f"data: {json.dumps(current, default=str)}\n\n"
+            if current.get("status") in progress.TERMINAL_STATUSES:
+                return
+            last_sent = current
+            idle = 0.0
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_POLL)
+                except asyncio.TimeoutError:
+                    # The job may be running in another worker process: fall back to the shared store
+                    event = video_generation_status.get(generation_id)
+                    if event is None or event == last_sent:
+                        idle += EVENT_STREAM_POLL
+                        if idle >= EVENT_STREAM_KEEPALIVE:
+                            idle = 0.0
+                            yield ": keep-alive\n\n"
+                        continue
+                idle = 0.0
+                last_sent = event
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+                if event.get("status") in progress.TERMINAL_STATUSES:
+                    return
+        finally:
+            progress.unsubscribe(generation_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/video/{filename}")
 async def get_video(filename: str):
     """Serve video files"""
@@ -366,6 +865,9 @@ async def save_code(request: CodeRequest):
         
         async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
             await f.write(sanitized_content)
+        # Edited code makes the chat session's draft render stale
+        if request.session_id:
+            _cancel_speculative(request.session_id, sanitized_content)
         
         return {
             "success": True,
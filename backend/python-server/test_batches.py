@@ -0,0 +1,65 @@
+import asyncio
+import tempfile
+import zipfile
+from pathlib import Path
+
+from ai_agent import batches
+from ai_agent.job_queue import JobQueue
+from ai_agent.status_store import StatusStore
+
+# Test Case 1: Aggregate progress over queued, running, finished and failed items
+summary = batches.aggregate([
+    {"status": "completed", "progress": 100},
+    {"status": "processing", "progress": 50},
+    {"status": "error", "progress": 0},
+    None,
+])
+print(f"Test 1 Aggregate: {summary}")
+assert summary["counts"] == {"queued": 1, "processing": 1, "completed": 1, "error": 1, "cancelled": 0, "expired": 0}
+assert summary["progress"] == 62.5 and not summary["done"]
+assert batches.aggregate([{"status": "completed"}, {"status": "error"}, {"status": "cancelled"}])["done"]
+
+# Test Case 2: Zip output keeps batch order and the videos' bytes
+tmp = Path(tempfile.mkdtemp())
+videos = []
+for i in range(3):
+    path = tmp / f"gen{i}.mp4"
+    path.write_bytes(b"video %d" % i)
+    videos.append((f"{i + 1:03d}_{path.name}", path))
+batches.BATCH_OUTPUT_DIR = tmp / "batches"
+batch = batches.new_batch(["gen0", "gen1", "gen2"], [False, False, False], "zip")
+output = asyncio.run(batches.build_output(batch, videos))
+with zipfile.ZipFile(output) as archive:
+    names = archive.namelist()
+    print(f"Test 2 Zip {output.name}: {names}")
+    assert names == ["001_gen0.mp4", "002_gen1.mp4", "003_gen2.mp4"]
+    assert archive.read("002_gen1.mp4") == b"video 1"
+
+# Test Case 3: Nothing completed means nothing to build
+try:
+    asyncio.run(batches.build_output(batch, []))
+    raise AssertionError("expected ValueError")
+except ValueError as e:
+    print(f"Test 3 Empty batch: {e}")
+
+# Test Case 4: Items whose status is gone while their job has left the queue count as expired
+store = StatusStore(tmp / "status.db")
+queue = JobQueue(tmp / "jobs.db")
+for gid in ("gen0", "gen1", "gen2"):
+    queue.submit(gid, {})
+    store.set(gid, {"status": "queued", "progress": 0})
+store.set("gen0", {"status": "completed", "progress": 100})
+queue._db.execute("UPDATE jobs SET state = 'done' WHERE id IN ('gen0', 'gen1')")
+store._db.execute("DELETE FROM status WHERE id = 'gen1'")
+statuses = batches.item_statuses(batch, store, queue)
+summary = batches.aggregate(statuses)
+print(f"Test 4 Deleted item status: {[s and s['status'] for s in statuses]}, {summary}")
+assert [s["status"] for s in statuses] == ["completed", "expired", "queued"] and not summary["done"]
+# Once the last job is gone without a terminal status too, the batch is done
+queue._db.execute("UPDATE jobs SET state = 'failed' WHERE id = 'gen2'")
+summary = batches.aggregate(batches.item_statuses(batch, store, queue))
+assert summary["done"] and summary["counts"]["expired"] == 2 and summary["progress"] == 100.0
+# Without a queue to ask, a missing status still counts as queued
+assert not batches.aggregate(batches.item_statuses(batch, store))["done"]
+
+print("All batch tests passed")
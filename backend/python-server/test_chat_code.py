@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+
+from ai_agent import chat_code
+from ai_agent.status_store import StatusStore
+
+store = StatusStore(Path(tempfile.mkdtemp()) / "status.db")
+CIRCLE = "from manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n        self.play(Create(Circle()))\n"
+SQUARE = CIRCLE.replace("Circle", "Square")
+
+# Test Case 1: /chat's code is stored under its content hash, tied to the session
+ref = chat_code.remember(store, CIRCLE, "session-a", "user123")
+record = chat_code.lookup(store, ref)
+print(f"Test 1 Stored: {ref[:12]} -> session {record['session_id']}")
+assert ref == chat_code.code_ref(CIRCLE) and len(ref) == 64
+assert record["code"] == CIRCLE and record["user_id"] == "user123"
+assert chat_code.lookup(store, ref, "session-a")["code"] == CIRCLE
+
+# Test Case 2: A session lookup finds its latest code; other sessions can't claim it
+square_ref = chat_code.remember(store, SQUARE, "session-a")
+print(f"Test 2 Latest for session-a: {chat_code.lookup(store, session_id='session-a')['code_ref'][:12]}")
+assert chat_code.lookup(store, session_id="session-a")["code_ref"] == square_ref
+assert chat_code.lookup(store, ref, "session-b") is None
+assert chat_code.lookup(store, session_id="session-b") is None
+
+# Test Case 3: The same code from a second session belongs to both
+chat_code.remember(store, SQUARE, "session-b")
+assert chat_code.lookup(store, square_ref, "session-a") is not None
+assert chat_code.lookup(store, square_ref, "session-b") is not None
+
+# Test Case 4: Unknown and expired references
+expired = StatusStore(Path(tempfile.mkdtemp()) / "status.db", ttl=-1)
+chat_code.remember(expired, CIRCLE, "session-a")
+assert chat_code.lookup(expired, ref) is None and chat_code.lookup(expired, session_id="session-a") is None
+assert chat_code.lookup(store, "0" * 64) is None and chat_code.lookup(store) is None
+print("Test 4 Unknown and expired refs: not found")
+
+# Test Case 5: A session's draft render is tracked until cleared; new code keeps it
+chat_code.mark_speculative(store, "session-c", "gen-draft", ref)
+chat_code.remember(store, CIRCLE, "session-c")
+draft = chat_code.speculative_render(store, "session-c")
+print(f"Test 5 Draft: {draft['generation_id']} for {draft['code_ref'][:12]}")
+assert draft == {"generation_id": "gen-draft", "code_ref": ref, "code": CIRCLE}
+chat_code.clear_speculative(store, "session-c")
+assert chat_code.speculative_render(store, "session-c") is None
+assert chat_code.lookup(store, session_id="session-c")["code"] == CIRCLE
+
+store.close()
+expired.close()
+print("All chat code tests passed")
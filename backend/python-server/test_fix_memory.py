@@ -0,0 +1,86 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from ai_agent import fix_memory, metrics, repair
+from ai_agent.tracebacks import parse_traceback
+
+fix_memory._memory = fix_memory.FixMemory(Path(tempfile.mkdtemp()) / "fix_memory.db")
+
+HEADER = "from manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n"
+ANGLE = HEADER + "        l1, l2 = Line(ORIGIN, RIGHT), Line(ORIGIN, UP)\n        angle = Angle(l1, l2, radius=0.5, vertex=ORIGIN)\n        self.play(Create(angle))\n"
+OTHER_ANGLE = HEADER + "        a = Line(LEFT, ORIGIN)\n        b = Line(ORIGIN, UP * 2)\n        self.add(a, b)\n        marker = Angle(a, b, vertex=a.get_end(), other_angle=True)\n"
+GROUP = HEADER + "        group = Group(Circle(), Square())\n        self.play(Create(group))\n"
+CYAN = HEADER + "        dot = Dot(color=CYAN)\n        self.play(FadeIn(dot, shift=UP))\n        self.play(dot.animate.set_color(CYAN))\n"
+
+
+def rich_error(line: int, exc: str) -> str:
+    return f"│ /tmp/jobs/{line * 7}/scenes.py:{line} in construct │\n╰──────╯\n{exc}\n"
+
+
+VERTEX = "TypeError: Mobject.__init__() got an unexpected keyword argument 'vertex'"
+
+# Test Case 1: Signatures ignore paths and line numbers; message-less errors use the calls on the failing line
+sig_a = fix_memory.error_signature(parse_traceback(rich_error(6, VERTEX)), ANGLE)
+sig_b = fix_memory.error_signature(parse_traceback(rich_error(8, VERTEX)), OTHER_ANGLE)
+sig_group = fix_memory.error_signature(parse_traceback(rich_error(6, "NotImplementedError")), GROUP)
+print(f"Test 1 Signatures: {sig_a!r}, {sig_group!r}")
+assert sig_a == sig_b == VERTEX
+assert sig_group == "NotImplementedError @ Create,play"
+assert fix_memory.error_signature(parse_traceback("ValueError: expected 3 points, got 12")) == "ValueError: expected N points, got N"
+assert fix_memory.error_signature(parse_traceback("no exception")) is None
+
+# Test Case 2: The fixer's edit of the failing line becomes a reusable patch
+drop = fix_memory.derive_patch(ANGLE, ANGLE.replace(", vertex=ORIGIN", ""), parse_traceback(rich_error(6, VERTEX)))
+rename = fix_memory.derive_patch(GROUP, GROUP.replace("Create(group)", "FadeIn(group)"), parse_traceback(rich_error(6, "NotImplementedError")))
+colour = fix_memory.derive_patch(CYAN, CYAN.replace("color=CYAN)\n", "color=TEAL)\n", 1), parse_traceback(rich_error(5, "NameError: name 'CYAN' is not defined")))
+print(f"Test 2 Patches: {drop}, {rename}, {colour}")
+assert drop == {"kind": "drop_kwarg", "name": "vertex"}
+assert rename == {"kind": "rename", "old": "Create", "new": "FadeIn", "scope": "line"}
+assert colour == {"kind": "rename", "old": "CYAN", "new": "TEAL", "scope": "file"}
+patched = fix_memory.apply_patch(OTHER_ANGLE, drop, 8)
+assert "marker = Angle(a, b, other_angle=True)" in patched
+assert fix_memory.apply_patch(CYAN, colour, 5).count("TEAL") == 2 and "CYAN" not in fix_memory.apply_patch(CYAN, colour, 5)
+assert fix_memory.derive_patch(ANGLE, ANGLE.replace("l1, l2 =", "l1, l2 = l1, l2 ="), parse_traceback(rich_error(6, VERTEX))) is None
+
+# Test Case 3: The first generation pays for the fixer; the next one with the same error doesn't
+fixer_calls = []
+
+
+async def fake_request_fix(fixer_input, fixer_session_id, render_mode="single", job_id="fix", candidates=1):
+    fixer_calls.append(fixer_session_id)
+    return ANGLE.replace(", vertex=ORIGIN", ""), None
+
+
+repair.request_fix = fake_request_fix
+history = []
+fixed, attempt = asyncio.run(repair.fix_attempt(ANGLE, rich_error(6, VERTEX), history, "fixer_gen1_0"))
+history.append(attempt)
+fix_memory.learn(history)
+assert attempt["source"] == "fixer" and len(fixer_calls) == 1
+
+history = []
+fixed, attempt = asyncio.run(repair.fix_attempt(OTHER_ANGLE, rich_error(8, VERTEX), history, "fixer_gen2_0"))
+history.append(attempt)
+fix_memory.learn(history)
+stats = fix_memory.stats()
+print(f"Test 3 Second generation: source={attempt['source']}, fixer calls={len(fixer_calls)}, stats={stats}")
+assert attempt["source"] == "memory" and len(fixer_calls) == 1 and "vertex" not in fixed
+assert stats["entries"] == 1 and stats["hits"] == 1 and stats["hit_rate"] == 0.5
+assert stats["seconds_saved"] == fix_memory.FIX_MEMORY_ASSUMED_FIXER_SECONDS
+assert fix_memory.get_memory().entries()[0]["successes"] == 2
+
+# Test Case 4: A remembered patch that keeps failing is tried once per generation, then forgotten
+for generation in range(3):
+    history = []
+    fixed, attempt = asyncio.run(repair.fix_attempt(OTHER_ANGLE, rich_error(8, VERTEX), history, f"fixer_bad{generation}_0"))
+    history.append(attempt)
+    # The patched code fails with the same error again: the fixer takes over
+    fixed, retry = asyncio.run(repair.fix_attempt(fixed, rich_error(8, VERTEX), history, f"fixer_bad{generation}_1"))
+    assert retry["source"] == "fixer"
+    fix_memory.learn(history, rich_error(8, VERTEX), fixed)
+entries = fix_memory.get_memory().entries()
+print(f"Test 4 After repeated failures: {entries}, patch failures counted: {metrics.counter('fix_memory.patch_failed')}")
+assert entries == [] and metrics.counter("fix_memory.patch_failed") == 3
+
+print("All fix memory tests passed")
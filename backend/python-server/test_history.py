@@ -0,0 +1,41 @@
+from google.genai import types
+
+from ai_agent.history import compact_contents, estimate_tokens
+
+CODE = "```python\nfrom manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n" + "        self.play(Create(Circle()))\n" * 40 + "```"
+STORYBOARD = "[CHAT] Sure!\n## Storyboard\n" + "Scene detail. " * 200
+
+
+def user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def turn(i):
+    return [
+        user(f"Request {i}: animate something"),
+        types.Content(role="user", parts=[types.Part(text="For context:"), types.Part(text=f"[script_writer] said: {STORYBOARD}")]),
+        types.Content(role="model", parts=[types.Part(text=CODE)]),
+    ]
+
+
+contents = [c for i in range(6) for c in turn(i)]
+
+# Test Case 1: Old turns are compacted, the last K turns are kept verbatim
+compacted, report = compact_contents(contents, keep_turns=2, max_tokens=100_000)
+print(f"Test 1 Report: {report}")
+assert report["turns"] == 6 and report["dropped_turns"] == 0
+assert report["compacted_parts"] == 8  # storyboard + code in each of the 4 old turns
+assert compacted[-6:] == contents[-6:]
+assert "[earlier code omitted: 44 lines, sha256 " in compacted[2].parts[0].text
+assert report["tokens_after"] < report["tokens_before"] / 2
+
+# Test Case 2: The token cap drops the oldest turns but never the current one
+compacted, report = compact_contents(contents, keep_turns=2, max_tokens=1)
+print(f"\nTest 2 Report: {report}")
+assert report["dropped_turns"] == 5
+assert compacted == contents[-3:]
+
+# Test Case 3: Short sessions pass through unchanged
+compacted, report = compact_contents(turn(0), keep_turns=3, max_tokens=100_000)
+print(f"\nTest 3 Tokens: {estimate_tokens(compacted)}")
+assert compacted == turn(0) and report["tokens_before"] == report["tokens_after"]
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from ai_agent import intent, metrics
+
+CHAT = [
+    "Hello!", "hi there", "Thanks so much!", "ok cool", "Who are you?", "What's your name?",
+    "Tell me a joke", "How are you today?", "What can you do?", "bye", "I'm feeling tired", "lol",
+]
+ANIMATION = [
+    "Animate a circle.", "Explain the Pythagorean theorem", "Show how bubble sort works",
+    "Draw a sine wave", "Visualize gradient descent", "Plot the derivative of x squared",
+    "How does photosynthesis work in a cell?", "Demonstrate a pendulum swinging",
+    "binary search tree", "Fourier series", "Create a video about prime numbers",
+    "from manim import *\nclass A(Scene):\n    def construct(self): pass",
+]
+
+# Test Case 1: Chit-chat is answered as chat; animation requests go to the pipeline
+for message in CHAT:
+    result = intent.classify(message)
+    assert result["intent"] == "chat", (message, result)
+for message in ANIMATION:
+    result = intent.classify(message)
+    assert result["intent"] == "animation", (message, result)
+print(f"Test 1 Classified {len(CHAT)} chat and {len(ANIMATION)} animation messages")
+assert metrics.counter("intent.chat") == len(CHAT) and metrics.counter("intent.animation") == len(ANIMATION)
+
+# Test Case 2: Short edits only count as animation once the session has code
+without_code = intent.classify("make it red")
+with_code = intent.classify("make it red", has_code=True)
+print(f"Test 2 'make it red': {without_code} / {with_code}")
+assert with_code["intent"] == "animation" and with_code["probability"] > without_code["probability"]
+assert intent.classify("")["intent"] == "chat"
+
+# Test Case 3: Storyboard markers code_writer needs
+assert intent.has_storyboard("## Storyboard\n**Scene 1: Intro**\n- Visual Elements: a circle")
+assert intent.has_storyboard("scene breakdown:\n1. ...")
+assert not intent.has_storyboard("[CHAT] Hello! What would you like to animate?")
+assert not intent.has_storyboard(None)
+print("Test 3 Storyboard markers detected")
+
+# Test Case 4: code_writer is skipped (with empty output) when there is no storyboard
+skipped = intent.skip_code_writer_without_storyboard(SimpleNamespace(state={"storyboard": "[CHAT] Hi there!"}))
+kept = intent.skip_code_writer_without_storyboard(SimpleNamespace(state={"storyboard": "**Scene 1:** A ball falls"}))
+missing = intent.skip_code_writer_without_storyboard(SimpleNamespace(state={}))
+print(f"Test 4 Skipped: {skipped is not None}, kept: {kept is None}")
+assert skipped.parts[0].text == "" and missing is not None and kept is None
+assert metrics.counter("intent.code_writer_skipped") == 2
+
+print("All intent classifier tests passed")
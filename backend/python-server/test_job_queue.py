@@ -0,0 +1,110 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from ai_agent.job_queue import JOB_RETENTION_SECONDS, JobQueue, dedup_key
+
+db_path = Path(tempfile.mkdtemp()) / "jobs.db"
+
+# Test Case 1: Identical prompts and code share a key; render options don't
+assert dedup_key(prompt="Animate  a Circle") == dedup_key(prompt="animate a circle")
+assert dedup_key(code="x = 1  # comment\n") == dedup_key(code="x=1")
+assert dedup_key(prompt="a circle", render_mode="single") != dedup_key(prompt="a circle", render_mode="sharded")
+print("Test 1 Dedup keys: ok")
+
+
+async def run_queue():
+    queue = JobQueue(db_path)
+    order = []
+    release = asyncio.Event()
+
+    async def handler(job_id, payload):
+        order.append(job_id)
+        await release.wait()
+        if payload.get("fail"):
+            raise RuntimeError("render failed")
+
+    # Test Case 2: Duplicates attach, priorities decide the order
+    assert queue.submit("low", {}, priority=0, dedup_key="k-low") == ("low", False)
+    assert queue.submit("high", {}, priority=5, dedup_key="k-high") == ("high", False)
+    assert queue.submit("dup", {}, priority=0, dedup_key="k-low") == ("low", True)
+    assert queue.submit("bad", {"fail": True}, priority=1) == ("bad", False)
+    info = queue.get("low", position=True)
+    print(f"Test 2 Queued: {info}")
+    assert info["queue_position"] == 3 and info["queue_depth"] == 3 and info["attached"] == 1
+    # Plain lookups skip the counts over the queue
+    assert "queue_position" not in queue.get("low") and queue.get("low")["state"] == "queued"
+
+    await queue.start(handler, concurrency=1)
+    await asyncio.sleep(0.1)
+    assert order == ["high"] and queue.get("high")["state"] == "running"
+    release.set()
+    for _ in range(50):
+        if queue.get("low")["state"] == "done":
+            break
+        await asyncio.sleep(0.05)
+    print(f"Test 2 Order: {order}")
+    assert order == ["high", "bad", "low"]
+    assert queue.get("bad")["state"] == "failed" and queue.get("bad")["error"] == "render failed"
+    assert queue.get("low")["run_seconds"] is not None
+
+    # A finished job no longer absorbs duplicates
+    assert queue.submit("again", {}, dedup_key="k-low") == ("again", False)
+    await queue.stop()
+
+
+asyncio.run(run_queue())
+
+
+# Test Case 3: Jobs left running by a dead worker are requeued after their lease
+async def recover():
+    crashed = JobQueue(db_path, lease_seconds=0)
+    job = crashed.claim()
+    assert job["id"] == "again"
+    survivor = JobQueue(db_path, lease_seconds=0)
+    requeued = survivor.requeue_expired()
+    print(f"\nTest 3 Requeued: {requeued}, state {survivor.get('again')['state']}")
+    assert requeued == 1 and survivor.get("again")["state"] == "queued"
+
+asyncio.run(recover())
+
+
+# Test Case 4: Cancelling stops a running handler without stopping the worker; shared jobs can't be cancelled
+async def cancel():
+    queue = JobQueue(Path(tempfile.mkdtemp()) / "jobs.db")
+    stopped = []
+
+    async def handler(job_id, payload):
+        try:
+            await asyncio.sleep(10 if payload.get("slow") else 0)
+        except asyncio.CancelledError:
+            stopped.append(job_id)
+            raise
+
+    queue.submit("draft", {"slow": True}, priority=-10, dedup_key="k-draft")
+    queue.submit("waiting", {"slow": True}, priority=-20)
+    queue.submit("shared", {"slow": True}, priority=-30, dedup_key="k-shared")
+    queue.submit("attach", {}, priority=-30, dedup_key="k-shared")
+    await queue.start(handler, concurrency=1)
+    await asyncio.sleep(0.1)
+    assert queue.cancel("waiting") == "queued"
+    assert queue.cancel("draft") == "running"
+    assert queue.cancel("shared") is None and queue.cancel("draft") is None
+    await asyncio.sleep(0.1)
+    states = {job: queue.get(job)["state"] for job in ("draft", "waiting", "shared")}
+    print(f"\nTest 4 Cancelled: {stopped}, states {states}")
+    assert stopped == ["draft"]
+    assert states == {"draft": "cancelled", "waiting": "cancelled", "shared": "running"}
+    assert queue.stats()["cancelled"] == 2
+
+    # Test Case 5: Cancelled jobs record when they ended and are pruned with the other finished jobs
+    ended = queue._db.execute("SELECT id FROM jobs WHERE state = 'cancelled' AND finished_at IS NOT NULL").fetchall()
+    assert len(ended) == 2
+    queue._db.execute("UPDATE jobs SET finished_at = finished_at - ? WHERE state = 'cancelled'", (JOB_RETENTION_SECONDS + 1,))
+    queue.prune()
+    print(f"Test 5 After pruning: {queue.stats()}")
+    assert queue.get("draft") is None and queue.get("waiting") is None and queue.get("shared") is not None
+    await queue.stop()
+
+asyncio.run(cancel())
+print("All job queue tests passed")
@@ -54,3 +54,49 @@ responses = [
 chat, code = mock_extract(responses)
 print(f"\nTest 2 Chat: '{chat}'")
 print(f"Test 2 Code: {code[:30]}...")
+
+# Test Case 3: The streaming parser yields the same chat and code from any chunking
+from ai_agent.chat_parser import IncrementalChatParser, extract_chat_and_code
+
+def stream_extract(responses, chunk_size):
+    parser = IncrementalChatParser()
+    streamed = {"chat": "", "code": ""}
+    for resp in responses:
+        for i in range(0, len(resp), chunk_size):
+            for kind, text in parser.feed(resp[i:i + chunk_size]):
+                streamed[kind] += text
+        for kind, text in parser.end_response():
+            streamed[kind] += text
+    return streamed["chat"].strip(), streamed["code"].strip()
+
+cases = [
+    [
+        "[CHAT] I'd be happy to explain backpropagation! Here is the plan.\n## Storyboard\n...",
+        "from manim import *\nclass Introduce(Scene):..."
+    ],
+    [
+        "**[CHAT]**: Sure, **gradients** flow backwards.\n## Storyboard\n...",
+        "Here is the code:\n```python\nfrom manim import *\nx = '--'\n```"
+    ],
+]
+for responses in cases:
+    expected = mock_extract(responses)
+    assert extract_chat_and_code(responses) == expected
+    for chunk_size in (1, 2, 7, 10_000):
+        assert stream_extract(responses, chunk_size) == expected, (chunk_size, stream_extract(responses, chunk_size))
+print(f"\nTest 3 Streamed: {stream_extract(cases[1], 1)}")
+
+# Test Case 4: A "---" before the heading stays in the chat, as in the batch parser
+responses = [
+    "[CHAT] Sure! We'll go step by step.\n---\nFirst the forward pass, then the gradients.\n## Storyboard\n...",
+    "```python\nfrom manim import *\n```",
+]
+expected = extract_chat_and_code(responses)
+for chunk_size in (1, 2, 7, 10_000):
+    assert stream_extract(responses, chunk_size) == expected, (chunk_size, stream_extract(responses, chunk_size))
+print(f"\nTest 4 Streamed: {stream_extract(responses, 3)}")
+assert "forward pass" in expected[0]
+
+# Without a heading, the chat ends at the "---"
+responses = ["[CHAT] Sure thing.\n---\nNotes for the code writer", "```python\nfrom manim import *\n```"]
+assert stream_extract(responses, 1) == extract_chat_and_code(responses) == ("Sure thing.", "from manim import *")
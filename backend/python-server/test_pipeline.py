@@ -0,0 +1,102 @@
+import asyncio
+
+from ai_agent.pipeline import StagedPipeline
+
+
+async def run():
+    events = []
+    render_gate = asyncio.Event()
+
+    async def write(job):
+        events.append(("llm", job))
+        if job == "bad-code":
+            raise RuntimeError("LLM failed")
+        return f"code:{job}"
+
+    async def render(code):
+        events.append(("render", code))
+        await render_gate.wait()
+        if code == "code:bad-render":
+            raise RuntimeError("render failed")
+        return f"video:{code}"
+
+    pipeline = StagedPipeline(write, render, first_concurrency=2, second_concurrency=1, queue_size=1)
+    await pipeline.start()
+    assert pipeline.capacity == 5
+
+    # Test Case 1: Later jobs get their code written while the first one renders
+    tasks = [asyncio.create_task(pipeline.run(f"job{i}")) for i in range(3)]
+    await asyncio.sleep(0.05)
+    print(f"Test 1 Events while rendering: {events}, stats: {pipeline.stats()}")
+    assert ("render", "code:job0") in events
+    assert {("llm", "job1"), ("llm", "job2")} <= set(events)
+    assert pipeline.stats()["render_busy"] == 1
+
+    # Test Case 2: A saturated render stage holds finished code in the bounded queue
+    stats = pipeline.stats()
+    assert stats["waiting_for_render"] == 1, stats
+    render_gate.set()
+    results = await asyncio.gather(*tasks)
+    print(f"Test 2 Results: {results}")
+    assert results == ["video:code:job0", "video:code:job1", "video:code:job2"]
+
+    # Test Case 3: Failures in either stage reach the caller; the pipeline keeps going
+    for job, message in (("bad-code", "LLM failed"), ("bad-render", "render failed")):
+        try:
+            await pipeline.run(job)
+            raise AssertionError("expected a failure")
+        except RuntimeError as e:
+            assert str(e) == message
+    assert await pipeline.run("job3") == "video:code:job3"
+    print(f"Test 3 Stats after failures: {pipeline.stats()}")
+    assert pipeline.stats()["completed"] == 4
+
+    # Test Case 4: A cancelled caller stops its render; the render worker carries on
+    render_gate.clear()
+    cancelled = asyncio.create_task(pipeline.run("draft"))
+    await asyncio.sleep(0.05)
+    assert pipeline.stats()["render_busy"] == 1
+    cancelled.cancel()
+    await asyncio.sleep(0.01)
+    print(f"Test 4 Stats after cancelling: {pipeline.stats()}")
+    assert pipeline.stats()["render_busy"] == 0
+    render_gate.set()
+    assert await pipeline.run("job4") == "video:code:job4"
+
+    await pipeline.stop()
+
+    # Test Case 5: Waiting jobs go through in priority order, read when a worker picks the next one
+    order = []
+    llm_gate = asyncio.Event()
+
+    async def slow_write(job):
+        await llm_gate.wait()
+        order.append(job)
+        return job
+
+    async def instant_render(job):
+        return job
+
+    ordered = StagedPipeline(slow_write, instant_render, first_concurrency=1, second_concurrency=1, queue_size=4)
+    await ordered.start()
+    raised = {"draft": -10}
+    tasks = [asyncio.create_task(ordered.run("first"))]
+    await asyncio.sleep(0.01)
+    tasks += [
+        asyncio.create_task(ordered.run("batch", priority=0)),
+        asyncio.create_task(ordered.run("draft", priority=lambda: raised["draft"])),
+        asyncio.create_task(ordered.run("interactive", priority=10)),
+        asyncio.create_task(ordered.run("batch2", priority=0)),
+    ]
+    await asyncio.sleep(0.01)
+    # A request attaches to the draft and raises its priority while it waits
+    raised["draft"] = 5
+    llm_gate.set()
+    await asyncio.gather(*tasks)
+    print(f"Test 5 LLM stage order: {order}")
+    assert order == ["first", "interactive", "draft", "batch", "batch2"]
+    await ordered.stop()
+
+
+asyncio.run(run())
+print("All pipeline tests passed")
@@ -0,0 +1,48 @@
+from ai_agent.preflight import preflight
+
+# Test Case 1: Known Manim failure classes are rewritten, comments survive
+code = '''```python
+from manim import *
+
+class Introduce(Scene):
+    def construct(self):
+        # comments must survive the rewrite
+        eq = MathTex(r"\\sigma", "+", r"\\cdots")
+        dots = Group(Dot(), Dot(color=CYAN))
+        self.play(Create(dots))
+        angle = Angle(l1, l2, 0.5, radius=0.4, vertex=d)
+        ax = Axes(x_range=[0, 5], axis_config={"color": BLUE})
+```'''
+report = preflight(code)
+print(report["code"])
+print(f"Test 1 Rules: {report['rules']} in {report['elapsed_ms']:.2f} ms")
+assert report["error"] is None
+assert "# comments must survive the rewrite" in report["code"]
+assert "Text('σ+...')" in report["code"]
+assert "Dot(color=TEAL)" in report["code"]
+assert "FadeIn(dots)" in report["code"]
+assert "Angle(l1, l2, radius=0.4)" in report["code"]
+assert 'axis_config={"label_constructor": Text, "color": BLUE}' in report["code"]
+
+# Test Case 2: Leaked markup is stripped only when the code doesn't parse
+report = preflight('x = 1\n<span class="text-purple-400">y = 2</span>\n')
+print(f"\nTest 2 Code: {report['code']!r} Rules: {report['rules']}")
+assert report["code"] == "x = 1\ny = 2" and report["rules"] == {"strip_markup": 1}
+
+# Test Case 3: User-defined colors are left alone, syntax errors are reported
+report = preflight('CYAN = "#00FFFF"\nc = Circle(color=CYAN)')
+print(f"\nTest 3 Rules: {report['rules']}")
+assert report["rules"] == {}
+report = preflight("def construct(:\n    pass")
+print(f"Test 3 Error: {report['error']!r}")
+assert isinstance(report["error"], SyntaxError)
+
+# Test Case 4: Tex calls mixing strings with other values are joined at run time, not passed as extra arguments
+report = preflight('value = 3\nt = MathTex(r"\\alpha=", value, color=CYAN)\nparts = ["a", "b"]\nu = MathTex(*parts)\n')
+print(f"\nTest 4 Code: {report['code']!r} Rules: {report['rules']}")
+assert report["error"] is None
+assert "Text(\"\".join(map(str, ('α=', value,))), color=TEAL)" in report["code"]
+assert 'Text("".join(map(str, (*parts,))))' in report["code"]
+namespace = {"Text": lambda text, **kwargs: text, "TEAL": "teal"}
+exec(report["code"], namespace)
+assert namespace["t"] == "α=3" and namespace["u"] == "ab"
@@ -0,0 +1,48 @@
+import asyncio
+
+from ai_agent import progress
+from ai_agent.render_pool import _read_lines
+
+# Test Case 1: Animation log lines become percent-complete events with an ETA
+events = []
+progress.add_listener(lambda gid, event: events.append((gid, event)))
+tracker = progress.RenderProgress("gen-1", total_animations=4, start=40, end=80)
+tracker.feed("INFO     Animation 0 : Partial movie file written in '/tmp/a.mp4'")
+tracker.feed("INFO     Animation 1 : Using cached data (hash : 123)")
+tracker.feed("INFO     Writing 'Hello' to Text")
+tracker.feed("INFO     Animation 0 : Partial movie file written in '/tmp/a.mp4'", key="Scene2")
+print(f"Test 1 Events: {[e for _, e in events]}")
+assert len(events) == 3
+assert events[-1][1]["progress"] == 70.0
+assert events[-1][1]["message"] == "Rendering animation 3 of 4..."
+assert events[-1][1]["eta_seconds"] is not None
+
+# Test Case 2: Subscribers get merged state until a terminal status
+async def subscribe_until_done():
+    queue = progress.subscribe("gen-2")
+    progress.publish("gen-2", status="processing", progress=10)
+    progress.publish("gen-2", message="Rendering video...")
+    progress.publish("gen-2", status="completed", progress=100)
+    received = [queue.get_nowait() for _ in range(queue.qsize())]
+    progress.unsubscribe("gen-2", queue)
+    return received
+
+received = asyncio.run(subscribe_until_done())
+print(f"\nTest 2 Received: {received}")
+assert received[1] == {"status": "processing", "progress": 10, "message": "Rendering video..."}
+assert received[-1]["status"] == "completed"
+assert progress.latest("gen-2") is None
+
+# Test Case 3: Streamed output is split on carriage returns as well as newlines
+async def read_stream():
+    reader = asyncio.StreamReader()
+    reader.feed_data("line one\r\nbar 10%\rbar 50%\nπ".encode("utf-8")[:-1])
+    reader.feed_data("π".encode("utf-8")[-1:] + b"\n")
+    reader.feed_eof()
+    lines, seen = [], []
+    await _read_lines(reader, lines, seen.append)
+    return lines, seen
+
+lines, seen = asyncio.run(read_stream())
+print(f"\nTest 3 Lines: {seen}")
+assert seen == ["line one", "bar 10%", "bar 50%", "π"]
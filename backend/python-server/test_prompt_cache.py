@@ -0,0 +1,67 @@
+import tempfile
+from pathlib import Path
+
+from ai_agent import metrics, prompt_cache
+
+prompt_cache._cache = prompt_cache.PromptCache(Path(tempfile.mkdtemp()) / "prompt_cache.db")
+
+NETWORK = "from manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n        self.play(Create(Circle(color=BLUE)))\n"
+STORYBOARD = "[CHAT] Sure! Here's the plan.\n## Storyboard\n**Scene 1**: the layers\n- Visual Elements: circles joined by lines"
+
+# Test Case 1: Case, punctuation and filler words don't change the normalized prompt
+print(f"Test 1 Normalized: {prompt_cache.normalize_prompt('Can you animate a Neural Network, please?')!r}")
+assert prompt_cache.normalize_prompt("Animate a neural network!") == "animate neural network"
+assert prompt_cache.normalize_prompt("Can you animate a Neural Network, please?") == "animate neural network"
+assert prompt_cache.normalize_prompt("the") == "the"
+
+# Test Case 2: Only code that passes preflight is stored
+assert prompt_cache.remember("animate a neural network", NETWORK, STORYBOARD)
+assert not prompt_cache.remember("draw a circle", "def construct(:\n")
+assert not prompt_cache.remember("draw a circle", "")
+assert prompt_cache.get_cache().count() == 1
+
+# Test Case 3: Exact and near-duplicate prompts return the stored storyboard and code
+exact = prompt_cache.lookup("Animate a neural network!")
+near = prompt_cache.lookup("animate neural networks")
+print(f"Test 3 Exact: {exact['match']} ({exact['similarity']}), near: {near['match']} ({near['similarity']})")
+assert exact["match"] == "exact" and exact["code"].strip() == NETWORK.strip() and exact["storyboard"] == STORYBOARD
+assert near["match"] == "near" and near["similarity"] >= prompt_cache.PROMPT_CACHE_SIMILARITY
+assert near["prompt"] == "animate a neural network"
+
+# Test Case 4: Different topics, numbers, colours and render modes miss
+prompt_cache.remember("animate a neural network with 3 layers", NETWORK, STORYBOARD)
+prompt_cache.remember("draw a red circle growing", NETWORK)
+for prompt, mode in (("animate a sine wave", "single"), ("animate a neural network with 4 layers", "single"),
+                     ("draw a blue circle growing", "single"), ("animate a neural network", "multi_scene")):
+    assert prompt_cache.lookup(prompt, mode) is None, prompt
+print(f"Test 4 Misses: {metrics.counter('prompt_cache.misses')}")
+assert metrics.counter("prompt_cache.misses") == 4
+
+# Test Case 5: The similarity threshold is configurable (1 = exact matches only)
+strict = prompt_cache.PromptCache(prompt_cache.get_cache().path, threshold=1.0)
+assert strict.get("animate neural networks") is None and strict.get("animate the neural network") is not None
+loose = prompt_cache.PromptCache(prompt_cache.get_cache().path, threshold=0.4)
+assert loose.get("visualize a neural network")["match"] == "near"
+strict.close()
+loose.close()
+
+# Test Case 6: Entries expire, the least recently used are evicted, failed entries are forgotten
+small = prompt_cache.PromptCache(Path(tempfile.mkdtemp()) / "prompt_cache.db", max_entries=2)
+small.put("draw a circle", NETWORK)
+small.put("draw a square", NETWORK)
+assert small.get("draw a circle") is not None
+evicted = small.put("draw a triangle", NETWORK)
+print(f"Test 6 Evicted: {evicted}, left: {small.count()}")
+assert evicted == 1 and small.get("draw a square") is None and small.get("draw a circle") is not None
+small.ttl = -1
+assert small.get("draw a circle") is None
+small.close()
+prompt_cache.forget(prompt_cache.lookup("animate a neural network"))
+assert prompt_cache.lookup("animate a neural network") is None
+
+stats = prompt_cache.stats()
+print(f"Test 6 Stats: {stats}")
+assert stats["exact_hits"] == 2 and stats["near_hits"] == 1 and stats["forgotten"] == 1 and stats["entries"] == 2
+
+prompt_cache.get_cache().close()
+print("All prompt cache tests passed")
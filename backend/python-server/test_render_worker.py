@@ -0,0 +1,107 @@
+import asyncio
+import sys
+import tempfile
+import types
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import manim  # noqa: F401
+except ImportError:
+    # Without manim, stand in for the parts render_job uses. scene_classes_from_file
+    # loads the file the way manim.utils.module_ops.get_module does: registered in
+    # sys.modules under its dotted path, with its directory put in front of sys.path.
+    import importlib.util
+
+    class Scene:
+        def __init__(self, skip_animations=False):
+            self.renderer = types.SimpleNamespace(num_plays=0, file_writer=None)
+
+        def render(self):
+            self.construct()
+
+    @contextmanager
+    def tempconfig(overrides):
+        yield
+
+    def scene_classes_from_file(file_name, full_list=False):
+        module_name = ".".join(file_name.with_suffix("").parts)
+        spec = importlib.util.spec_from_file_location(module_name, file_name)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        sys.path.insert(0, str(file_name.parent.absolute()))
+        spec.loader.exec_module(module)
+        return [c for c in vars(module).values() if isinstance(c, type) and issubclass(c, Scene) and c is not Scene]
+
+    fake = types.ModuleType("manim")
+    fake.Scene, fake.tempconfig, fake.__all__ = Scene, tempconfig, ["Scene"]
+    constants = types.ModuleType("manim.constants")
+    constants.QUALITIES = {"low_quality": {"flag": "l", "pixel_width": 854, "pixel_height": 480, "frame_rate": 15}}
+    module_ops = types.ModuleType("manim.utils.module_ops")
+    module_ops.scene_classes_from_file = scene_classes_from_file
+    sys.modules.update({"manim": fake, "manim.constants": constants, "manim.utils": types.ModuleType("manim.utils"), "manim.utils.module_ops": module_ops})
+
+from ai_agent import render_pool
+from ai_agent.render_worker import render_job
+
+SCENE = "from manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n        pass\n"
+
+
+def run_job(name: str) -> dict:
+    job_dir = Path(tempfile.mkdtemp()) / name
+    job_dir.mkdir()
+    (job_dir / "scenes.py").write_text(SCENE, encoding="utf-8")
+    return render_job({
+        "scene_file": str(job_dir / "scenes.py"),
+        "scene_name": "Introduce",
+        "media_dir": str(job_dir / "media"),
+        "quality": "l",
+        "op": "dry_run",
+    }, lambda message: None)
+
+
+# Test Case 1: Jobs in a long-lived worker leave no generated modules or sys.path entries behind
+modules_before, path_before = set(sys.modules), list(sys.path)
+results = [run_job("job1"), run_job("job2")]
+print(f"Test 1 Return codes: {[r['returncode'] for r in results]}, new modules: {set(sys.modules) - modules_before}")
+assert all(r["returncode"] == 0 for r in results), results
+assert not [m for m in set(sys.modules) - modules_before if m.endswith("scenes")]
+assert sys.path == path_before
+
+
+# Test Case 2: A warm worker that fails to start is retried, so later jobs still get one
+class FakeWorker:
+    async def run(self, job, on_log=None):
+        return {"returncode": 0, "stdout": "warm", "stderr": "", "video_path": None}
+
+    def should_recycle(self, max_jobs, max_rss_mb):
+        return False
+
+    async def stop(self):
+        pass
+
+
+async def flaky_start():
+    spawns = []
+
+    async def spawn():
+        spawns.append(len(spawns))
+        if len(spawns) == 1:
+            raise RuntimeError("Render worker exited during startup (code -9)")
+        return FakeWorker()
+
+    render_pool._WarmWorker.spawn = spawn
+    render_pool.RENDER_WORKER_RESPAWN_DELAY = 0.01
+    pool = render_pool.WarmWorkerPool(1)
+    await pool.start()
+    assert pool.stats()["free"] == 0
+    fallback = await pool.render({})
+    await asyncio.sleep(0.05)
+    result = await pool.render({})
+    print(f"Test 2 First job: {fallback}, spawns: {len(spawns)}, later job: {result['stdout']}, stats: {pool.stats()}")
+    assert fallback is None and result["stdout"] == "warm" and pool.stats()["free"] == 1
+    await pool.close()
+
+asyncio.run(flaky_start())
+
+print("All render worker tests passed")
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+
+tmp = Path(tempfile.mkdtemp())
+os.environ["STATUS_DB"] = str(tmp / "status.db")
+# Heartbeat often enough for the worker to notice cancellations quickly
+os.environ["JOB_LEASE_SECONDS"] = "1.5"
+
+from ai_agent.render_pool import JOBS_CODE_ROOT, JOBS_MEDIA_ROOT
+from ai_agent.renderers import LocalDirectoryStorage, Renderer, RemoteRenderer
+from ai_agent.remote_worker import serve, sweep_workspaces
+from ai_agent.status_store import StatusStore
+
+
+class FakeRenderer(Renderer):
+    """
+    Writes the output file and logs one animation, fails for scenes named Broken, never finishes scenes named Slow.
+
+    Like manim, it keeps a partial movie file in the job's media dir and reuses it on the next attempt.
+    """
+
+    name = "fake"
+    slow_cancelled = 0
+    cached = []
+
+    async def render(self, job, on_line=None, on_dry_run=None):
+        if on_dry_run:
+            on_dry_run([{"ok": True, "num_plays": 2, "error": "", "elapsed": 0.0}])
+        if job["scene_names"] == ["Slow"]:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                FakeRenderer.slow_cancelled += 1
+                raise
+        if job["scene_names"] == ["Broken"]:
+            return subprocess.CompletedProcess(["fake"], 1, "", "NameError: name 'Circel' is not defined"), {"renderer": self.name}
+        partial = Path(job["media_dir"]) / "partial_movie_files" / job["scene_names"][0] / "0.mp4"
+        FakeRenderer.cached.append(partial.exists())
+        partial.parent.mkdir(parents=True, exist_ok=True)
+        partial.write_bytes(b"partial")
+        if on_line:
+            on_line("Animation 0 : Partial movie file written in '0.mp4'")
+        Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+        Path(job["output"]).write_bytes(b"mp4 " + job["code"].encode())
+        return subprocess.CompletedProcess(["fake"], 0, f"File ready at '{job['output']}'", ""), {"renderer": self.name}
+
+
+def job(name: str, scene: str) -> dict:
+    return {
+        "job_id": name,
+        "generation_id": f"gen-{name}",
+        "code": f"class {scene}(Scene): pass",
+        "scene_names": [scene],
+        "output": str(tmp / "api" / f"{name}.mp4"),
+    }
+
+
+async def run():
+    storage = LocalDirectoryStorage(tmp / "storage")
+    stop = asyncio.Event()
+    worker = asyncio.create_task(serve(FakeRenderer(), concurrency=2, queue_path=tmp / "render_queue.db", storage=storage, stop=stop))
+    api = RemoteRenderer(tmp / "render_queue.db", storage, timeout=10)
+
+    # Test Case 1: A remote render comes back as a local file with a File ready line
+    dry_runs = []
+    result, report = await api.render(job("ok", "Intro"), on_dry_run=dry_runs.extend)
+    print(f"Test 1 Remote render: rc={result.returncode}, report={report}")
+    assert result.returncode == 0
+    assert result.stdout.endswith(f"File ready at '{tmp / 'api' / 'ok.mp4'}'")
+    assert (tmp / "api" / "ok.mp4").read_bytes() == b"mp4 class Intro(Scene): pass"
+    assert dry_runs[0]["num_plays"] == 2 and report["worker"]
+    # The upload is removed from shared storage once downloaded
+    assert not [p for p in (tmp / "storage").iterdir() if p.suffix == ".mp4"]
+    # Render progress reached the shared status store
+    assert StatusStore(tmp / "status.db").get("gen-ok")["progress"] == 65.0
+    # The worker drops the attempt's videos but keeps the workspace for retries
+    assert not list((JOBS_MEDIA_ROOT / "ok").rglob("ok-*.mp4"))
+    assert (JOBS_MEDIA_ROOT / "ok" / "partial_movie_files" / "Intro" / "0.mp4").exists()
+
+    # Test Case 2: A failed render keeps manim's error for the fixer
+    result, _ = await api.render(job("bad", "Broken"))
+    print(f"Test 2 Failed render: rc={result.returncode}, stderr={result.stderr!r}")
+    assert result.returncode == 1 and "NameError" in result.stderr
+
+    # Test Case 3: A retry of the same job reuses the partial movie files of the first attempt
+    FakeRenderer.cached.clear()
+    for attempt in range(2):
+        result, _ = await api.render(job("retry", "Intro"))
+        assert result.returncode == 0
+        assert (JOBS_MEDIA_ROOT / "retry").exists()
+    print(f"Test 3 Cached partial movie per attempt: {FakeRenderer.cached}")
+    assert FakeRenderer.cached == [False, True]
+
+    # Test Case 4: A render that times out is cancelled in the queue and stopped on the worker
+    impatient = RemoteRenderer(tmp / "render_queue.db", storage, timeout=1.5)
+    result, _ = await impatient.render(job("slow", "Slow"))
+    print(f"Test 4 Timed out render: rc={result.returncode}, stderr={result.stderr!r}")
+    assert result.returncode == 1 and "did not finish" in result.stderr
+    render_id = result.args[1]
+    assert impatient.queue.get(render_id)["state"] == "cancelled"
+    await asyncio.sleep(1)
+    assert FakeRenderer.slow_cancelled == 1
+    await impatient.close()
+
+    # Test Case 5: A cancelled caller cancels its queued render too
+    caller = asyncio.create_task(api.render(job("dropped", "Slow")))
+    await asyncio.sleep(0.1)
+    render_ids = [row["id"] for row in api.queue._db.execute("SELECT id FROM jobs WHERE id LIKE 'dropped-%'")]
+    caller.cancel()
+    try:
+        await caller
+    except asyncio.CancelledError:
+        pass
+    states = [api.queue.get(render_id)["state"] for render_id in render_ids]
+    print(f"Test 5 Cancelled caller: {states}")
+    assert states == ["cancelled"]
+
+    # Test Case 6: Workspaces no attempt has used within the TTL are swept
+    sweep_workspaces()
+    assert (JOBS_MEDIA_ROOT / "retry").exists()
+    removed = sweep_workspaces(max_age=0)
+    print(f"Test 6 Swept workspaces: {removed}")
+    assert not any((root / name).exists() for root in (JOBS_CODE_ROOT, JOBS_MEDIA_ROOT) for name in ("ok", "bad", "retry", "slow"))
+
+    stop.set()
+    await worker
+    await api.close()
+
+
+asyncio.run(run())
+print("All renderer tests passed")
@@ -0,0 +1,86 @@
+import asyncio
+import subprocess
+
+from ai_agent import renderers, repair
+
+GOOD = "from manim import *\n\nclass Introduce(Scene):\n    def construct(self):\n        self.play(Create(Circle()))\n"
+SLOW_GOOD = GOOD.replace("Circle", "Square")
+RUNTIME_ERROR = GOOD.replace("Circle()", "Circle(vertex=ORIGIN)")
+SYNTAX_ERROR = "class Introduce(Scene:\n    pass\n"
+
+# Candidate replies by session suffix: (delay, code)
+replies = {}
+cancelled = []
+
+
+async def fake_fixer(fixer_input, fixer_session_id, temperature=None):
+    delay, code = replies[fixer_session_id.rsplit("_", 1)[1]]
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        cancelled.append(fixer_session_id)
+        raise
+    return code
+
+
+class FakeRenderer:
+    async def dry_run(self, scene_file, scene_names, media_dir):
+        code = open(scene_file, encoding="utf-8").read()
+        ok = "vertex=" not in code
+        return [{"ok": ok, "num_plays": 1, "error": "" if ok else "TypeError: unexpected keyword argument 'vertex'", "elapsed": 0.0}]
+
+
+repair.run_code_fixer = fake_fixer
+repair.get_renderer = lambda: FakeRenderer()
+
+# Test Case 1: The fastest candidate that passes wins; broken ones are skipped and slower ones cancelled
+replies.update({"c0": (0.3, SLOW_GOOD), "c1": (0.01, SYNTAX_ERROR), "c2": (0.05, RUNTIME_ERROR), "c3": (0.1, GOOD)})
+winner, dry_runs = asyncio.run(repair.request_fix("fix it", "fixer_test", job_id="test-repair", candidates=4))
+print(f"Test 1 Winner: {winner.splitlines()[-1].strip()}, cancelled: {cancelled}")
+assert winner == GOOD and dry_runs[0]["ok"]
+assert cancelled == ["fixer_test_c0"]
+
+# Test Case 2: If nothing passes, the first non-empty candidate goes on so the next attempt reports its error
+replies.update({"c0": (0.01, ""), "c1": (0.02, RUNTIME_ERROR), "c2": (0.03, SYNTAX_ERROR)})
+fallback, dry_runs = asyncio.run(repair.request_fix("fix it", "fixer_test", job_id="test-repair", candidates=3))
+print(f"Test 2 Fallback: {fallback.splitlines()[-1].strip()}")
+assert fallback == RUNTIME_ERROR and dry_runs is None
+
+# Test Case 3: Candidates sample at their own temperatures; the base fixer is untouched
+hot = repair._fixer_at(1.0)
+print(f"Test 3 Temperatures: base={repair.code_fixer.generate_content_config}, variant={hot.generate_content_config.temperature}")
+assert hot.generate_content_config.temperature == 1.0 and repair._fixer_at(1.0) is hot
+assert repair._fixer_at(None) is repair.code_fixer
+assert repair.scene_names_for(GOOD) == ["Introduce"]
+
+# Test Case 4: The winner's dry runs go with the fix, and the next render uses them instead of dry-running again
+async def fake_request_fix(fixer_input, fixer_session_id, render_mode="single", job_id="fix", candidates=1):
+    return GOOD, [{"ok": True, "num_plays": 1, "error": "", "elapsed": 0.0}]
+
+repair.request_fix = fake_request_fix
+fixed, attempt = asyncio.run(repair.fix_attempt(RUNTIME_ERROR, "TypeError: unexpected keyword argument 'vertex'", [], "fixer_test"))
+assert fixed == GOOD and attempt["checked_dry_runs"][0]["num_plays"] == 1
+
+dry_run_calls = []
+
+
+class CountingRenderer(renderers.LocalPoolRenderer):
+    async def dry_run(self, scene_file, scene_names, media_dir):
+        dry_run_calls.append(scene_names)
+        return [{"ok": True, "num_plays": 1, "error": "", "elapsed": 0.0}]
+
+
+async def fake_run_manim(scenes_path, scene_name, media_dir, quality="l", env=None, on_line=None):
+    return subprocess.CompletedProcess(["manim"], 0, "", "")
+
+renderers._render_env = lambda: {}
+renderers.run_manim = fake_run_manim
+job = {"scene_file": "scenes.py", "scene_names": ["Introduce"], "media_dir": "media", "output": "out.mp4", "dry_run": True}
+seen = []
+asyncio.run(CountingRenderer().render({**job, "checked_dry_runs": attempt["checked_dry_runs"]}, on_dry_run=seen.append))
+print(f"Test 4 Dry runs with checked code: {dry_run_calls}, reported: {seen}")
+assert dry_run_calls == [] and seen == [attempt["checked_dry_runs"]]
+asyncio.run(CountingRenderer().render(job))
+assert dry_run_calls == [["Introduce"]]
+
+print("All repair tests passed")
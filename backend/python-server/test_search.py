@@ -0,0 +1,92 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from ai_agent import metrics, search
+
+search._cache = search.SearchCache(Path(tempfile.mkdtemp()) / "search_cache.db")
+
+
+class CountingBackend(search.LocalSearchBackend):
+    """The local backend, counting the searches that reach it."""
+
+    calls = 0
+
+    async def search(self, query):
+        self.calls += 1
+        return await super().search(query)
+
+
+backend = CountingBackend(latency=0.05)
+search.set_backend(backend)
+
+# Test Case 1: Queries that differ in case, punctuation, filler words and order share a key
+key = search.normalize_query("What is the Fourier Series?")
+print(f"Test 1 Key: {key!r}")
+assert key == "fourier series"
+assert search.normalize_query("fourier series explained") == search.normalize_query("series, Fourier") == key
+assert search.normalize_query("what is") == "is what"
+
+# Test Case 2: The local stand-in ranks its documents by overlap with the query
+result = asyncio.run(backend.search("bubble sort vs merge sort"))
+print(f"Test 2 Top result: {result['results'][0]['title']}")
+assert result["results"][0]["title"] == "Sorting algorithm" and "swaps" in result["summary"]
+assert asyncio.run(backend.search("zzz qqq"))["results"] == []
+
+# Test Case 3: A repeated search is answered from the cache
+backend.calls = 0
+first = asyncio.run(search.search_web("Backpropagation chain rule"))
+second = asyncio.run(search.search_web("chain rule of backpropagation"))
+print(f"Test 3 Cached: {first['cached']} then {second['cached']}, backend calls: {backend.calls}")
+assert not first["cached"] and second["cached"] and backend.calls == 1
+assert second["results"] == first["results"]
+
+
+# Test Case 4: Concurrent identical searches share one backend call
+async def concurrent():
+    return await asyncio.gather(*(search.search_web(f"gradient descent {'?' * i}") for i in range(5)))
+
+
+backend.calls = 0
+results = asyncio.run(concurrent())
+assert backend.calls == 1 and sum(r["cached"] for r in results) == 4
+assert metrics.counter("search.shared") == 4
+
+# Test Case 5: Expired entries are missed; the least recently used are evicted beyond the limit
+small = search.SearchCache(Path(tempfile.mkdtemp()) / "search_cache.db", ttl=3600, max_entries=2)
+small.put("a", "a", {"summary": "a"})
+small.put("b", "b", {"summary": "b"})
+assert small.get("a") is not None
+evicted = small.put("c", "c", {"summary": "c"})
+print(f"Test 5 Evicted: {evicted}, left: {small.count()}")
+assert evicted == 1 and small.get("b") is None and small.get("a") is not None
+small.ttl = -1
+assert small.get("a") is None
+small.close()
+
+# Test Case 6: Per-request search time and the hit rate show up in the stats
+invocation = SimpleNamespace(invocation_id="inv-1")
+asyncio.run(search.search_web("binary search", tool_context=invocation))
+asyncio.run(search.search_web("Binary Search?", tool_context=invocation))
+search.record_request_search_time(invocation)
+stats = search.stats()
+print(f"Test 6 Stats: {stats}")
+assert stats["per_request_seconds"]["count"] == 1 and stats["per_request_seconds"]["mean"] >= 0.05
+assert stats["lookups"] == 9 and stats["hits"] == 6 and stats["hit_rate"] == 0.667
+assert stats["backend"] == "local" and stats["entries"] == 3
+
+
+# Test Case 7: A failing backend returns an error to the agent instead of raising
+class FailingBackend(search.SearchBackend):
+    async def search(self, query):
+        raise RuntimeError("quota exceeded")
+
+
+search.set_backend(FailingBackend())
+failed = asyncio.run(search.search_web("prime numbers"))
+assert failed["error"] == "quota exceeded" and failed["results"] == []
+assert metrics.counter("search.errors") == 1
+
+search.get_cache().close()
+print("All search tests passed")
@@ -0,0 +1,47 @@
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from ai_agent.status_store import StatusStore
+
+
+
+def worker_process(path):
+    # Another uvicorn worker: writes progress for a job it is running
+    store = StatusStore(path)
+    store.update("gen-1", status="processing", progress=55)
+    store.close()
+
+
+if __name__ == "__main__":
+    db_path = Path(tempfile.mkdtemp()) / "status.db"
+
+    # Test Case 1: A status written by one process is visible to another
+    store = StatusStore(db_path)
+    store.set("gen-1", {"status": "queued", "message": "Waiting for a free worker...", "progress": 0})
+    proc = multiprocessing.Process(target=worker_process, args=(db_path,))
+    proc.start()
+    proc.join()
+    status = store.get("gen-1")
+    print(f"Test 1 Status: {status}")
+    assert status == {"status": "processing", "message": "Waiting for a free worker...", "progress": 55}
+
+    # Test Case 2: setdefault keeps an existing status, unknown IDs are a cheap miss
+    assert store.setdefault("gen-1", {"status": "queued"})["status"] == "processing"
+    started = time.perf_counter()
+    for _ in range(10_000):
+        store.get("missing")
+    per_lookup_us = (time.perf_counter() - started) / 10_000 * 1e6
+    print(f"\nTest 2 Miss lookup: {per_lookup_us:.1f} µs")
+    assert "missing" not in store
+
+    # Test Case 3: Entries expire after their TTL and are evicted
+    short = StatusStore(db_path, ttl=0.05)
+    short.set("gen-2", {"status": "completed"})
+    assert short.get("gen-2") == {"status": "completed"}
+    time.sleep(0.1)
+    assert short.get("gen-2") is None
+    evicted = short.evict_expired()
+    print(f"\nTest 3 Evicted: {evicted}")
+    assert evicted == 1 and len(store) == 1
@@ -0,0 +1,69 @@
+from ai_agent.repair import build_fixer_input, record_attempt
+from ai_agent.tracebacks import code_window, parse_traceback, summarize
+
+CODE = "\n".join(
+    ["from manim import *", "", "class Introduce(Scene):", "    def construct(self):"]
+    + [f"        dot{i} = Dot().shift(RIGHT * {i})" for i in range(40)]
+    + ["        angle = Angle(Line(ORIGIN, RIGHT), Line(ORIGIN, UP), vertex=ORIGIN)", "        self.play(Create(angle))"]
+)
+
+RICH_STDERR = """\x1b[31m╭─────────────────────────────── Traceback (most recent call last) ────────────────────────────────╮\x1b[0m
+│ /usr/lib/python3/site-packages/manim/cli/render/commands.py:120 in render                       │
+│                                                                                                  │
+│   117 │   │   for SceneClass in scene_classes_from_file(file):                                   │
+│   118 │   │   │   try:                                                                           │
+│ ❱ 120 │   │   │   │   scene.render()                                                             │
+│                                                                                                  │
+│ /srv/app/manim_generated_files/jobs/abc/scenes.py:45 in construct                                │
+│                                                                                                  │
+│ ❱ 45 │   │   angle = Angle(Line(ORIGIN, RIGHT), Line(ORIGIN, UP), vertex=ORIGIN)                 │
+│                                                                                                  │
+│ /usr/lib/python3/site-packages/manim/mobject/geometry/line.py:1003 in __init__                  │
+╰──────────────────────────────────────────────────────────────────────────────────────────────────╯
+TypeError: Mobject.__init__() got an unexpected keyword argument 'vertex'
+"""
+
+PLAIN_STDERR = """Traceback (most recent call last):
+  File "/srv/app/ai_agent/render_worker.py", line 109, in render_job
+    scene.render()
+  File "/srv/app/manim_generated_files/jobs/abc/scenes.py", line 46, in construct
+    self.play(Create(angle))
+NotImplementedError
+"""
+
+# Test Case 1: Rich tracebacks reduce to the exception and the failing scenes.py frame
+parsed = parse_traceback(RICH_STDERR)
+print(f"Test 1 Rich: {summarize(parsed)}")
+assert parsed["exc_type"] == "TypeError" and "unexpected keyword argument 'vertex'" in parsed["message"]
+assert parsed["line"] == 45 and parsed["function"] == "construct" and len(parsed["frames"]) == 3
+
+# Test Case 2: Plain tracebacks from the warm workers, exceptions without a message
+parsed = parse_traceback(PLAIN_STDERR)
+print(f"Test 2 Plain: {summarize(parsed)}")
+assert parsed["exc_type"] == "NotImplementedError" and parsed["line"] == 46
+assert summarize(parse_traceback("no exception here\nlast line"), "no exception here\nlast line") == "no exception here\nlast line"
+
+# Test Case 3: Code window marks the failing line
+window = code_window(CODE, 45, radius=1)
+print(f"Test 3 Window:\n{window}")
+assert window.splitlines()[1].startswith(">> 45 |") and "vertex=ORIGIN" in window.splitlines()[1]
+assert code_window(CODE, None) == ""
+
+# Test Case 4: Four attempts of history cost diffs, not copies of the code and stderr
+history = []
+old_history = []
+code = CODE
+for attempt in range(1, 5):
+    fixed = code.replace(f"RIGHT * {attempt})", f"LEFT * {attempt})")
+    history.append(record_attempt(attempt, code, fixed, RICH_STDERR))
+    old_history.append({"attempt": attempt, "code": code, "error": RICH_STDERR})
+    code = fixed
+new_prompt = build_fixer_input(code, RICH_STDERR, history)
+old_history_str = "\n".join(f"ATTEMPT {h['attempt']} ERROR:\n{h['error']}\nCODE:\n{h['code']}\n{'-'*20}" for h in old_history)
+old_prompt = f"HISTORY OF FAILED ATTEMPTS:\n{old_history_str}\n\nCURRENT FAILED CODE:\n{code}\n\nCURRENT ERROR:\n{RICH_STDERR}"
+print(f"Test 4 Prompt after 4 attempts: {len(old_prompt)} -> {len(new_prompt)} characters")
+assert len(new_prompt) * 3 < len(old_prompt)
+assert "-        dot4 = Dot().shift(RIGHT * 4)" in new_prompt and ">> 45 |" in new_prompt
+assert history[0]["error"] == "TypeError at line 45 in construct: Mobject.__init__() got an unexpected keyword argument 'vertex'"
+
+print("All traceback tests passed")